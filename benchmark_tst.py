@@ -1,25 +1,175 @@
+import argparse
+import asyncio
+import bisect
+import gzip
+import fnmatch
 import time
 import random
 import string
 import sys
 import os
 import gc
+import json
+import platform
+import statistics
+import tempfile
+import threading
 import tracemalloc
 from collections import defaultdict
+from itertools import islice
 import matplotlib.pyplot as plt
 import numpy as np
 
 # Add the parent directory to the path to import our module
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from ternary_search_tree import TernarySearchTree
+from ternary_search_tree import (TernarySearchTree, TernarySearchMap, ConcurrentTernarySearchTree,
+                                 AsyncTernarySearchTree, QueryPool, load_file)
+
+
+SCALING_DISTRIBUTIONS = ('vocabulary', 'urls', 'skus', 'unicode')
+SCALING_STRUCTURES = ('tst', 'set', 'dict', 'sorted_list')
+SCALING_METRICS = ('insert_us', 'search_us', 'prefix_us', 'fuzzy_us', 'bytes_per_key')
+STORAGE_REDUCTION_TARGET = 5.0 # bytes per node, like-for-like object node over array storage, on 1M words
+
+
+class LinkOnlyNode:
+    """Object node holding only what the array storage keeps: the character, the end flag and three links."""
+    __slots__ = ("char", "end_of_word", "_ls", "_eq", "_gt")
+
+
+class RecursiveTernarySearchTree(TernarySearchTree):
+    """Reference tree using the original one-frame-per-node recursive descent."""
+    
+    def insert_character(self, node, word, index):
+        char = word[index]
+        
+        if node is None:
+            node = self.Node(char)
+        node.size += 1
+        
+        if char < node.char:
+            node._ls = self.insert_character(node._ls, word, index)
+        elif char > node.char:
+            node._gt = self.insert_character(node._gt, word, index)
+        elif index + 1 == len(word):
+            if not node.end_of_word:
+                node.end_of_word = True
+                self.word_count += 1
+            else:
+                self._add_to_sizes(word, -1)
+        else:
+            node._eq = self.insert_character(node._eq, word, index + 1)
+        
+        return node
+    
+    def search_helper(self, node, word, index):
+        if node is None:
+            return None
+        
+        char = word[index]
+        if char < node.char:
+            return self.search_helper(node._ls, word, index)
+        elif char > node.char:
+            return self.search_helper(node._gt, word, index)
+        elif index + 1 == len(word):
+            return node
+        return self.search_helper(node._eq, word, index + 1)
+
+
+def levenshtein(a, b):
+    """Plain O(len(a) * len(b)) edit distance, the brute-force baseline."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def edits1(word, alphabet):
+    """Every string within one insertion, deletion or substitution of word, the probing baseline for fuzzy search."""
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    candidates = {word}
+    candidates.update(head + tail[1:] for head, tail in splits if tail)
+    candidates.update(head + char + tail[1:] for head, tail in splits if tail for char in alphabet)
+    candidates.update(head + char + tail for head, tail in splits for char in alphabet)
+    return candidates
+
+
+RESULTS_SCHEMA_VERSION = 1 #version of the benchmark_results.json layout
+HARNESS_SCENARIOS = ('random', 'worst_case', 'best_case')
+
+
+def summarize(times):
+    """Median, interquartile range and raw samples of repeated timings."""
+    quartiles = statistics.quantiles(times, n=4) if len(times) > 1 else [times[0]] * 3
+    return {
+        'total_time': statistics.median(times),
+        'iqr': quartiles[2] - quartiles[0],
+        'min': min(times),
+        'times': times
+    }
+
+
+def load_results(path):
+    """Read a results file written by TSTBenchmark.run_harness."""
+    with open(path) as f:
+        data = json.load(f)
+    version = data.get('meta', {}).get('schema_version')
+    if version != RESULTS_SCHEMA_VERSION:
+        raise ValueError(f"{path}: unsupported results schema version {version!r}")
+    return data
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """
+    Compare the median timings of two harness runs.
+    
+    A slowdown is a regression when it exceeds threshold and is also
+    larger than the two interquartile ranges together, so run-to-run
+    noise isn't reported.
+    
+    Args:
+        baseline (dict): Results of the reference run
+        current (dict): Results of the run under test
+        threshold (float): Relative slowdown reported as a regression
+        
+    Returns:
+        list: One dict per (scenario, size, phase) present in both runs
+    """
+    rows = []
+    for scenario in HARNESS_SCENARIOS:
+        before_entries = {entry['size']: entry for entry in baseline.get(scenario, [])}
+        for entry in current.get(scenario, []):
+            before_entry = before_entries.get(entry['size'])
+            if before_entry is None:
+                continue
+            for phase in ('insertion', 'search'):
+                before = before_entry[phase]['total_time']
+                after = entry[phase]['total_time']
+                noise = before_entry[phase]['iqr'] + entry[phase]['iqr']
+                change = after / before - 1 if before > 0 else 0.0
+                rows.append({'scenario': scenario, 'size': entry['size'], 'phase': phase,
+                             'baseline': before, 'current': after, 'change': change,
+                             'regression': change > threshold and after - before > noise})
+    return rows
 
 
 class TSTBenchmark:
     """Comprehensive benchmarking suite for Ternary Search Tree."""
     
-    def __init__(self):
+    def __init__(self, seed=None):
+        """
+        Args:
+            seed: Seed for the generated datasets, None for a different run each time
+        """
         self.results = defaultdict(list)
+        self.seed = seed
+        if seed is not None:
+            random.seed(seed)
         
     def generate_random_words(self, count, min_length=3, max_length=10):
         """Generate random words for testing."""
@@ -30,6 +180,16 @@ class TSTBenchmark:
             words.append(word)
         return list(set(words))  # Remove duplicates
     
+    def generate_zipf_queries(self, words, count, exponent=1.1):
+        """Generate a Zipf-distributed query stream over the given words."""
+        ranked = random.sample(words, len(words))  # Random popularity ranking
+        cum_weights = []
+        total = 0.0
+        for rank in range(1, len(ranked) + 1):
+            total += 1.0 / rank ** exponent
+            cum_weights.append(total)
+        return random.choices(ranked, cum_weights=cum_weights, k=count)
+    
     def generate_sequential_words(self, count):
         """Generate sequential words (worst case for some operations)."""
         return [f"word{i:06d}" for i in range(count)]
@@ -42,6 +202,191 @@ class TSTBenchmark:
             words.append(f"{base}{suffix}")
         return words
     
+    def generate_url_words(self, count):
+        """Generate URL-like keys: few hosts, shared path prefixes, unique tails."""
+        hosts = [f"https://www.{''.join(random.choices(string.ascii_lowercase, k=8))}.com" for _ in range(20)]
+        sections = ["/products/", "/blog/posts/", "/docs/reference/", "/users/profile/"]
+        return [f"{random.choice(hosts)}{random.choice(sections)}"
+                f"{''.join(random.choices(string.ascii_lowercase + string.digits, k=random.randint(6, 16)))}"
+                for _ in range(count)]
+    
+    def _unique_keys(self, count, generate_one):
+        """count distinct keys from a generator, in a seeded order independent of the hash seed."""
+        keys = set()
+        while len(keys) < count:
+            keys.add(generate_one())
+        keys = sorted(keys)
+        random.shuffle(keys)
+        return keys
+    
+    def generate_vocabulary_words(self, count):
+        """Generate natural-language-like words: syllables, common endings and a Zipf-shaped length."""
+        onsets = ["", "b", "c", "d", "f", "g", "h", "l", "m", "n", "p", "r", "s", "t", "v", "w",
+                  "br", "ch", "cl", "dr", "fl", "gr", "pl", "pr", "sh", "sp", "st", "th", "tr"]
+        vowels = ["a", "e", "i", "o", "u", "ai", "ea", "ee", "ou", "io"]
+        codas = ["", "", "", "n", "r", "s", "t", "l", "m", "nd", "ng", "st", "ck"]
+        endings = ["", "", "", "s", "ed", "ing", "er", "ly", "tion", "ness", "able", "ment"]
+        syllable_counts = [1, 2, 3, 4, 5]
+        syllable_weights = [25, 40, 22, 9, 4]
+        
+        def word():
+            syllables = random.choices(syllable_counts, syllable_weights)[0]
+            return ''.join(random.choice(onsets) + random.choice(vowels) + random.choice(codas)
+                           for _ in range(syllables)) + random.choice(endings)
+        
+        return self._unique_keys(count, word)
+    
+    def generate_sku_words(self, count):
+        """Generate product SKUs: a handful of long brand/category prefixes and serial tails."""
+        brands = ["acme", "globex", "initech", "umbrella", "hooli", "stark", "wayne", "wonka"]
+        categories = ["elec-tv", "elec-audio", "elec-phone", "home-kitchen", "home-garden",
+                      "toys-outdoor", "apparel-men", "apparel-women", "sports-bike", "office-paper"]
+        variants = ["blk", "wht", "red", "blu", "grn", "xs", "s", "m", "l", "xl"]
+        serials = iter(range(count * 10)) # strictly increasing, so every key is distinct
+        
+        def sku():
+            return (f"{random.choice(brands)}-{random.choice(categories)}-{random.randint(1, 40):03d}-"
+                    f"{next(serials):08d}-{random.choice(variants)}")
+        
+        return self._unique_keys(count, sku)
+    
+    def generate_unicode_words(self, count):
+        """Generate lowercase terms in accented Latin, Greek, Cyrillic, CJK and Hangul scripts."""
+        scripts = [
+            (string.ascii_lowercase + "àáâäãåçèéêëìíîïñòóôöõøùúûüýÿßœæ", 3, 12, 40),
+            ("αβγδεζηθικλμνξοπρστυφχψω", 3, 10, 15),
+            ("абвгдежзийклмнопрстуфхцчшщъыьэюя", 3, 12, 20),
+            (''.join(chr(code) for code in range(0x4e00, 0x4e00 + 500)), 1, 4, 15),
+            (''.join(chr(code) for code in range(0xac00, 0xac00 + 300)), 1, 5, 10)
+        ]
+        weights = [script[3] for script in scripts]
+        
+        def term():
+            alphabet, shortest, longest, _ = random.choices(scripts, weights)[0]
+            return ''.join(random.choices(alphabet, k=random.randint(shortest, longest)))
+        
+        return self._unique_keys(count, term)
+    
+    def _retained_memory(self, build):
+        """Bytes still allocated by build's result after it returns, in its own untimed pass."""
+        gc.collect()
+        tracemalloc.start()
+        try:
+            structure = build()
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del structure
+        return current
+    
+    def _peak_memory(self, build):
+        """Peak traced allocation in bytes while running build, in its own untimed pass."""
+        gc.collect()
+        tracemalloc.start()
+        try:
+            structure = build()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del structure
+        return peak
+    
+    def _repeat(self, run, repeats, warmup):
+        """Time run after warmup calls, with the collector off like timeit."""
+        for _ in range(warmup):
+            run()
+        times = []
+        for _ in range(repeats):
+            gc.collect()
+            gc.disable()
+            try:
+                start_time = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start_time)
+            finally:
+                gc.enable()
+        return summarize(times)
+    
+    def _harness_words(self, seed, scenario, size):
+        """Dataset of a harness scenario, identical across runs with the same seed."""
+        random.seed(f"{seed}:{scenario}:{size}")
+        words = sorted(set(self.generate_random_words(size))) #set order varies with the hash seed
+        if scenario == 'random':
+            random.shuffle(words)
+        return words
+    
+    def run_harness(self, sizes=[1000, 10000, 100000], repeats=5, warmup=1, output="benchmark_results.json"):
+        """
+        Reproducible insertion and search timings written as JSON.
+        
+        Each scenario builds a tree from a seeded dataset: random inserts
+        words in random order, worst_case inserts them sorted and
+        best_case builds a balanced tree with from_iterable. Timings are
+        the median of repeats runs after warmup runs; memory is traced
+        in a separate pass so it doesn't slow the timed runs.
+        
+        Args:
+            sizes (list): Dataset sizes
+            repeats (int): Timed runs per measurement
+            warmup (int): Untimed runs before them
+            output (str): Path of the results file, None to skip writing
+            
+        Returns:
+            dict: Results keyed by scenario, plus a 'meta' entry
+        """
+        seed = 0 if self.seed is None else self.seed #the harness is always reproducible
+        print(f"Running benchmark harness (seed {seed}, {repeats} repeats, {warmup} warmup)...")
+        
+        builders = {
+            'random': self._build_by_insert,
+            'worst_case': self._build_by_insert,
+            'best_case': lambda words: TernarySearchTree.from_iterable(words, presorted=True)
+        }
+        data = {
+            'meta': {
+                'schema_version': RESULTS_SCHEMA_VERSION,
+                'seed': seed,
+                'repeats': repeats,
+                'warmup': warmup,
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'machine': platform.machine(),
+                'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S")
+            }
+        }
+        
+        for scenario in HARNESS_SCENARIOS:
+            build = builders[scenario]
+            data[scenario] = []
+            for size in sizes:
+                words = self._harness_words(seed, scenario, size)
+                queries = list(words)
+                random.shuffle(queries)
+                
+                insertion = self._repeat(lambda: build(words), repeats, warmup)
+                tst = build(words)
+                insertion['tree_height'] = tst.height()
+                search = self._repeat(lambda: [tst.search(word) for word in queries], repeats, warmup)
+                peak = self._peak_memory(lambda: build(words))
+                
+                data[scenario].append({
+                    'size': len(words),
+                    'insertion': insertion,
+                    'search': search,
+                    'memory': {'peak_mb': peak / 1024 / 1024}
+                })
+                print(f"  {scenario:10s} {len(words):8d} words - insert {insertion['total_time']:.4f}s "
+                      f"(IQR {insertion['iqr']:.4f}s), search {search['total_time']:.4f}s "
+                      f"(IQR {search['iqr']:.4f}s), height {insertion['tree_height']}, "
+                      f"{peak / 1024 / 1024:.2f}MB")
+        
+        self.results['harness'] = data
+        if output is not None:
+            with open(output, "w") as f:
+                json.dump(data, f, indent=2)
+            print(f"Results written to {output}")
+        return data
+    
     def benchmark_insert_performance(self, word_counts=[100, 500, 1000, 2000, 5000, 10000]):
         """Benchmark insert operation performance scaling."""
         print("Benchmarking insert performance...")
@@ -55,11 +400,8 @@ class TSTBenchmark:
             # Generate test data
             words = self.generate_random_words(count)
             
-            # Measure memory before
-            tracemalloc.start()
-            gc.collect()
-            
             # Create TST and measure insert time
+            gc.collect()
             tst = TernarySearchTree()
             start_time = time.perf_counter()
             
@@ -69,9 +411,8 @@ class TSTBenchmark:
             end_time = time.perf_counter()
             insert_time = end_time - start_time
             
-            # Measure memory after
-            current, peak = tracemalloc.get_traced_memory()
-            tracemalloc.stop()
+            # Measure memory in a separate pass, tracing slows the timed one down
+            peak = self._peak_memory(lambda: self._build_by_insert(words))
             
             insert_times.append(insert_time)
             memory_usage.append(peak / 1024 / 1024)  # Convert to MB
@@ -85,6 +426,36 @@ class TSTBenchmark:
         
         return word_counts, insert_times, memory_usage
     
+    def benchmark_insert_scaling(self, word_counts=[1000, 10000, 100000, 1000000]):
+        """Benchmark insert throughput (words/sec) over several orders of magnitude."""
+        print("Benchmarking insert throughput scaling...")
+        
+        rates = []
+        
+        for count in word_counts:
+            print(f"  Testing with {count} words...")
+            
+            # Longer words so the requested count is reachable without duplicates
+            words = self.generate_random_words(count, min_length=6, max_length=12)
+            
+            tst = TernarySearchTree()
+            start_time = time.perf_counter()
+            
+            for word in words:
+                tst.insert(word)
+            
+            insert_time = time.perf_counter() - start_time
+            rate = len(words) / insert_time if insert_time > 0 else float('inf')
+            rates.append(rate)
+            
+            # Store results
+            self.results['insert_scaling_counts'].append(len(words))
+            self.results['insert_scaling_rates'].append(rate)
+            
+            print(f"    Time: {insert_time:.4f}s ({rate:.0f} words/sec)")
+        
+        return word_counts, rates
+    
     def benchmark_search_performance(self, word_counts=[100, 500, 1000, 2000, 5000, 10000]):
         """Benchmark search operation performance scaling."""
         print("Benchmarking search performance...")
@@ -148,11 +519,1023 @@ class TSTBenchmark:
                 tst.search(word)
             search_time = time.perf_counter() - start_time
             
-            # Store results (height calls removed)
+            # Depth from a counted rebuild, the timed tree stays uninstrumented
+            counted = TernarySearchTree(stats=True)
+            for word in words:
+                counted.insert(word)
+            for word in words[:100]:
+                counted.search(word)
+            stats = counted.stats()
+            
+            # Store results
             self.results[f'worst_case_{scenario_name}_insert'] = insert_time
             self.results[f'worst_case_{scenario_name}_search'] = search_time
+            self.results[f'worst_case_{scenario_name}_depth'] = stats['max_depth']
+            
+            print(f"    Insert: {insert_time:.4f}s, Search: {search_time:.4f}s, Max depth: {stats['max_depth']}, "
+                  f"Nodes per search: {stats['search']['visits'] / stats['search']['count']:.1f}")
+    
+    def benchmark_parallel_build(self, word_count=1000000, worker_counts=[1, 2, 4]):
+        """Build time of the sharded multi-process build against from_iterable, per core count."""
+        print(f"Benchmarking parallel build ({word_count} words, {os.cpu_count()} cores available)...")
+        
+        words = self.generate_random_words(word_count, min_length=6, max_length=12)
+        gc.collect()
+        start_time = time.perf_counter()
+        tst = TernarySearchTree.from_iterable(words)
+        serial_time = time.perf_counter() - start_time
+        del tst
+        print(f"  from_iterable: {serial_time:.2f}s")
+        
+        results = {'cores': os.cpu_count(), 'serial_time': serial_time, 'workers': [], 'times': [], 'speedups': []}
+        for workers in worker_counts:
+            gc.collect()
+            start_time = time.perf_counter()
+            tst = TernarySearchTree.from_iterable_parallel(words, workers=workers)
+            build_time = time.perf_counter() - start_time
+            del tst
+            results['workers'].append(workers)
+            results['times'].append(build_time)
+            results['speedups'].append(serial_time / build_time)
+            print(f"  {workers} workers: {build_time:.2f}s ({serial_time / build_time:.2f}x)")
+        
+        self.results['parallel_build'] = results
+    
+    def benchmark_stats_overhead(self, word_count=100000):
+        """Cost of the operation counters, and of reading them against a height() walk."""
+        print(f"Benchmarking stats mode overhead ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count)
+        queries = random.sample(words, len(words))
+        results = {}
+        
+        for mode, stats in [('plain', False), ('stats', True)]:
+            gc.collect()
+            tst = TernarySearchTree(stats=stats)
+            start_time = time.perf_counter()
+            for word in words:
+                tst.insert(word)
+            insert_time = time.perf_counter() - start_time
             
-            print(f"    Insert: {insert_time:.4f}s, Search: {search_time:.4f}s")
+            start_time = time.perf_counter()
+            for word in queries:
+                tst.search(word)
+            search_time = time.perf_counter() - start_time
+            
+            results[mode] = {'insert_us': insert_time / len(words) * 1e6,
+                             'search_us': search_time / len(queries) * 1e6}
+            print(f"  {mode:5s} - Insert: {results[mode]['insert_us']:.2f}us, "
+                  f"Search: {results[mode]['search_us']:.2f}us")
+        
+        start_time = time.perf_counter()
+        snapshot = tst.stats()
+        results['stats_call_us'] = (time.perf_counter() - start_time) * 1e6
+        start_time = time.perf_counter()
+        height = tst.height()
+        results['height_call_us'] = (time.perf_counter() - start_time) * 1e6
+        results['max_depth'] = snapshot['max_depth']
+        results['height'] = height
+        
+        self.results['stats_overhead'] = results
+        print(f"  stats(): {results['stats_call_us']:.0f}us (max depth {snapshot['max_depth']}), "
+              f"height(): {results['height_call_us']:.0f}us (height {height})")
+    
+    def benchmark_recursive_vs_iterative(self, word_count=100000, long_key_length=10000,
+                                         sorted_count=1000000):
+        """Compare the iterative tree engine with the original recursive one."""
+        print("Benchmarking iterative vs recursive traversal...")
+        
+        long_keys = [''.join(random.choices(string.ascii_lowercase, k=long_key_length))
+                     for _ in range(10)]
+        scenarios = {
+            'random': self.generate_random_words(word_count),
+            'long_keys': long_keys,
+            'sorted': sorted(self.generate_random_words(sorted_count, min_length=6, max_length=12)),
+        }
+        
+        for scenario_name, words in scenarios.items():
+            print(f"  Testing {scenario_name} scenario ({len(words)} words)...")
+            
+            for engine, tree_class in [('iterative', TernarySearchTree),
+                                       ('recursive', RecursiveTernarySearchTree)]:
+                tst = tree_class()
+                try:
+                    start_time = time.perf_counter()
+                    for word in words:
+                        tst.insert(word)
+                    insert_time = time.perf_counter() - start_time
+                    
+                    start_time = time.perf_counter()
+                    for word in words:
+                        tst.search(word)
+                    search_time = time.perf_counter() - start_time
+                except RecursionError:
+                    print(f"    {engine:9s} - RecursionError")
+                    self.results[f'engine_{scenario_name}_{engine}'] = None
+                    continue
+                
+                self.results[f'engine_{scenario_name}_{engine}'] = (insert_time, search_time)
+                print(f"    {engine:9s} - Insert: {insert_time:.4f}s, Search: {search_time:.4f}s")
+    
+    def benchmark_node_storage(self, word_count=1000000):
+        """Compare bytes per node of the object and array node storages."""
+        print(f"Benchmarking node storage ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count, min_length=6, max_length=12)
+        
+        for storage in ['node', 'array']:
+            gc.collect()
+            tracemalloc.start()
+            
+            tst = TernarySearchTree(storage=storage)
+            start_time = time.perf_counter()
+            for word in words:
+                tst.insert(word)
+            insert_time = time.perf_counter() - start_time
+            
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            
+            nodes = tst.node_count()
+            bytes_per_node = current / nodes
+            
+            self.results[f'storage_{storage}'] = {
+                'nodes': nodes,
+                'memory_mb': current / 1024 / 1024,
+                'bytes_per_node': bytes_per_node,
+                'insert_time': insert_time
+            }
+            
+            print(f"    {storage:5s} - Nodes: {nodes}, Memory: {current/1024/1024:.2f}MB, "
+                  f"{bytes_per_node:.1f} bytes/node, Insert: {insert_time:.4f}s")
+            del tst
+        
+        array_bytes = self.results['storage_array']['bytes_per_node']
+        reduction = self.results['storage_node']['bytes_per_node'] / array_bytes
+        # TernarySearchTree.Node also carries weight, max_weight and size, which the array storage doesn't
+        baseline = sys.getsizeof(LinkOnlyNode())
+        like_for_like = baseline / array_bytes
+        self.results['storage_reduction'] = reduction
+        self.results['storage_like_for_like'] = {'baseline_bytes': baseline, 'reduction': like_for_like}
+        verdict = 'met' if like_for_like >= STORAGE_REDUCTION_TARGET else 'not met'
+        print(f"  Array storage uses {reduction:.1f}x less memory per node than TernarySearchTree.Node")
+        print(f"  Against a {baseline}-byte node with the same fields: {like_for_like:.1f}x "
+              f"(target {STORAGE_REDUCTION_TARGET:.0f}x: {verdict})")
+    
+    def benchmark_word_iteration(self, word_count=1000000):
+        """Measure the memory no longer spent on a word list and the iteration throughput."""
+        print(f"Benchmarking word iteration ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count, min_length=6, max_length=12)
+        
+        gc.collect()
+        tracemalloc.start()
+        tst = TernarySearchTree.from_iterable(words)
+        tree_bytes, _ = tracemalloc.get_traced_memory()
+        words_list = [word.lower().strip() for word in tst] # what the removed words_list held
+        list_bytes = tracemalloc.get_traced_memory()[0] - tree_bytes
+        tracemalloc.stop()
+        del words_list
+        
+        start_time = time.perf_counter()
+        iterated = sum(1 for _ in tst)
+        iter_time = time.perf_counter() - start_time
+        
+        self.results['word_iteration'] = {
+            'words': iterated,
+            'tree_mb': tree_bytes / 1024 / 1024,
+            'saved_mb': list_bytes / 1024 / 1024,
+            'words_per_sec': iterated / iter_time
+        }
+        
+        stats = self.results['word_iteration']
+        print(f"  Tree: {stats['tree_mb']:.2f}MB, word list no longer stored: {stats['saved_mb']:.2f}MB "
+              f"({list_bytes / (tree_bytes + list_bytes):.1%} of the old footprint)")
+        print(f"  In-order iteration: {stats['words_per_sec']:.0f} words/sec")
+    
+    def benchmark_mapping(self, word_count=1000000, query_count=100000):
+        """Compare memory and lookup speed of term -> ID mappings."""
+        print(f"Benchmarking term -> ID mappings ({word_count} words)...")
+        
+        words = list(set(self.generate_random_words(word_count, min_length=6, max_length=12)))
+        queries = random.sample(words, min(query_count, len(words)))
+        
+        def build_dict():
+            # Keys are normalized copies so the dict owns its strings, like a loaded dictionary would
+            return {word.lower(): term_id for term_id, word in enumerate(words)}
+        
+        def build_tst_and_dict():
+            tst = TernarySearchTree.from_iterable(words)
+            return tst, build_dict()
+        
+        def build_map():
+            mapping = TernarySearchMap(typecode='q')
+            for term_id, word in enumerate(words):
+                mapping[word] = term_id
+            return mapping
+        
+        lookups = {
+            'dict': lambda ids: [ids[word] for word in queries],
+            'tst+dict': lambda pair: [pair[1][word] for word in queries if pair[0].search(word)],
+            'map': lambda mapping: [mapping[word] for word in queries]
+        }
+        
+        for name, build in [('dict', build_dict), ('tst+dict', build_tst_and_dict), ('map', build_map)]:
+            gc.collect()
+            tracemalloc.start()
+            structure = build()
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            
+            start_time = time.perf_counter()
+            lookups[name](structure)
+            lookup_time = time.perf_counter() - start_time
+            
+            self.results[f'mapping_{name}'] = {
+                'memory_mb': current / 1024 / 1024,
+                'lookup_us': lookup_time / len(queries) * 1e6
+            }
+            print(f"    {name:8s} - Memory: {current/1024/1024:.2f}MB, "
+                  f"Lookup: {lookup_time / len(queries) * 1e6:.2f}us")
+            del structure
+    
+    def benchmark_radix_storage(self, word_count=100000):
+        """Compare node count, memory and search time of plain and path-compressed nodes."""
+        print(f"Benchmarking path-compressed nodes ({word_count} words)...")
+        
+        datasets = {
+            'urls': self.generate_url_words(word_count),
+            'long_prefix': self.generate_similar_words(word_count, "commonprefix")
+        }
+        
+        for dataset, words in datasets.items():
+            print(f"  {dataset}:")
+            for storage in ['node', 'radix']:
+                gc.collect()
+                tracemalloc.start()
+                tst = TernarySearchTree.from_iterable(words, storage=storage)
+                current, _ = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                
+                start_time = time.perf_counter()
+                for word in words:
+                    tst.search(word)
+                search_time = time.perf_counter() - start_time
+                
+                self.results[f'radix_{dataset}_{storage}'] = {
+                    'nodes': tst.node_count(),
+                    'memory_mb': current / 1024 / 1024,
+                    'search_us': search_time / len(words) * 1e6
+                }
+                stats = self.results[f'radix_{dataset}_{storage}']
+                print(f"    {storage:5s} - Nodes: {stats['nodes']}, Memory: {stats['memory_mb']:.2f}MB, "
+                      f"Search: {stats['search_us']:.2f}us")
+                del tst
+    
+    def benchmark_file_loading(self, word_count=1000000):
+        """Throughput of streaming a word file into a tree against reading it whole and inserting in a loop."""
+        print(f"Benchmarking file loading ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count)
+        text = "\n".join(words).encode("utf-8")
+        
+        with tempfile.TemporaryDirectory() as directory:
+            plain = os.path.join(directory, "words.txt")
+            compressed = plain + ".gz"
+            with open(plain, "wb") as f:
+                f.write(text)
+            with gzip.open(compressed, "wb", compresslevel=6) as f:
+                f.write(text)
+            
+            def read_and_insert(path):
+                start_time = time.perf_counter()
+                tst = TernarySearchTree()
+                with open(path) as f:
+                    for word in f.read().splitlines():
+                        tst.insert(word)
+                elapsed = time.perf_counter() - start_time
+                return {'seconds': elapsed, 'words_per_sec': len(words) / elapsed,
+                        'bytes_per_sec': os.path.getsize(path) / elapsed}
+            
+            runs = {
+                'read + insert loop': lambda: read_and_insert(plain),
+                'streamed, shuffled': lambda: load_file(TernarySearchTree(), plain),
+                'streamed, sorted': lambda: load_file(TernarySearchTree(), plain, order="sorted"),
+                'streamed gzip, shuffled': lambda: load_file(TernarySearchTree(), compressed)
+            }
+            results = {}
+            for name, run in runs.items():
+                gc.collect()
+                stats = run()
+                results[name] = {key: stats[key] for key in ('seconds', 'words_per_sec', 'bytes_per_sec')}
+                print(f"  {name:22s} - {stats['seconds']:.2f}s, {stats['words_per_sec']:.0f} words/sec, "
+                      f"{stats['bytes_per_sec'] / 1024 / 1024:.1f}MB/sec")
+        
+        self.results['file_loading'] = results
+    
+    def benchmark_prefix_index(self, word_count=200000, query_count=200000):
+        """Measure search depth and latency with a one- or two-character prefix index."""
+        print(f"Benchmarking prefix index ({word_count} words)...")
+        
+        letters = string.ascii_lowercase
+        skew = [1 / (rank + 1) for rank in range(len(letters))] # Zipf-like first letters, as in natural text
+        datasets = {
+            'random': self.generate_random_words(word_count),
+            'skewed': [random.choices(letters, weights=skew)[0] + word
+                       for word in self.generate_random_words(word_count, min_length=2, max_length=9)]
+        }
+        
+        for dataset, words in datasets.items():
+            queries = self.generate_zipf_queries(words, query_count)
+            print(f"  {dataset}:")
+            for prefix_index in [0, 1, 2]:
+                tst = TernarySearchTree.from_iterable(words, prefix_index=prefix_index)
+                
+                start_time = time.perf_counter()
+                for word in queries:
+                    tst.search(word)
+                search_time = time.perf_counter() - start_time
+                
+                self.results[f'prefix_index_{dataset}_{prefix_index}'] = {
+                    'average_depth': tst.average_depth(),
+                    'search_us': search_time / len(queries) * 1e6
+                }
+                stats = self.results[f'prefix_index_{dataset}_{prefix_index}']
+                print(f"    prefix_index={prefix_index} - Average depth: {stats['average_depth']:.2f}, "
+                      f"Search: {stats['search_us']:.2f}us")
+    
+    def benchmark_rebalance(self, word_count=100000):
+        """Search throughput of worst-case insertion orders before and after rebalance()."""
+        print(f"Benchmarking rebalance ({word_count} words)...")
+        
+        scenarios = {
+            'sequential': self.generate_sequential_words(word_count),
+            'similar_prefixes': sorted(self.generate_similar_words(word_count, "commonprefix")),
+            'reverse_sorted': sorted(self.generate_random_words(word_count), reverse=True)
+        }
+        
+        for scenario_name, words in scenarios.items():
+            queries = random.sample(words, min(50000, len(words)))
+            
+            def throughput(tst):
+                start_time = time.perf_counter()
+                for word in queries:
+                    tst.search(word)
+                return len(queries) / (time.perf_counter() - start_time)
+            
+            tst = TernarySearchTree()
+            for word in words:
+                tst.insert(word)
+            before = throughput(tst)
+            depth_before = tst.average_depth()
+            
+            start_time = time.perf_counter()
+            tst.rebalance()
+            rebalance_time = time.perf_counter() - start_time
+            after = throughput(tst)
+            
+            auto = TernarySearchTree(rebalance_factor=2)
+            start_time = time.perf_counter()
+            for word in words:
+                auto.insert(word)
+            auto_insert_time = time.perf_counter() - start_time
+            
+            self.results[f'rebalance_{scenario_name}'] = {
+                'depth_before': depth_before,
+                'depth_after': tst.average_depth(),
+                'depth_auto': auto.average_depth(),
+                'search_before': before,
+                'search_after': after,
+                'search_auto': throughput(auto),
+                'rebalance_time': rebalance_time,
+                'auto_insert_time': auto_insert_time
+            }
+            stats = self.results[f'rebalance_{scenario_name}']
+            print(f"  {scenario_name}: depth {stats['depth_before']:.1f} -> {stats['depth_after']:.1f} "
+                  f"(auto {stats['depth_auto']:.1f}), search {before:.0f} -> {after:.0f} words/sec "
+                  f"(auto {stats['search_auto']:.0f}), rebalance {rebalance_time:.3f}s")
+    
+    def benchmark_concurrent_reads(self, word_count=100000, reader_threads=4, duration=2.0,
+                                   writes_per_sec=1000):
+        """Read throughput of the copy-on-write tree with and without a steady writer."""
+        gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+        print(f"Benchmarking concurrent reads ({word_count} words, {reader_threads} readers, "
+              f"GIL {'enabled' if gil else 'disabled'})...")
+        
+        words = self.generate_random_words(word_count)
+        queries = random.sample(words, min(10000, len(words)))
+        tst = ConcurrentTernarySearchTree.from_iterable(words)
+        
+        def run(with_writer):
+            done = threading.Event()
+            counts = [0] * reader_threads
+            writes = [0]
+            
+            def reader(slot):
+                count = 0
+                while not done.is_set():
+                    for word in queries[:100]:
+                        tst.search(word)
+                    count += 100
+                counts[slot] = count
+            
+            def writer():
+                i = 0
+                while not done.is_set():
+                    tst.insert(f"update{i % 1000}")
+                    tst.delete(f"update{(i + 500) % 1000}")
+                    writes[0] += 2
+                    i += 1
+                    time.sleep(2 / writes_per_sec)
+            
+            threads = [threading.Thread(target=reader, args=(slot,)) for slot in range(reader_threads)]
+            if with_writer:
+                threads.append(threading.Thread(target=writer))
+            for thread in threads:
+                thread.start()
+            time.sleep(duration)
+            done.set()
+            for thread in threads:
+                thread.join()
+            return sum(counts) / duration, writes[0] / duration
+        
+        idle_reads, _ = run(with_writer=False)
+        busy_reads, write_rate = run(with_writer=True)
+        
+        self.results['concurrent_reads'] = {
+            'gil': gil,
+            'readers': reader_threads,
+            'idle_reads_per_sec': idle_reads,
+            'busy_reads_per_sec': busy_reads,
+            'writes_per_sec': write_rate
+        }
+        print(f"  No writer:  {idle_reads:.0f} reads/sec")
+        print(f"  Writer ({write_rate:.0f} writes/sec): {busy_reads:.0f} reads/sec "
+              f"({busy_reads / idle_reads:.1%} of the idle throughput)")
+    
+    def benchmark_async_front_end(self, word_count=100000, request_count=20000,
+                                  concurrencies=[1, 10, 100, 1000]):
+        """Latency of a mixed query load through the asyncio front-end versus direct calls."""
+        print(f"Benchmarking asyncio front-end ({word_count} words, {request_count} requests)...")
+        
+        words = self.generate_random_words(word_count)
+        tst = TernarySearchTree.from_iterable(words)
+        # 80% lookups, 15% autocomplete and 5% one-letter prefix enumerations
+        requests = []
+        for word in self.generate_zipf_queries(words, request_count):
+            roll = random.random()
+            if roll < 0.8:
+                requests.append(('search', word))
+            elif roll < 0.95:
+                requests.append(('autocomplete', word[:2]))
+            else:
+                requests.append(('prefix', word[:1]))
+        
+        async def direct(kind, argument):
+            if kind == 'search':
+                tst.search(argument)
+            elif kind == 'autocomplete':
+                tst.autocomplete(argument, 10)
+            else:
+                list(tst.keys_with_prefix(argument))
+            await asyncio.sleep(0)
+        
+        front = AsyncTernarySearchTree(tst)
+        
+        async def through_front(kind, argument):
+            if kind == 'search':
+                await front.search(argument)
+            elif kind == 'autocomplete':
+                await front.autocomplete(argument, 10)
+            else:
+                await front.keys_with_prefix(argument)
+        
+        async def load(query, concurrency):
+            latencies = []
+            lag = [0.0]
+            done = asyncio.Event()
+            
+            async def heartbeat():
+                while not done.is_set():
+                    expected = time.perf_counter() + 0.001
+                    await asyncio.sleep(0.001)
+                    lag[0] = max(lag[0], time.perf_counter() - expected)
+            
+            async def client(share):
+                for kind, argument in share:
+                    start_time = time.perf_counter()
+                    await query(kind, argument)
+                    latencies.append(time.perf_counter() - start_time)
+            
+            beat = asyncio.ensure_future(heartbeat())
+            start_time = time.perf_counter()
+            await asyncio.gather(*(client(requests[i::concurrency]) for i in range(concurrency)))
+            elapsed = time.perf_counter() - start_time
+            done.set()
+            await beat
+            
+            latencies.sort()
+            return {
+                'p50_ms': latencies[len(latencies) // 2] * 1e3,
+                'p99_ms': latencies[int(len(latencies) * 0.99)] * 1e3,
+                'requests_per_sec': len(latencies) / elapsed,
+                'max_lag_ms': lag[0] * 1e3
+            }
+        
+        results = {'concurrency': concurrencies, 'direct': [], 'async': []}
+        for concurrency in concurrencies:
+            results['direct'].append(asyncio.run(load(direct, concurrency)))
+            results['async'].append(asyncio.run(load(through_front, concurrency)))
+            for name in ('direct', 'async'):
+                stats = results[name][-1]
+                print(f"  {concurrency:5d} clients, {name:6s} - p50: {stats['p50_ms']:.2f}ms, "
+                      f"p99: {stats['p99_ms']:.2f}ms, {stats['requests_per_sec']:.0f} req/sec, "
+                      f"max loop lag: {stats['max_lag_ms']:.2f}ms")
+        
+        self.results['async_front_end'] = results
+    
+    def benchmark_balanced_build(self, word_count=100000):
+        """Compare search throughput of loop-built and bulk-built trees."""
+        print(f"Benchmarking balanced bulk build ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count)
+        sorted_words = sorted(words)
+        queries = random.sample(words, len(words))
+        
+        builders = {
+            'random_insert': lambda: self._build_by_insert(words),
+            'sorted_insert': lambda: self._build_by_insert(sorted_words),
+            'sorted_bulk': lambda: TernarySearchTree.from_iterable(sorted_words, presorted=True),
+        }
+        
+        for name, build in builders.items():
+            start_time = time.perf_counter()
+            tst = build()
+            build_time = time.perf_counter() - start_time
+            
+            start_time = time.perf_counter()
+            for word in queries:
+                tst.search(word)
+            search_time = time.perf_counter() - start_time
+            rate = len(queries) / search_time
+            
+            self.results[f'balanced_{name}'] = {
+                'build_time': build_time,
+                'height': tst.height(),
+                'average_depth': tst.average_depth(),
+                'search_rate': rate
+            }
+            
+            print(f"    {name:13s} - Build: {build_time:.4f}s, Height: {tst.height()}, "
+                  f"Avg depth: {tst.average_depth():.2f}, Search: {rate:.0f} searches/sec")
+    
+    def _build_by_insert(self, words):
+        """Build a tree with a plain insert loop."""
+        tst = TernarySearchTree()
+        for word in words:
+            tst.insert(word)
+        return tst
+    
+    def benchmark_prefix_latency(self, word_count=1000000, query_count=1000, k=10):
+        """Measure autocomplete latency against a linear scan of the word list."""
+        print(f"Benchmarking prefix query latency ({word_count} words, k={k})...")
+        
+        words = self.generate_random_words(word_count, min_length=6, max_length=12)
+        tst = TernarySearchTree.from_iterable(words)
+        sorted_words = sorted(words)
+        
+        prefixes = [word[:random.randint(1, 4)] for word in random.sample(words, query_count)]
+        
+        latencies = []
+        for prefix in prefixes:
+            start_time = time.perf_counter()
+            tst.autocomplete(prefix, k)
+            latencies.append(time.perf_counter() - start_time)
+        
+        # Linear scan baseline on a sample, it is orders of magnitude slower
+        scan_latencies = []
+        for prefix in prefixes[:20]:
+            start_time = time.perf_counter()
+            [word for word in sorted_words if word.startswith(prefix)][:k]
+            scan_latencies.append(time.perf_counter() - start_time)
+        
+        latencies.sort()
+        scan_latencies.sort()
+        self.results['prefix_latency'] = {
+            'words': len(words),
+            'k': k,
+            'p50_us': latencies[len(latencies) // 2] * 1e6,
+            'p99_us': latencies[int(len(latencies) * 0.99)] * 1e6,
+            'scan_p50_us': scan_latencies[len(scan_latencies) // 2] * 1e6
+        }
+        
+        stats = self.results['prefix_latency']
+        print(f"  autocomplete - p50: {stats['p50_us']:.1f}us, p99: {stats['p99_us']:.1f}us")
+        print(f"  linear scan  - p50: {stats['scan_p50_us']:.1f}us")
+    
+    def benchmark_weighted_autocomplete(self, word_count=200000, query_count=500, k=10):
+        """Compare pruned top-k autocomplete with collecting and sorting all completions."""
+        print(f"Benchmarking weighted top-{k} autocomplete ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count, min_length=6, max_length=12)
+        weights = {word: int(random.paretovariate(1.2) * 100) for word in words}
+        
+        tst = TernarySearchTree()
+        for word in words:
+            tst.insert(word, weights[word])
+        
+        prefixes = [word[:random.randint(1, 3)] for word in random.sample(words, query_count)]
+        
+        start_time = time.perf_counter()
+        for prefix in prefixes:
+            tst.autocomplete(prefix, k)
+        topk_time = time.perf_counter() - start_time
+        
+        start_time = time.perf_counter()
+        for prefix in prefixes:
+            sorted(tst.keys_with_prefix(prefix), key=lambda word: (-weights[word], word))[:k]
+        sort_time = time.perf_counter() - start_time
+        
+        self.results['weighted_autocomplete'] = {
+            'words': len(words),
+            'k': k,
+            'topk_us': topk_time / query_count * 1e6,
+            'sort_us': sort_time / query_count * 1e6
+        }
+        
+        stats = self.results['weighted_autocomplete']
+        print(f"  best-first top-k - {stats['topk_us']:.1f}us/query")
+        print(f"  collect and sort - {stats['sort_us']:.1f}us/query")
+    
+    def benchmark_batch_search(self, word_count=100000, batch_sizes=[10, 100, 1000, 10000, 100000]):
+        """Sweep batch sizes for search_many against a per-word search loop."""
+        print(f"Benchmarking batched search ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count)
+        tst = TernarySearchTree()
+        tst.insert_many(words)
+        queries = random.sample(words, len(words))
+        
+        # Best of several runs with the collector off, single runs are too noisy to compare
+        def loop():
+            for word in queries:
+                tst.search(word)
+        loop_time = self._repeat(loop, repeats=5, warmup=1)['min']
+        self.results['batch_loop_rate'] = len(queries) / loop_time
+        print(f"    per-word loop - {self.results['batch_loop_rate']:.0f} searches/sec")
+        
+        for batch_size in batch_sizes:
+            def batched():
+                for i in range(0, len(queries), batch_size):
+                    tst.search_many(queries[i:i + batch_size])
+            batch_time = self._repeat(batched, repeats=5, warmup=1)['min']
+            rate = len(queries) / batch_time
+            
+            self.results['batch_sizes'].append(batch_size)
+            self.results['batch_rates'].append(rate)
+            print(f"    batch {batch_size:6d} - {rate:.0f} searches/sec")
+    
+    def benchmark_query_cache(self, word_count=100000, query_count=200000,
+                              cache_sizes=[0, 1000, 10000]):
+        """Measure the LRU query cache on a Zipf-distributed query stream."""
+        print(f"Benchmarking query cache ({word_count} words, {query_count} Zipf queries)...")
+        
+        words = self.generate_random_words(word_count)
+        queries = self.generate_zipf_queries(words, query_count)
+        prefixes = [query[:3] for query in queries]
+        
+        for cache_size in cache_sizes:
+            tst = TernarySearchTree(cache_size=cache_size)
+            tst.insert_many(words)
+            
+            start_time = time.perf_counter()
+            for word in queries:
+                tst.search(word)
+            search_time = time.perf_counter() - start_time
+            
+            start_time = time.perf_counter()
+            for prefix in prefixes:
+                tst.autocomplete(prefix, 10)
+            autocomplete_time = time.perf_counter() - start_time
+            
+            info = tst.cache_info()
+            hit_rate = info['hits'] / (info['hits'] + info['misses']) if info else 0.0
+            
+            self.results['cache_sizes'].append(cache_size)
+            self.results['cache_search_rates'].append(query_count / search_time)
+            self.results['cache_autocomplete_rates'].append(query_count / autocomplete_time)
+            self.results['cache_hit_rates'].append(hit_rate)
+            
+            print(f"    cache {cache_size:6d} - Search: {query_count / search_time:.0f}/sec, "
+                  f"Autocomplete: {query_count / autocomplete_time:.0f}/sec, Hit rate: {hit_rate:.1%}")
+    
+    def benchmark_snapshot(self, word_count=1000000, query_count=100000):
+        """Compare rebuilding a tree with loading a binary snapshot."""
+        print(f"Benchmarking snapshot load ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count, min_length=6, max_length=12)
+        queries = random.sample(words, min(query_count, len(words)))
+        
+        start_time = time.perf_counter()
+        tst = TernarySearchTree()
+        tst.insert_many(words)
+        rebuild_time = time.perf_counter() - start_time
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'words.tst')
+            start_time = time.perf_counter()
+            tst.save(path)
+            save_time = time.perf_counter() - start_time
+            file_mb = os.path.getsize(path) / 1024 / 1024
+            
+            timings = {'rebuild': rebuild_time}
+            for label, use_mmap in [('load_mmap', True), ('load_copy', False)]:
+                start_time = time.perf_counter()
+                loaded = TernarySearchTree.load(path, mmap=use_mmap)
+                timings[label] = time.perf_counter() - start_time
+                
+                start_time = time.perf_counter()
+                for word in queries:
+                    loaded.search(word)
+                timings[f'{label}_search_rate'] = len(queries) / (time.perf_counter() - start_time)
+                if use_mmap:
+                    loaded.close()
+        
+        start_time = time.perf_counter()
+        for word in queries:
+            tst.search(word)
+        timings['rebuild_search_rate'] = len(queries) / (time.perf_counter() - start_time)
+        
+        timings['save'] = save_time
+        timings['file_mb'] = file_mb
+        self.results['snapshot'] = timings
+        
+        print(f"  Rebuild: {rebuild_time:.4f}s, Save: {save_time:.4f}s ({file_mb:.1f}MB)")
+        print(f"  Load (mmap): {timings['load_mmap']:.6f}s, Load (copy): {timings['load_copy']:.4f}s")
+        print(f"  Search - rebuilt: {timings['rebuild_search_rate']:.0f}/sec, "
+              f"mmap: {timings['load_mmap_search_rate']:.0f}/sec, "
+              f"copy: {timings['load_copy_search_rate']:.0f}/sec")
+    
+    def benchmark_query_pool(self, word_count=200000, query_count=400000, worker_counts=[1, 2, 4]):
+        """Measure query throughput of the shared-memory process pool per worker count."""
+        print(f"Benchmarking shared-memory query pool ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count)
+        tst = TernarySearchTree.from_iterable(words)
+        queries = [random.choice(words) for _ in range(query_count)]
+        prefixes = [word[:2] for word in queries[:query_count // 10]]
+        
+        start_time = time.perf_counter()
+        tst.search_many(queries)
+        single_rate = query_count / (time.perf_counter() - start_time)
+        self.results['pool_single_rate'] = single_rate
+        print(f"    single process - {single_rate:.0f} searches/sec")
+        
+        for workers in worker_counts:
+            with QueryPool(tst, workers=workers) as pool:
+                pool.search_many(queries[:1000])  # Warm up the workers
+                
+                start_time = time.perf_counter()
+                pool.search_many(queries)
+                search_rate = query_count / (time.perf_counter() - start_time)
+                
+                start_time = time.perf_counter()
+                pool.autocomplete_many(prefixes, 10)
+                autocomplete_rate = len(prefixes) / (time.perf_counter() - start_time)
+            
+            self.results['pool_workers'].append(workers)
+            self.results['pool_search_rates'].append(search_rate)
+            self.results['pool_autocomplete_rates'].append(autocomplete_rate)
+            print(f"    {workers} workers - {search_rate:.0f} searches/sec, "
+                  f"{autocomplete_rate:.0f} autocompletes/sec")
+    
+    def benchmark_fuzzy_search(self, word_count=100000, query_count=100, max_distances=[1, 2]):
+        """Compare pruned near_matches with brute-force edit distance over all words."""
+        print(f"Benchmarking fuzzy search ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count)
+        tst = TernarySearchTree.from_iterable(words)
+        
+        # Misspell dictionary words with one random substitution
+        queries = []
+        for word in random.sample(words, query_count):
+            i = random.randrange(len(word))
+            queries.append(word[:i] + random.choice(string.ascii_lowercase) + word[i + 1:])
+        
+        for max_distance in max_distances:
+            start_time = time.perf_counter()
+            for query in queries:
+                tst.near_matches(query, max_distance)
+            tree_time = (time.perf_counter() - start_time) / len(queries)
+            
+            # Brute force is orders of magnitude slower, time a few queries
+            start_time = time.perf_counter()
+            for query in queries[:3]:
+                [word for word in words if levenshtein(query, word) <= max_distance]
+            brute_time = (time.perf_counter() - start_time) / 3
+            
+            self.results['fuzzy_distances'].append(max_distance)
+            self.results['fuzzy_tree_ms'].append(tree_time * 1000)
+            self.results['fuzzy_brute_ms'].append(brute_time * 1000)
+            print(f"    distance {max_distance} - tree: {tree_time * 1000:.2f}ms/query, "
+                  f"brute force: {brute_time * 1000:.2f}ms/query")
+    
+    def benchmark_pattern_match(self, word_count=100000,
+                                patterns=['abc*', 'a?c?e*', 'ab*', '?a*', 'c?t', '*ing', '*a*e', '*']):
+        """Measure match() latency against pattern selectivity."""
+        print(f"Benchmarking pattern match ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count)
+        tst = TernarySearchTree.from_iterable(words)
+        
+        for pattern in patterns:
+            start_time = time.perf_counter()
+            matches = sum(1 for _ in tst.match(pattern))
+            tree_time = time.perf_counter() - start_time
+            
+            start_time = time.perf_counter()
+            [word for word in words if fnmatch.fnmatchcase(word, pattern)]
+            scan_time = time.perf_counter() - start_time
+            
+            selectivity = matches / len(words)
+            self.results['pattern_match'].append((pattern, selectivity, tree_time, scan_time))
+            print(f"    {pattern:8s} - {matches:6d} matches ({selectivity:.2%}), "
+                  f"tree: {tree_time * 1000:.2f}ms, linear scan: {scan_time * 1000:.2f}ms")
+    
+    def benchmark_ordered_queries(self, word_count=1000000, query_count=1000, page_size=50):
+        """Measure rank/select and deep pagination against walking the sorted words."""
+        print(f"Benchmarking ordered queries ({word_count} words)...")
+        
+        words = self.generate_random_words(word_count, min_length=6, max_length=12)
+        tst = TernarySearchTree.from_iterable(words)
+        keys = random.sample(words, query_count)
+        offsets = [random.randrange(len(tst)) for _ in range(query_count)]
+        
+        start_time = time.perf_counter()
+        for key in keys:
+            tst.rank(key)
+        rank_time = time.perf_counter() - start_time
+        
+        start_time = time.perf_counter()
+        for offset in offsets:
+            tst.select(offset)
+        select_time = time.perf_counter() - start_time
+        
+        start_time = time.perf_counter()
+        for offset in offsets:
+            list(islice(tst.range(tst.select(offset)), page_size))
+        page_time = time.perf_counter() - start_time
+        
+        # Baseline: skip to the page by walking the sorted words, on a sample
+        sample = offsets[:10]
+        start_time = time.perf_counter()
+        for offset in sample:
+            list(islice(tst.range(), offset, offset + page_size))
+        walk_time = time.perf_counter() - start_time
+        
+        self.results['ordered_queries'] = {
+            'words': len(tst),
+            'page_size': page_size,
+            'rank_us': rank_time / query_count * 1e6,
+            'select_us': select_time / query_count * 1e6,
+            'page_us': page_time / query_count * 1e6,
+            'walk_page_us': walk_time / len(sample) * 1e6
+        }
+        
+        stats = self.results['ordered_queries']
+        print(f"  rank: {stats['rank_us']:.1f}us, select: {stats['select_us']:.1f}us")
+        print(f"  page of {page_size} via select + range: {stats['page_us']:.1f}us, "
+              f"via in-order walk: {stats['walk_page_us']:.1f}us")
+    
+    def benchmark_scaling(self, sizes=[10000, 100000, 1000000, 10000000], distributions=SCALING_DISTRIBUTIONS,
+                          query_count=100000, prefix_count=1000, fuzzy_count=20, scan_max_size=100000):
+        """
+        Insert, search, prefix, fuzzy and memory per key against set, dict and a sorted list.
+        
+        Each distribution is generated once at the largest size from a
+        fixed seed and every size takes a prefix of the shuffled keys.
+        Prefix queries ask for the first 10 completions; set and dict
+        answer them with a linear scan up to scan_max_size keys only.
+        The fuzzy baseline probes the set with every string one edit
+        away, the sorted list has no fuzzy query. Memory is the traced
+        size of a structure built from fresh key copies, in a separate
+        pass.
+        """
+        print(f"Benchmarking scaling to {max(sizes)} keys ({', '.join(distributions)})...")
+        
+        generators = {
+            'vocabulary': self.generate_vocabulary_words,
+            'urls': lambda count: self._unique_keys(count, lambda: self.generate_url_words(1)[0]),
+            'skus': self.generate_sku_words,
+            'unicode': self.generate_unicode_words
+        }
+        results = {'sizes': list(sizes)}
+        
+        for distribution in distributions:
+            random.seed(f"{0 if self.seed is None else self.seed}:scaling:{distribution}")
+            all_keys = generators[distribution](max(sizes))
+            alphabet = sorted(set(''.join(all_keys[:10000])))
+            results[distribution] = {structure: {metric: [] for metric in SCALING_METRICS}
+                                     for structure in SCALING_STRUCTURES}
+            print(f"  {distribution} (e.g. {all_keys[0]!r}):")
+            
+            for size in sizes:
+                keys = all_keys[:size]
+                queries = random.sample(keys, min(query_count, size))
+                prefixes = [key[:max(2, len(key) // 2)] for key in random.sample(keys, min(prefix_count, size))]
+                typos = []
+                for key in random.sample(keys, min(fuzzy_count, size)):
+                    position = random.randrange(len(key))
+                    typos.append(key[:position] + random.choice(alphabet) + key[position + 1:])
+                
+                def timed(run, count):
+                    gc.collect()
+                    start_time = time.perf_counter()
+                    structure = run()
+                    return structure, (time.perf_counter() - start_time) / count * 1e6
+                
+                def record(structure, **metrics):
+                    for metric in SCALING_METRICS:
+                        results[distribution][structure][metric].append(metrics.get(metric))
+                
+                # Ternary search tree
+                def build_tst(source=keys):
+                    tst = TernarySearchTree()
+                    for key in source:
+                        tst.insert(key)
+                    return tst
+                
+                tst, insert_us = timed(build_tst, size)
+                _, search_us = timed(lambda: [tst.search(key) for key in queries], len(queries))
+                _, prefix_us = timed(lambda: [list(tst.keys_with_prefix(prefix, 10)) for prefix in prefixes],
+                                     len(prefixes))
+                _, fuzzy_us = timed(lambda: [tst.near_matches(typo, 1) for typo in typos], len(typos))
+                del tst
+                record('tst', insert_us=insert_us, search_us=search_us, prefix_us=prefix_us, fuzzy_us=fuzzy_us,
+                       bytes_per_key=self._retained_memory(lambda: build_tst(key.lower() for key in keys)) / size)
+                
+                # Built-in set and dict: no ordered queries, linear scan and edit probing instead
+                def build_set():
+                    python_set = set()
+                    for key in keys:
+                        python_set.add(key)
+                    return python_set
+                
+                python_set, insert_us = timed(build_set, size)
+                _, search_us = timed(lambda: [key in python_set for key in queries], len(queries))
+                prefix_us = None
+                if size <= scan_max_size:
+                    _, prefix_us = timed(lambda: [[key for key in python_set if key.startswith(prefix)][:10]
+                                                  for prefix in prefixes[:100]], min(100, len(prefixes)))
+                _, fuzzy_us = timed(lambda: [[key for key in edits1(typo, alphabet) if key in python_set]
+                                             for typo in typos], len(typos))
+                del python_set
+                record('set', insert_us=insert_us, search_us=search_us, prefix_us=prefix_us, fuzzy_us=fuzzy_us,
+                       bytes_per_key=self._retained_memory(lambda: {key.lower() for key in keys}) / size)
+                
+                def build_dict():
+                    python_dict = {}
+                    for value, key in enumerate(keys):
+                        python_dict[key] = value
+                    return python_dict
+                
+                python_dict, insert_us = timed(build_dict, size)
+                _, search_us = timed(lambda: [key in python_dict for key in queries], len(queries))
+                del python_dict
+                record('dict', insert_us=insert_us, search_us=search_us,
+                       bytes_per_key=self._retained_memory(
+                           lambda: {key.lower(): value for value, key in enumerate(keys)}) / size)
+                
+                # Sorted list + bisect, built in bulk since insort is quadratic
+                sorted_keys, insert_us = timed(lambda: sorted(keys), size)
+                
+                def bisect_search():
+                    found = []
+                    for key in queries:
+                        i = bisect.bisect_left(sorted_keys, key)
+                        found.append(i < len(sorted_keys) and sorted_keys[i] == key)
+                    return found
+                
+                def bisect_prefix():
+                    matches = []
+                    for prefix in prefixes:
+                        i = bisect.bisect_left(sorted_keys, prefix)
+                        matches.append([key for key in islice(sorted_keys, i, i + 10) if key.startswith(prefix)])
+                    return matches
+                
+                _, search_us = timed(bisect_search, len(queries))
+                _, prefix_us = timed(bisect_prefix, len(prefixes))
+                del sorted_keys
+                record('sorted_list', insert_us=insert_us, search_us=search_us, prefix_us=prefix_us,
+                       bytes_per_key=self._retained_memory(lambda: sorted(key.lower() for key in keys)) / size)
+                
+                print(f"    {size} keys:")
+                for structure in SCALING_STRUCTURES:
+                    values = {metric: results[distribution][structure][metric][-1] for metric in SCALING_METRICS}
+                    print(f"      {structure:11s} - " + ", ".join(
+                        f"{metric}: {'n/a' if value is None else f'{value:.2f}'}" for metric, value in values.items()))
+        
+        self.results['scaling'] = results
     
     def compare_with_builtin_structures(self, word_count=5000):
         """Compare TST performance with Python's built-in data structures."""
@@ -215,6 +1598,11 @@ class TSTBenchmark:
         """Create performance visualization plots."""
         print("Creating performance plots...")
         
+        if 'scaling' in self.results:
+            self._create_scaling_plots()
+        if not any(key in self.results for key in ('insert_counts', 'search_counts', 'comparison')):
+            return
+        
         # Create subplots
         fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
         
@@ -268,6 +1656,40 @@ class TSTBenchmark:
         plt.savefig('tst_performance_analysis.png', dpi=300, bbox_inches='tight')
         print("  Saved performance plots to 'tst_performance_analysis.png'")
     
+    def _create_scaling_plots(self):
+        """One column per key distribution, one row per metric, log-log axes."""
+        results = self.results['scaling']
+        distributions = [name for name in SCALING_DISTRIBUTIONS if name in results]
+        labels = {'insert_us': 'Insert (us/key)', 'search_us': 'Search (us/query)',
+                  'prefix_us': 'Prefix top-10 (us/query)', 'fuzzy_us': 'Fuzzy d=1 (us/query)',
+                  'bytes_per_key': 'Memory (bytes/key)'}
+        
+        fig, axes = plt.subplots(len(SCALING_METRICS), len(distributions), squeeze=False,
+                                 figsize=(5 * len(distributions), 3.5 * len(SCALING_METRICS)))
+        for column, distribution in enumerate(distributions):
+            for row, metric in enumerate(SCALING_METRICS):
+                ax = axes[row][column]
+                for color, structure in enumerate(SCALING_STRUCTURES):
+                    points = [(size, value) for size, value in
+                              zip(results['sizes'], results[distribution][structure][metric]) if value is not None]
+                    if points:
+                        ax.plot(*zip(*points), 'o-', color=f'C{color}', label=structure) #same color in every panel
+                ax.set_xscale('log')
+                ax.set_yscale('log')
+                ax.grid(True, which='both', alpha=0.3)
+                if row == 0:
+                    ax.set_title(distribution)
+                if column == 0:
+                    ax.set_ylabel(labels[metric])
+                if row == len(SCALING_METRICS) - 1:
+                    ax.set_xlabel('Number of keys')
+                ax.legend(fontsize='small')
+        
+        plt.tight_layout()
+        plt.savefig('tst_scaling_analysis.png', dpi=150, bbox_inches='tight')
+        plt.close(fig)
+        print("  Saved scaling plots to 'tst_scaling_analysis.png'")
+    
     def generate_report(self):
         """Generate a comprehensive performance report."""
         print("\nGenerating performance report...")
@@ -287,6 +1709,16 @@ class TSTBenchmark:
                 report.append(f"  {count:5d} words: {time_taken:.4f}s ({rate:.0f} words/sec)")
             report.append("")
         
+        # Insert throughput scaling analysis
+        if 'insert_scaling_rates' in self.results:
+            report.append("INSERT THROUGHPUT SCALING:")
+            report.append("-" * 26)
+            for count, rate in zip(self.results['insert_scaling_counts'], self.results['insert_scaling_rates']):
+                report.append(f"  {count:7d} words: {rate:.0f} words/sec")
+            rates = self.results['insert_scaling_rates']
+            report.append(f"  Slowest/fastest ratio: {min(rates) / max(rates):.2f}")
+            report.append("")
+        
         # Search performance analysis
         if 'search_times' in self.results:
             report.append("SEARCH PERFORMANCE:")
@@ -309,6 +1741,284 @@ class TSTBenchmark:
                     report.append(f"  {scenario.replace('_', ' ').title()}:")
                     report.append(f"    Insert: {self.results[insert_key]:.4f}s")
                     report.append(f"    Search: {self.results[search_key]:.4f}s")
+                    depth_key = f'worst_case_{scenario}_depth'
+                    if depth_key in self.results:
+                        report.append(f"    Max depth: {self.results[depth_key]}")
+            report.append("")
+        
+        # Iterative vs recursive engine
+        engines = [key for key in self.results.keys() if key.startswith('engine_')]
+        if engines:
+            report.append("ITERATIVE VS RECURSIVE ENGINE:")
+            report.append("-" * 30)
+            for key in engines:
+                label = key[len('engine_'):]
+                timings = self.results[key]
+                if timings is None:
+                    report.append(f"  {label}: RecursionError")
+                else:
+                    report.append(f"  {label}: Insert: {timings[0]:.4f}s, Search: {timings[1]:.4f}s")
+            report.append("")
+        
+        # Node storage memory
+        if 'storage_reduction' in self.results:
+            report.append("NODE STORAGE MEMORY:")
+            report.append("-" * 20)
+            for storage in ['node', 'array']:
+                stats = self.results[f'storage_{storage}']
+                report.append(f"  {storage:5s} - {stats['nodes']} nodes, {stats['memory_mb']:.2f}MB, "
+                              f"{stats['bytes_per_node']:.1f} bytes/node")
+            report.append(f"  Reduction against TernarySearchTree.Node: {self.results['storage_reduction']:.1f}x")
+            like_for_like = self.results['storage_like_for_like']
+            verdict = 'met' if like_for_like['reduction'] >= STORAGE_REDUCTION_TARGET else 'not met'
+            report.append(f"  Reduction against a {like_for_like['baseline_bytes']}-byte node with the same fields: "
+                          f"{like_for_like['reduction']:.1f}x (target {STORAGE_REDUCTION_TARGET:.0f}x: {verdict})")
+            report.append("")
+        
+        # Balanced bulk build
+        balanced = [key for key in self.results.keys() if key.startswith('balanced_')]
+        if balanced:
+            report.append("BALANCED BULK BUILD:")
+            report.append("-" * 20)
+            for key in balanced:
+                stats = self.results[key]
+                report.append(f"  {key[len('balanced_'):]:13s} - Height: {stats['height']}, "
+                              f"Avg depth: {stats['average_depth']:.2f}, "
+                              f"Search: {stats['search_rate']:.0f} searches/sec")
+            report.append("")
+        
+        # Prefix query latency
+        if 'prefix_latency' in self.results:
+            stats = self.results['prefix_latency']
+            report.append("PREFIX QUERY LATENCY:")
+            report.append("-" * 21)
+            report.append(f"  {stats['words']} words, top {stats['k']} completions")
+            report.append(f"  autocomplete - p50: {stats['p50_us']:.1f}us, p99: {stats['p99_us']:.1f}us")
+            report.append(f"  linear scan  - p50: {stats['scan_p50_us']:.1f}us")
+            report.append("")
+        
+        # Weighted autocomplete
+        if 'weighted_autocomplete' in self.results:
+            stats = self.results['weighted_autocomplete']
+            report.append("WEIGHTED AUTOCOMPLETE:")
+            report.append("-" * 22)
+            report.append(f"  {stats['words']} words, top {stats['k']} completions")
+            report.append(f"  best-first top-k - {stats['topk_us']:.1f}us/query")
+            report.append(f"  collect and sort - {stats['sort_us']:.1f}us/query")
+            report.append("")
+        
+        # Batched search
+        if 'batch_rates' in self.results:
+            report.append("BATCHED SEARCH:")
+            report.append("-" * 15)
+            report.append(f"  per-word loop: {self.results['batch_loop_rate']:.0f} searches/sec")
+            for batch_size, rate in zip(self.results['batch_sizes'], self.results['batch_rates']):
+                report.append(f"  batch {batch_size:6d}: {rate:.0f} searches/sec")
+            report.append("")
+        
+        # Query cache
+        if 'cache_sizes' in self.results:
+            report.append("QUERY CACHE (ZIPF QUERIES):")
+            report.append("-" * 27)
+            for size, search_rate, autocomplete_rate, hit_rate in zip(
+                    self.results['cache_sizes'], self.results['cache_search_rates'],
+                    self.results['cache_autocomplete_rates'], self.results['cache_hit_rates']):
+                report.append(f"  cache {size:6d}: Search: {search_rate:.0f}/sec, "
+                              f"Autocomplete: {autocomplete_rate:.0f}/sec, Hit rate: {hit_rate:.1%}")
+            report.append("")
+        
+        # Snapshot loading
+        if 'snapshot' in self.results:
+            stats = self.results['snapshot']
+            report.append("SNAPSHOT LOADING:")
+            report.append("-" * 17)
+            report.append(f"  Rebuild with insert: {stats['rebuild']:.4f}s")
+            report.append(f"  Save: {stats['save']:.4f}s ({stats['file_mb']:.1f}MB)")
+            report.append(f"  Load (mmap): {stats['load_mmap']:.6f}s, Load (copy): {stats['load_copy']:.4f}s")
+            report.append(f"  Search - rebuilt: {stats['rebuild_search_rate']:.0f}/sec, "
+                          f"mmap: {stats['load_mmap_search_rate']:.0f}/sec")
+            report.append("")
+        
+        # Shared-memory query pool
+        if 'pool_workers' in self.results:
+            report.append("SHARED-MEMORY QUERY POOL:")
+            report.append("-" * 25)
+            report.append(f"  single process: {self.results['pool_single_rate']:.0f} searches/sec")
+            for workers, search_rate, autocomplete_rate in zip(
+                    self.results['pool_workers'], self.results['pool_search_rates'],
+                    self.results['pool_autocomplete_rates']):
+                report.append(f"  {workers} workers: {search_rate:.0f} searches/sec, "
+                              f"{autocomplete_rate:.0f} autocompletes/sec")
+            report.append("")
+        
+        # Fuzzy search
+        if 'fuzzy_distances' in self.results:
+            report.append("FUZZY SEARCH:")
+            report.append("-" * 13)
+            for distance, tree_ms, brute_ms in zip(self.results['fuzzy_distances'],
+                                                   self.results['fuzzy_tree_ms'],
+                                                   self.results['fuzzy_brute_ms']):
+                report.append(f"  distance {distance}: tree {tree_ms:.2f}ms/query, "
+                              f"brute force {brute_ms:.2f}ms/query")
+            report.append("")
+        
+        # Pattern match
+        if 'pattern_match' in self.results:
+            report.append("PATTERN MATCH LATENCY VS SELECTIVITY:")
+            report.append("-" * 37)
+            for pattern, selectivity, tree_time, scan_time in self.results['pattern_match']:
+                report.append(f"  {pattern:8s} ({selectivity:.2%}): tree {tree_time * 1000:.2f}ms, "
+                              f"linear scan {scan_time * 1000:.2f}ms")
+            report.append("")
+        
+        # Ordered queries
+        if 'ordered_queries' in self.results:
+            stats = self.results['ordered_queries']
+            report.append(f"ORDERED QUERIES ({stats['words']} words):")
+            report.append("-" * 17)
+            report.append(f"  rank:   {stats['rank_us']:.1f}us")
+            report.append(f"  select: {stats['select_us']:.1f}us")
+            report.append(f"  page of {stats['page_size']} via select + range: {stats['page_us']:.1f}us")
+            report.append(f"  page of {stats['page_size']} via in-order walk:  {stats['walk_page_us']:.1f}us")
+            report.append("")
+        
+        # Word iteration
+        if 'word_iteration' in self.results:
+            stats = self.results['word_iteration']
+            report.append(f"WORD ITERATION ({stats['words']} words):")
+            report.append("-" * 16)
+            report.append(f"  Tree memory: {stats['tree_mb']:.2f}MB")
+            report.append(f"  Saved by not storing a word list: {stats['saved_mb']:.2f}MB")
+            report.append(f"  In-order iteration: {stats['words_per_sec']:.0f} words/sec")
+            report.append("")
+        
+        # Mappings
+        if 'mapping_map' in self.results:
+            report.append("TERM -> ID MAPPINGS:")
+            report.append("-" * 20)
+            for name in ['dict', 'tst+dict', 'map']:
+                stats = self.results[f'mapping_{name}']
+                report.append(f"  {name:8s} - Memory: {stats['memory_mb']:.2f}MB, Lookup: {stats['lookup_us']:.2f}us")
+            report.append("")
+        
+        # Path-compressed nodes
+        if 'radix_urls_radix' in self.results:
+            report.append("PATH-COMPRESSED (RADIX) NODES:")
+            report.append("-" * 30)
+            for dataset in ['urls', 'long_prefix']:
+                for storage in ['node', 'radix']:
+                    stats = self.results[f'radix_{dataset}_{storage}']
+                    report.append(f"  {dataset:11s} {storage:5s} - Nodes: {stats['nodes']}, "
+                                  f"Memory: {stats['memory_mb']:.2f}MB, Search: {stats['search_us']:.2f}us")
+            report.append("")
+        
+        # Prefix index
+        if 'prefix_index_random_0' in self.results:
+            report.append("PREFIX INDEX:")
+            report.append("-" * 13)
+            for dataset in ['random', 'skewed']:
+                for prefix_index in [0, 1, 2]:
+                    stats = self.results[f'prefix_index_{dataset}_{prefix_index}']
+                    report.append(f"  {dataset:6s} prefix_index={prefix_index} - Average depth: "
+                                  f"{stats['average_depth']:.2f}, Search: {stats['search_us']:.2f}us")
+            report.append("")
+        
+        # Rebalance
+        if 'rebalance_sequential' in self.results:
+            report.append("REBALANCE OF WORST-CASE INSERTION ORDERS:")
+            report.append("-" * 41)
+            for scenario_name in ['sequential', 'similar_prefixes', 'reverse_sorted']:
+                stats = self.results[f'rebalance_{scenario_name}']
+                report.append(f"  {scenario_name}:")
+                report.append(f"    Average depth: {stats['depth_before']:.1f} -> {stats['depth_after']:.1f} "
+                              f"(auto-rebalanced: {stats['depth_auto']:.1f})")
+                report.append(f"    Search: {stats['search_before']:.0f} -> {stats['search_after']:.0f} words/sec "
+                              f"(auto-rebalanced: {stats['search_auto']:.0f})")
+                report.append(f"    rebalance(): {stats['rebalance_time']:.3f}s")
+            report.append("")
+        
+        # Concurrent reads
+        if 'concurrent_reads' in self.results:
+            stats = self.results['concurrent_reads']
+            report.append(f"CONCURRENT READS ({stats['readers']} readers, GIL {'enabled' if stats['gil'] else 'disabled'}):")
+            report.append("-" * 30)
+            report.append(f"  No writer: {stats['idle_reads_per_sec']:.0f} reads/sec")
+            report.append(f"  Writer at {stats['writes_per_sec']:.0f} writes/sec: {stats['busy_reads_per_sec']:.0f} reads/sec")
+            report.append("")
+        
+        # asyncio front-end
+        if 'async_front_end' in self.results:
+            results = self.results['async_front_end']
+            report.append("ASYNCIO FRONT-END (p50 / p99 latency, max event loop lag):")
+            report.append("-" * 30)
+            for i, concurrency in enumerate(results['concurrency']):
+                for name in ('direct', 'async'):
+                    stats = results[name][i]
+                    report.append(f"  {concurrency:5d} clients, {name:6s}: {stats['p50_ms']:.2f}ms / "
+                                  f"{stats['p99_ms']:.2f}ms, {stats['requests_per_sec']:.0f} req/sec, "
+                                  f"lag {stats['max_lag_ms']:.2f}ms")
+            report.append("")
+        
+        # File loading
+        if 'file_loading' in self.results:
+            report.append("FILE LOADING:")
+            report.append("-" * 30)
+            for name, stats in self.results['file_loading'].items():
+                report.append(f"  {name}: {stats['seconds']:.2f}s, {stats['words_per_sec']:.0f} words/sec, "
+                              f"{stats['bytes_per_sec'] / 1024 / 1024:.1f}MB/sec")
+            report.append("")
+        
+        # Harness
+        if 'harness' in self.results:
+            data = self.results['harness']
+            meta = data['meta']
+            report.append(f"HARNESS (seed {meta['seed']}, median of {meta['repeats']} runs, IQR in parentheses):")
+            report.append("-" * 30)
+            for scenario in HARNESS_SCENARIOS:
+                for entry in data[scenario]:
+                    insertion, search = entry['insertion'], entry['search']
+                    report.append(f"  {scenario} {entry['size']} words: insert {insertion['total_time']:.4f}s "
+                                  f"({insertion['iqr']:.4f}s), search {search['total_time']:.4f}s "
+                                  f"({search['iqr']:.4f}s), height {insertion['tree_height']}")
+            report.append("")
+        
+        # Stats mode
+        if 'stats_overhead' in self.results:
+            results = self.results['stats_overhead']
+            report.append("STATS MODE OVERHEAD (per operation):")
+            report.append("-" * 30)
+            for mode in ('plain', 'stats'):
+                report.append(f"  {mode}: insert {results[mode]['insert_us']:.2f}us, "
+                              f"search {results[mode]['search_us']:.2f}us")
+            report.append(f"  stats(): {results['stats_call_us']:.0f}us, height(): {results['height_call_us']:.0f}us")
+            report.append("")
+        
+        # Scaling
+        if 'scaling' in self.results:
+            results = self.results['scaling']
+            report.append("SCALING AGAINST BUILT-IN STRUCTURES:")
+            report.append("-" * 30)
+            for distribution in SCALING_DISTRIBUTIONS:
+                if distribution not in results:
+                    continue
+                report.append(f"  {distribution}:")
+                for i, size in enumerate(results['sizes']):
+                    report.append(f"    {size} keys:")
+                    for structure in SCALING_STRUCTURES:
+                        values = [results[distribution][structure][metric][i] for metric in SCALING_METRICS]
+                        report.append(f"      {structure}: " + ", ".join(
+                            f"{metric} {'n/a' if value is None else f'{value:.2f}'}"
+                            for metric, value in zip(SCALING_METRICS, values)))
+            report.append("")
+        
+        # Parallel build
+        if 'parallel_build' in self.results:
+            results = self.results['parallel_build']
+            report.append(f"PARALLEL BUILD ({results['cores']} cores available):")
+            report.append("-" * 30)
+            report.append(f"  from_iterable: {results['serial_time']:.2f}s")
+            for workers, build_time, speedup in zip(results['workers'], results['times'], results['speedups']):
+                report.append(f"  {workers} workers: {build_time:.2f}s ({speedup:.2f}x)")
             report.append("")
         
         # Comparison with built-in structures
@@ -348,9 +2058,8 @@ class TSTBenchmark:
         print(f"  Saved performance report to '{report_path}'")
 
 
-if __name__ == "__main__":
-    benchmark = TSTBenchmark()
-    
+def run_full_suite(benchmark):
+    """Run the complete benchmark suite, plots and report."""
     # Run insert benchmark
     benchmark.benchmark_insert_performance()
     
@@ -366,5 +2075,122 @@ if __name__ == "__main__":
     # Create plots
     benchmark.create_performance_plots()
     
+    # Reproducible timings for the analysis scripts
+    benchmark.run_harness(sizes=[1000, 5000, 10000, 50000])
+    
     # Generate textual report
     benchmark.generate_report()
+
+
+def report_comparison(baseline_path, current_path, threshold):
+    """Print the comparison of two results files, returns True if nothing regressed."""
+    rows = compare_results(load_results(baseline_path), load_results(current_path), threshold)
+    print(f"Comparing {current_path} against {baseline_path} (threshold {threshold:.0%}):")
+    for row in rows:
+        flag = "REGRESSION" if row['regression'] else ""
+        print(f"  {row['scenario']:10s} {row['size']:8d} {row['phase']:9s} "
+              f"{row['baseline']:.4f}s -> {row['current']:.4f}s ({row['change']:+.1%}) {flag}")
+    regressions = sum(row['regression'] for row in rows)
+    print(f"{regressions} regression(s) in {len(rows)} measurements")
+    return regressions == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ternary Search Tree benchmarks")
+    parser.add_argument("--mode", default="full",
+                        choices=["full", "insert-scaling", "engine", "storage", "balanced", "prefix", "weighted", "batch", "cache", "snapshot", "pool", "fuzzy", "match", "ordered", "iteration", "mapping", "radix", "prefix-index", "rebalance", "concurrent", "async", "ingest", "harness", "stats", "scaling", "parallel-build"],
+                        help="benchmark to run (default: full suite)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the generated datasets")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000, 10000000],
+                        help="key counts of the scaling suite")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per harness measurement")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before them")
+    parser.add_argument("--output", default="benchmark_results.json", help="harness results file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two harness results files and exit non-zero on regressions")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown flagged as a regression (default: 0.1)")
+    args = parser.parse_args()
+    
+    if args.compare:
+        sys.exit(0 if report_comparison(*args.compare, args.threshold) else 1)
+    
+    benchmark = TSTBenchmark(seed=args.seed)
+    
+    if args.mode == "insert-scaling":
+        benchmark.benchmark_insert_scaling()
+        benchmark.generate_report()
+    elif args.mode == "storage":
+        benchmark.benchmark_node_storage()
+        benchmark.generate_report()
+    elif args.mode == "balanced":
+        benchmark.benchmark_balanced_build()
+        benchmark.generate_report()
+    elif args.mode == "prefix":
+        benchmark.benchmark_prefix_latency()
+        benchmark.generate_report()
+    elif args.mode == "weighted":
+        benchmark.benchmark_weighted_autocomplete()
+        benchmark.generate_report()
+    elif args.mode == "batch":
+        benchmark.benchmark_batch_search()
+        benchmark.generate_report()
+    elif args.mode == "cache":
+        benchmark.benchmark_query_cache()
+        benchmark.generate_report()
+    elif args.mode == "snapshot":
+        benchmark.benchmark_snapshot()
+        benchmark.generate_report()
+    elif args.mode == "pool":
+        benchmark.benchmark_query_pool()
+        benchmark.generate_report()
+    elif args.mode == "fuzzy":
+        benchmark.benchmark_fuzzy_search()
+        benchmark.generate_report()
+    elif args.mode == "match":
+        benchmark.benchmark_pattern_match()
+        benchmark.generate_report()
+    elif args.mode == "ordered":
+        benchmark.benchmark_ordered_queries()
+        benchmark.generate_report()
+    elif args.mode == "iteration":
+        benchmark.benchmark_word_iteration()
+        benchmark.generate_report()
+    elif args.mode == "mapping":
+        benchmark.benchmark_mapping()
+        benchmark.generate_report()
+    elif args.mode == "radix":
+        benchmark.benchmark_radix_storage()
+        benchmark.generate_report()
+    elif args.mode == "prefix-index":
+        benchmark.benchmark_prefix_index()
+        benchmark.generate_report()
+    elif args.mode == "rebalance":
+        benchmark.benchmark_rebalance()
+        benchmark.generate_report()
+    elif args.mode == "concurrent":
+        benchmark.benchmark_concurrent_reads()
+        benchmark.generate_report()
+    elif args.mode == "async":
+        benchmark.benchmark_async_front_end()
+        benchmark.generate_report()
+    elif args.mode == "ingest":
+        benchmark.benchmark_file_loading()
+        benchmark.generate_report()
+    elif args.mode == "stats":
+        benchmark.benchmark_stats_overhead()
+        benchmark.generate_report()
+    elif args.mode == "parallel-build":
+        benchmark.benchmark_parallel_build()
+        benchmark.generate_report()
+    elif args.mode == "scaling":
+        benchmark.benchmark_scaling(sizes=args.sizes)
+        benchmark.create_performance_plots()
+        benchmark.generate_report()
+    elif args.mode == "harness":
+        benchmark.run_harness(repeats=args.repeats, warmup=args.warmup, output=args.output)
+    elif args.mode == "engine":
+        benchmark.benchmark_recursive_vs_iterative()
+        benchmark.generate_report()
+    else:
+        run_full_suite(benchmark)
@@ -1,69 +1,1016 @@
+import asyncio
+import gc
+import gzip
+import heapq
+import io
+import math
+import mmap as mmap_module
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+from itertools import chain, count, groupby, islice
+from multiprocessing import Pool, shared_memory, util
+
+try:
+    import resource
+except ImportError: #not available on Windows, peak RSS is then reported as None
+    resource = None
+
+
+STORAGES = ("node", "array", "radix") #node objects, parallel typed arrays or path-compressed node objects
+GROUPED_BATCH_SIZE = 5000 #search_many groups batches by prefix from this size on, smaller ones don't repay it
+
+SNAPSHOT_MAGIC = b"TSTS"
+SNAPSHOT_VERSION = 1
+#magic, version, slots (nodes + sentinel), root index, word count; all little-endian
+_SNAPSHOT_HEADER = struct.Struct("<4sIIII")
+WEIGHTS_MAGIC = b"TSTW"
+#magic and typecode ('q' or 'd') of the optional weights section, 8 bytes so the weights stay aligned
+_WEIGHTS_HEADER = struct.Struct("<4sc3x")
+
+
+def _write_snapshot(f, chars, flags, ls, eq, gt, root, word_count, weights=None, max_weights=None):
+    """
+    Write node arrays as a snapshot to a binary file object.
+    
+    The layout is the header followed by the chars, _ls, _eq and _gt
+    sections (uint32/int32 per slot) and the flags section (one byte per
+    slot), so every 4-byte section stays 4-byte aligned. Weighted trees
+    append a weights section: zero padding to an 8-byte boundary, the
+    weights header, then the weight and max_weight of every slot as
+    int64 or float64. Readers that don't know it ignore the trailing bytes.
+    
+    Args:
+        f: Writable binary file object
+        chars, flags, ls, eq, gt: Node arrays (slot 0 is the sentinel)
+        root (int): Index of the root node, 0 for an empty tree
+        word_count (int): Number of stored words
+        weights, max_weights: 'q' or 'd' arrays of the word weights and subtree maxima, None if unweighted
+    """
+    f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(chars), root, word_count))
+    for section, typecode in ((chars, 'I'), (ls, 'i'), (eq, 'i'), (gt, 'i')):
+        if sys.byteorder != 'little':
+            section = array(typecode, section)
+            section.byteswap()
+        f.write(section)
+    f.write(flags)
+    if weights is None:
+        return
+    
+    typecode = weights.typecode if isinstance(weights, array) else weights.format
+    f.write(bytes(-(_SNAPSHOT_HEADER.size + 17 * len(chars)) % 8))
+    f.write(_WEIGHTS_HEADER.pack(WEIGHTS_MAGIC, typecode.encode()))
+    for section in (weights, max_weights):
+        if sys.byteorder != 'little':
+            section = array(typecode, section)
+            section.byteswap()
+        f.write(section)
+
+
+def _read_snapshot(buffer):
+    """
+    Map the sections of a snapshot without copying them.
+    
+    Args:
+        buffer: Bytes-like snapshot contents (bytes, mmap, shared memory)
+        
+    Returns:
+        tuple: (chars, flags, ls, eq, gt, root, word_count, weights, max_weights),
+            the arrays as memoryviews, the weights None for an unweighted snapshot
+    """
+    size = memoryview(buffer).nbytes
+    if size < _SNAPSHOT_HEADER.size:
+        raise ValueError("not a ternary search tree snapshot")
+    magic, version, slots, root, word_count = _SNAPSHOT_HEADER.unpack_from(buffer)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("not a ternary search tree snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    if size < _SNAPSHOT_HEADER.size + 17 * slots:
+        raise ValueError("truncated ternary search tree snapshot")
+    
+    weighted = None
+    start = _SNAPSHOT_HEADER.size + 17 * slots
+    start += -start % 8
+    if size >= start + _WEIGHTS_HEADER.size:
+        magic, typecode = _WEIGHTS_HEADER.unpack_from(buffer, start)
+        if magic == WEIGHTS_MAGIC: # anything else is trailing bytes, e.g. the rest of a shared memory page
+            weighted = typecode.decode()
+            if weighted not in ('q', 'd'):
+                raise ValueError(f"unsupported snapshot weights typecode {weighted!r}")
+            if size < start + _WEIGHTS_HEADER.size + 16 * slots:
+                raise ValueError("truncated ternary search tree snapshot")
+    
+    # Views are only created once the header is valid, so a failed load holds no buffer exports
+    view = memoryview(buffer).cast('B')
+    offset = _SNAPSHOT_HEADER.size
+    sections = []
+    for typecode in ('I', 'i', 'i', 'i'):
+        sections.append(view[offset:offset + 4 * slots].cast(typecode))
+        offset += 4 * slots
+    chars, ls, eq, gt = sections
+    flags = view[offset:offset + slots]
+    weights = max_weights = None
+    if weighted is not None:
+        offset = start + _WEIGHTS_HEADER.size
+        weights = view[offset:offset + 8 * slots].cast(weighted)
+        max_weights = view[offset + 8 * slots:offset + 16 * slots].cast(weighted)
+    return chars, flags, ls, eq, gt, root, word_count, weights, max_weights
+
+
+def _weight_arrays(weights, max_weights):
+    """
+    Pack the weights of a tree for a snapshot.
+    
+    Args:
+        weights, max_weights (list): Weight and subtree maximum per slot
+        
+    Returns:
+        tuple: ('q' or 'd' array, same for max_weights), int64 unless a weight doesn't fit one
+    """
+    typecode = 'q' if all(type(weight) is int and weight < 1 << 63 for weight in weights) else 'd'
+    return array(typecode, weights), array(typecode, max_weights)
+
+
+def _nodes_from_snapshot(buffer):
+    """
+    Rebuild TernarySearchTree nodes, with their sizes and weights, from a snapshot.
+    
+    Args:
+        buffer: Bytes-like snapshot contents
+        
+    Returns:
+        tuple: (root node or None, word count)
+    """
+    chars, flags, ls, eq, gt, root, word_count, weights, max_weights = (
+        section.tolist() if isinstance(section, memoryview) else section for section in _read_snapshot(buffer))
+    Node = TernarySearchTree.Node
+    new = Node.__new__ # every slot is set below, skipping __init__ saves a call per node
+    letters = {code: chr(code) for code in set(chars)}
+    nodes = [None] * len(chars)
+    collecting = gc.isenabled()
+    gc.disable() # none of the new nodes is garbage, collections would only rescan them
+    
+    try:
+        for index in range(len(chars) - 1, 0, -1): # preorder numbering, so children come first
+            node = nodes[index] = new(Node)
+            node.char = letters[chars[index]]
+            size = flags[index]
+            node.end_of_word = size == 1
+            if weights is None:
+                node.weight = node.max_weight = 0
+            else:
+                node.weight = weights[index]
+                node.max_weight = max_weights[index]
+            child = ls[index]
+            node._ls = child = nodes[child] if child else None
+            if child is not None:
+                size += child.size
+            child = eq[index]
+            node._eq = child = nodes[child] if child else None
+            if child is not None:
+                size += child.size
+            child = gt[index]
+            node._gt = child = nodes[child] if child else None
+            if child is not None:
+                size += child.size
+            node.size = size
+    finally:
+        if collecting:
+            gc.enable()
+    
+    return (nodes[root] if root else None), word_count
+
+
+def _next_edit_row(row, word, char):
+    """
+    Extend a Levenshtein DP row by one character of the candidate word.
+    
+    Args:
+        row (list): Distances from each prefix of word to the current candidate prefix
+        word (str): Query word
+        char (str): Next character of the candidate
+        
+    Returns:
+        list: Distances from each prefix of word to the candidate prefix plus char
+    """
+    new_row = [row[0] + 1]
+    for i, query_char in enumerate(word):
+        cost = row[i] if query_char == char else row[i] + 1 # match or substitution
+        insertion = new_row[i] + 1
+        deletion = row[i + 1] + 1
+        new_row.append(min(cost, insertion, deletion))
+    return new_row
+
+
+class _PatternMatcher:
+    """
+    Wildcard pattern as an automaton over pattern positions.
+    
+    '?' matches any single character and '*' any run of characters
+    (including none); every other character matches itself. A state is
+    the frozenset of pattern positions reachable after a candidate
+    prefix, so each tree path has exactly one state and no word is
+    reported twice.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.start = self._closure({0})
+        self._steps = {} # (state, char) -> next state
+        self._choices = {} # state -> (any char allowed, literal chars)
+
+    def _closure(self, positions):
+        """Add the positions reachable by letting a '*' match nothing."""
+        pattern = self.pattern
+        closed = set(positions)
+        stack = list(positions)
+        while stack:
+            i = stack.pop()
+            if i < len(pattern) and pattern[i] == '*' and i + 1 not in closed:
+                closed.add(i + 1)
+                stack.append(i + 1)
+        return frozenset(closed)
+
+    def accepts(self, state):
+        """True if a candidate ending in this state matches the whole pattern."""
+        return len(self.pattern) in state
+
+    def step(self, state, char):
+        """
+        State after one more candidate character, empty if nothing can match.
+        """
+        key = (state, char)
+        if key not in self._steps:
+            pattern = self.pattern
+            positions = set()
+            for i in state:
+                if i < len(pattern):
+                    if pattern[i] == '*':
+                        positions.add(i) # the star absorbs the character
+                    elif pattern[i] == '?' or pattern[i] == char:
+                        positions.add(i + 1)
+            self._steps[key] = self._closure(positions)
+        return self._steps[key]
+
+    def choices(self, state):
+        """
+        Characters that can follow a state.
+        
+        Returns:
+            tuple: (True if any character can follow, frozenset of literal characters)
+        """
+        if state not in self._choices:
+            pattern = self.pattern
+            wild = any(i < len(pattern) and pattern[i] in '?*' for i in state)
+            literals = frozenset(pattern[i] for i in state if i < len(pattern) and pattern[i] not in '?*')
+            self._choices[state] = (wild, literals)
+        return self._choices[state]
+
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry.
+    
+    Keeps hit, miss and eviction counters for monitoring.
+    """
+
+    def __init__(self, maxsize, on_evict=None):
+        """
+        Args:
+            maxsize (int): Maximum number of entries, must be positive
+            on_evict: Optional callback receiving the key of each evicted entry
+        """
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, got {maxsize!r}")
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Look up a key and mark it as most recently used.
+        
+        Returns:
+            The cached value, or default on a miss
+        """
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self.evictions += 1
+            if self._on_evict is not None:
+                self._on_evict(evicted)
+
+    def discard(self, key):
+        """Remove a key if present."""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries, the counters are kept."""
+        self._data.clear()
+
+    def info(self):
+        """
+        Snapshot of the cache counters.
+        
+        Returns:
+            dict: hits, misses, evictions, size and maxsize
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'maxsize': self.maxsize
+        }
+
+
+def _ordered_key(key):
+    """
+    Normalize a key of an ordered query (range, rank, floor, ceiling).
+    
+    Args:
+        key (str): Query key
+        
+    Returns:
+        str: The key as insert would store it
+    """
+    if not isinstance(key, str):
+        raise TypeError(f"keys must be strings, got {type(key).__name__}")
+    return key.lower().strip()
+
+
+def _unique_sorted(words, presorted=False):
+    """
+    Normalize words the way insert does, drop empties and duplicates, sort.
+    
+    Args:
+        words: Iterable of words
+        presorted (bool): Input is already sorted, only adjacent duplicates are dropped
+        
+    Returns:
+        list: Sorted unique normalized words
+    """
+    normalized = (word.lower().strip() for word in words if isinstance(word, str))
+    if presorted:
+        return [word for word, _ in groupby(normalized) if word]
+    return sorted({word for word in normalized if word})
+
+
+def _median_order(words):
+    """
+    Yield sorted items median first, then the medians of both halves, and so on.
+    
+    Inserting in this order gives every _ls/_gt sibling tree a balanced shape.
+    
+    Args:
+        words (list): Sorted items
+    """
+    stack = [(0, len(words))]
+    
+    while stack:
+        lo, hi = stack.pop()
+        if lo < hi:
+            mid = (lo + hi) // 2
+            yield words[mid]
+            stack.append((mid + 1, hi))
+            stack.append((lo, mid))
+
+
+def _balance_siblings(root):
+    """
+    Rebuild every _ls/_gt sibling tree of a node tree into a balanced BST.
+    
+    The nodes are reused and keep their _eq links, so words and their
+    order don't change. Each sibling tree is flattened in order and
+    relinked median first, which is linear in the number of nodes.
+    
+    Args:
+        root: Root node, not None
+        
+    Returns:
+        tuple: (new root, list of all nodes with every parent before its children)
+    """
+    order = []
+    new_root = None
+    tops = [(None, None, root)] # (parent, link, top node of a sibling tree)
+    
+    while tops:
+        parent, link, top = tops.pop()
+        siblings = []
+        stack = []
+        node = top
+        while stack or node is not None: # in-order walk over _ls/_gt only
+            while node is not None:
+                stack.append(node)
+                node = node._ls
+            node = stack.pop()
+            siblings.append(node)
+            node = node._gt
+        
+        ranges = [(0, len(siblings), parent, link)]
+        while ranges:
+            lo, hi, up, side = ranges.pop()
+            node = siblings[(lo + hi) // 2] if lo < hi else None
+            if up is None:
+                new_root = node
+            else:
+                setattr(up, side, node)
+            if node is not None:
+                order.append(node)
+                mid = (lo + hi) // 2
+                ranges.append((mid + 1, hi, node, '_gt'))
+                ranges.append((lo, mid, node, '_ls'))
+        
+        for node in siblings:
+            if node._eq is not None:
+                tops.append((node, '_eq', node._eq))
+    
+    return new_root, order
+
+
 class TernarySearchTree:
-    #Tree initialization 
-    def __init__(self):
+    #Selects the node storage, "array" gives a CompactTernarySearchTree and "radix" a RadixTernarySearchTree
+    def __new__(cls, storage="node", cache_size=0, prefix_index=0, rebalance_factor=None, stats=False):
+        if storage not in STORAGES:
+            raise ValueError(f"storage must be one of {STORAGES}, got {storage!r}")
+        if prefix_index not in (0, 1, 2):
+            raise ValueError(f"prefix_index must be 0, 1 or 2, got {prefix_index!r}")
+        if storage != "node" and (cache_size or prefix_index or rebalance_factor is not None or stats):
+            raise ValueError("cache_size, prefix_index, rebalance_factor and stats are only supported with node storage")
+        if storage == "array":
+            return CompactTernarySearchTree()
+        if storage == "radix":
+            return RadixTernarySearchTree()
+        if stats and not issubclass(cls, InstrumentedTernarySearchTree):
+            return super().__new__(InstrumentedTernarySearchTree)
+        return super().__new__(cls)
+
+    #Tree initialization, cache_size > 0 keeps an LRU cache of recent query results,
+    #prefix_index = 1 or 2 jumps straight to the node of the first one or two characters,
+    #rebalance_factor enables automatic rebalancing, see _check_balance,
+    #stats = True returns an InstrumentedTernarySearchTree
+    def __init__(self, storage="node", cache_size=0, prefix_index=0, rebalance_factor=None, stats=False):
         self.root = None #Because there are no words yet
         self.word_count = 0 #Keeps track of how many words are inserted
-        self.words_list = [] #Keeps track of all inserted words
+        self._cache = LRUCache(cache_size, on_evict=self._forget_query) if cache_size else None
+        self._cached_queries = {} #prefix -> keys of cached prefix/autocomplete results
+        self.prefix_index = prefix_index
+        self._index = {} #first prefix_index characters -> (node of the last one, its ancestors)
+        self.rebalance_factor = rebalance_factor
+        self._balanced_size = 0 #word_count after the last rebalance
 
     #Node initialization
     class Node:
+        __slots__ = ("char", "end_of_word", "weight", "max_weight", "size", "_ls", "_eq", "_gt") #no per-node __dict__
+
         def __init__(self, char):
             self.char = char #Letter that is stored in the node
             self.end_of_word = False #True when the letter is the end of the word
+            self.weight = 0 #Score of the word ending here
+            self.max_weight = 0 #Highest word score in the subtree rooted here (_ls, _eq and _gt)
+            self.size = 0 #Number of words in the subtree rooted here, used by rank and select
             self._ls = None #Next node that has a character lesser
             self._eq = None #Next node that is the following character of the word
             self._gt = None #Nets node that has a character greater
 
+    @classmethod
+    def from_iterable(cls, words, presorted=False, storage="node", prefix_index=0):
+        """
+        Build a height-balanced tree from an iterable of words.
+        
+        Args:
+            words: Iterable of words, duplicates are allowed
+            presorted (bool): Words are already sorted, skips the sort
+            storage (str): Node storage, see STORAGES
+            prefix_index (int): Leading characters to index, node storage only
+            
+        Returns:
+            TernarySearchTree: The new tree
+        """
+        tree = cls(storage=storage, prefix_index=prefix_index)
+        for word in _median_order(_unique_sorted(words, presorted)):
+            tree.insert(word)
+        return tree
+
+    @classmethod
+    def from_iterable_parallel(cls, words, workers=None, presorted=False, prefix_index=0):
+        """
+        Build a height-balanced tree on several cores.
+        
+        The words are sharded by first character and every shard is
+        built by a worker process, which sends it back as a snapshot
+        instead of pickled nodes. The shard roots are then joined under
+        a balanced _ls/_gt spine, so the result answers every query
+        exactly like from_iterable.
+        
+        Args:
+            words: Iterable of words, duplicates are allowed
+            workers (int): Worker processes, None for os.cpu_count(), 1 builds in this process
+            presorted (bool): Words are already sorted, skips the sort
+            prefix_index (int): Leading characters to index
+            
+        Returns:
+            TernarySearchTree: The new tree
+        """
+        batch = _unique_sorted(words, presorted)
+        shards = [list(group) for _, group in groupby(batch, key=lambda word: word[0])]
+        shards.sort(key=len, reverse=True) # largest first, so no worker is left with a big one at the end
+        workers = workers or os.cpu_count() or 1
+        
+        if workers == 1 or len(shards) <= 1: # same shape, without the round trip through a snapshot
+            roots = [TernarySearchTree.from_iterable(shard, presorted=True).root for shard in shards]
+        else:
+            with Pool(min(workers, len(shards))) as pool:
+                roots = [_nodes_from_snapshot(snapshot)[0]
+                         for snapshot in pool.imap_unordered(_build_shard, shards)]
+        roots.sort(key=lambda node: node.char)
+        
+        tree = cls(prefix_index=prefix_index)
+        spine = [] # shard roots in insertion order, parents before children
+        for root in _median_order(roots):
+            spine.append(root)
+            if tree.root is None:
+                tree.root = root
+                continue
+            node = tree.root
+            while True:
+                link = '_ls' if root.char < node.char else '_gt'
+                child = getattr(node, link)
+                if child is None:
+                    setattr(node, link, root)
+                    break
+                node = child
+        for node in reversed(spine):
+            node.size = node.end_of_word + sum(child.size for child in (node._ls, node._eq, node._gt)
+                                               if child is not None)
+        
+        tree.word_count = len(batch)
+        if prefix_index:
+            for prefix in {word[:prefix_index] for word in batch if len(word) >= prefix_index}:
+                tree._index_prefix(prefix)
+        return tree
+
     #Length of the tree
     def __len__(self):
         return self.word_count #returns number of words
 
+    #Words of the tree in sorted order, read lazily from the nodes
+    def __iter__(self):
+        return self._iter_words(self.root, '') if self.root is not None else iter(())
+
+    #Membership test, same as search
+    def __contains__(self, word):
+        return self.search(word)
+
     #Words inside the tree
     def all_strings(self):
-        return self.words_list #returns list of words
+        return list(self) #returns sorted list of words
 
-    #Helper function for inserting words
+    #Helper function for inserting words (iterative, one loop step per node)
     def insert_character(self, node, word, index):
-        char = word[index] #character to insert
-
         if node is None:
-            node = self.Node(char) #creates a new node if there is none already
+            node = self.Node(word[index]) #creates a new node if there is none already
+        root = node #root of the subtree that is returned
+        last = len(word) - 1
+
+        while True:
+            node.size += 1 #counted on the way down, undone if the word was already there
+            char = word[index] #character to insert
 
-        if char < node.char:
-            node._ls = self.insert_character(node._ls, word, index) #go left
-        elif char > node.char:
-            node._gt = self.insert_character(node._gt, word, index) #go right
+            if char < node.char:
+                if node._ls is None:
+                    node._ls = self.Node(char)
+                node = node._ls #go left
+            elif char > node.char:
+                if node._gt is None:
+                    node._gt = self.Node(char)
+                node = node._gt #go right
+            elif index == last:
+                if not node.end_of_word: #the flag tells us if the word is already in the tree
+                    node.end_of_word = True #marks as end of the word
+                    self.word_count += 1 #updates the number of words added
+                else:
+                    self._add_to_sizes(word, -1)
+                return root
+            else:
+                index += 1
+                if node._eq is None:
+                    node._eq = self.Node(word[index])
+                node = node._eq #go middle
+
+    def _add_to_sizes(self, word, delta):
+        """
+        Add delta to the subtree word counts along the path of a word.
+        
+        Args:
+            word (str): Normalized word whose path exists in the tree
+            delta (int): Change in the number of words below each path node
+        """
+        node = self.root
+        index = 0
+        last = len(word) - 1
+        
+        while True:
+            node.size += delta
+            char = word[index]
+            if char < node.char:
+                node = node._ls
+            elif char > node.char:
+                node = node._gt
+            elif index == last:
+                return
+            else:
+                index += 1
+                node = node._eq
+
+    #Insert word function, weight is the score used by autocomplete
+    def insert(self, word, weight=None):
+        if not isinstance(word, str):
+            return #only strings can be stored
+        if weight is not None and weight < 0:
+            raise ValueError(f"weight must be non-negative, got {weight!r}")
+
+        word = word.lower().strip() #same normalization as delete
+        if word == '':
+            return  # doesn't insert empty strings into the tree
+
+        before = self.word_count
+        depth = self.prefix_index
+        entry = self._index.get(word[:depth]) if depth and len(word) >= depth else None
+        if entry is not None:
+            node, ancestors = entry
+            for ancestor in ancestors:
+                ancestor.size += 1 #the descent below node counts the rest
+            self.insert_character(node, word, depth - 1) #continues below the indexed prefix
         else:
-            if index + 1 == len(word):
-                node.end_of_word = True #marks as end of the word
+            self.root = self.insert_character(self.root, word, 0) #duplicates are detected during the descent
+            if depth and len(word) >= depth:
+                self._index_prefix(word[:depth])
+        if self.rebalance_factor is not None and self.word_count > before:
+            self._check_balance(word)
+        if weight is not None:
+            self._set_weight(word, weight) #new score, also replaces the score of an existing word
+        if self._cache is not None:
+            self._invalidate(word)
+
+    def _index_prefix(self, prefix):
+        """
+        Add the node of a stored prefix to the prefix index.
+        
+        Args:
+            prefix (str): The first prefix_index characters of a stored word
+        """
+        ancestors = []
+        node = self.root
+        index = 0
+        last = len(prefix) - 1
+        
+        while True:
+            char = prefix[index]
+            if char < node.char:
+                ancestors.append(node)
+                node = node._ls
+            elif char > node.char:
+                ancestors.append(node)
+                node = node._gt
+            elif index == last:
+                break
             else:
-                node._eq = self.insert_character(node._eq, word, index + 1) #go middle
+                ancestors.append(node)
+                index += 1
+                node = node._eq
+        
+        self._index[prefix] = (node, tuple(ancestors))
 
-        return node
+    def rebalance(self):
+        """
+        Rebuild every _ls/_gt sibling tree into a balanced BST in linear time.
+        
+        Repairs trees grown from sorted or otherwise adversarial insertion
+        orders. Words, weights and all query results stay the same.
+        """
+        self._balanced_size = self.word_count
+        if self.root is None:
+            return
+        
+        self.root, order = _balance_siblings(self.root)
+        for node in reversed(order): # children before parents
+            size = node.end_of_word
+            best = node.weight
+            for child in (node._ls, node._eq, node._gt):
+                if child is not None:
+                    size += child.size
+                    if child.max_weight > best:
+                        best = child.max_weight
+            node.size = size
+            node.max_weight = best
+        
+        for prefix in list(self._index): # the indexed nodes stay, their ancestors change
+            self._index_prefix(prefix)
 
-    #Insert word function
-    def insert(self, word):
+    def _check_balance(self, word):
+        """
+        Auto-rebalance policy, run after each insert of a new word.
+        
+        Once the tree has grown by half since the last rebalance, every
+        64th new word is sampled: if reaching it takes more than
+        rebalance_factor * log2(n + 1) sibling (_ls/_gt) steps, the tree
+        is rebalanced. The growth condition keeps the linear rebuilds at
+        O(1) amortized per insert, the sampling keeps the check off the
+        insert path.
+        
+        Args:
+            word (str): Normalized word that was just inserted
+        """
+        if self.word_count % 64 or self.word_count - self._balanced_size < self._balanced_size // 2:
+            return
+        
+        steps = 0
+        node = self.root
+        index = 0
+        last = len(word) - 1
+        while True:
+            char = word[index]
+            if char < node.char:
+                node = node._ls
+                steps += 1
+            elif char > node.char:
+                node = node._gt
+                steps += 1
+            elif index == last:
+                break
+            else:
+                index += 1
+                node = node._eq
+        
+        if steps > self.rebalance_factor * math.log2(self.word_count + 1):
+            self.rebalance()
+
+    def _locate(self, word):
+        """
+        Find the node holding the last character of a normalized word, using the prefix index.
+        
+        Args:
+            word (str): Normalized, non-empty word
             
-        if word not in self.words_list: #only for words not already inserted
-            self.words_list.append(word)#updates list of all words
-            self.word_count += 1 #updates the number of words added
+        Returns:
+            Node or None: The node, None if the path doesn't exist
+        """
+        depth = self.prefix_index
+        if not depth or len(word) < depth:
+            return self.search_helper(self.root, word, 0)
+        entry = self._index.get(word[:depth])
+        if entry is None:
+            return None
+        if len(word) == depth:
+            return entry[0]
+        return self.search_helper(entry[0]._eq, word, depth)
+
+    def _set_weight(self, word, weight):
+        """
+        Set the score of a stored word and refresh the cached subtree maxima.
+        
+        Args:
+            word (str): Normalized word that is known to be in the tree
+            weight: New non-negative score
+        """
+        path = []
+        node = self.root
+        index = 0
+        last = len(word) - 1
+        
+        while True:
+            path.append(node)
+            char = word[index]
+            if char < node.char:
+                node = node._ls
+            elif char > node.char:
+                node = node._gt
+            elif index == last:
+                break
+            else:
+                index += 1
+                node = node._eq
+        
+        node.weight = weight
+        self._refresh_max_weights(path)
+
+    @staticmethod
+    def _refresh_max_weights(path):
+        """
+        Recompute max_weight bottom-up along a root-to-node path.
+        
+        Stops as soon as a node's cached maximum is unchanged, since its
+        ancestors then can't change either.
+        
+        Args:
+            path (list): Nodes from the root down to the changed node
+        """
+        for node in reversed(path):
+            best = node.weight
+            for child in (node._ls, node._eq, node._gt):
+                if child is not None and child.max_weight > best:
+                    best = child.max_weight
+            if best == node.max_weight:
+                break
+            node.max_weight = best
+
+    def _cache_query(self, key, words):
+        """
+        Cache a prefix or autocomplete result and index it by its prefix.
+        
+        Args:
+            key (tuple): (kind, prefix, limit) cache key
+            words (list): Result to cache
+        """
+        self._cache.put(key, words)
+        self._cached_queries.setdefault(key[1], set()).add(key)
+
+    def _forget_query(self, key):
+        """Drop an evicted cache key from the prefix index."""
+        if key[0] != 'search':
+            keys = self._cached_queries.get(key[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._cached_queries[key[1]]
+
+    def _invalidate(self, word):
+        """
+        Drop the cached results that a change to one word can affect.
+        
+        That is the search for the word itself and every prefix or
+        autocomplete query whose prefix is a prefix of the word.
+        
+        Args:
+            word (str): Normalized word that was inserted, updated or deleted
+        """
+        self._cache.discard(('search', word))
+        for end in range(len(word) + 1):
+            keys = self._cached_queries.pop(word[:end], None)
+            if keys is not None:
+                for key in keys:
+                    self._cache.discard(key)
+
+    def cache_info(self):
+        """
+        Counters of the query cache.
+        
+        Returns:
+            dict: hits, misses, evictions, size and maxsize, None without a cache
+        """
+        return None if self._cache is None else self._cache.info()
+
+    def stats(self):
+        """
+        Operation counters of a tree built with stats=True.
+        
+        Returns:
+            dict: See InstrumentedTernarySearchTree.stats, None without stats
+        """
+        return None
+
+    def get_weight(self, word):
+        """
+        Get the score of a stored word.
+        
+        Args:
+            word (str): The word to look up
             
+        Returns:
+            The score of the word (0 when inserted without one), None if absent
+        """
+        if not isinstance(word, str):
+            return None
+        
+        word = word.lower().strip()
         if word == '':
-            return  # doesn't insert empty strings into the tree
+            return None
+        
+        node = self._locate(word)
+        if node is None or not node.end_of_word:
+            return None
+        return node.weight
 
-        self.root = self.insert_character(self.root, word, 0)
+    def insert_many(self, words):
+        """
+        Insert a batch of words, descending each shared prefix only once.
+        
+        The batch is normalized, deduplicated and sorted, then inserted
+        group by group: all words sharing a prefix are placed under the
+        prefix node in one pass, and the new characters of each sibling
+        group are added median first so sorted batches stay balanced.
+        
+        Args:
+            words: Iterable of words
+            
+        Returns:
+            int: Number of words that were not in the tree yet
+        """
+        batch = _unique_sorted(words)
+        before = self.word_count
+        # (parent node or None for the root, lo, hi, depth): batch[lo:hi] share their first depth characters
+        stack = [(None, 0, len(batch), 0)] if batch else []
+        touched = [] #every visited node comes after its parent, sizes are recounted in reverse
+        
+        while stack:
+            parent, lo, hi, depth = stack.pop()
+            
+            # Split the group into runs with the same character at depth
+            runs = []
+            start = lo
+            for i in range(lo + 1, hi + 1):
+                if i == hi or batch[i][depth] != batch[start][depth]:
+                    runs.append((start, i))
+                    start = i
+            
+            for run_lo, run_hi in _median_order(runs):
+                char = batch[run_lo][depth]
+                node = self.root if parent is None else parent._eq
+                if node is None:
+                    node = self.Node(char)
+                    if parent is None:
+                        self.root = node
+                    else:
+                        parent._eq = node
+                
+                touched.append(node)
+                while char != node.char: #find or create the character in the sibling tree
+                    if char < node.char:
+                        if node._ls is None:
+                            node._ls = self.Node(char)
+                        node = node._ls
+                    else:
+                        if node._gt is None:
+                            node._gt = self.Node(char)
+                        node = node._gt
+                    touched.append(node)
+                
+                if len(batch[run_lo]) == depth + 1: #sorted, so a word ending here comes first in its run
+                    if not node.end_of_word:
+                        node.end_of_word = True
+                        self.word_count += 1
+                    run_lo += 1
+                if run_lo < run_hi:
+                    stack.append((node, run_lo, run_hi, depth + 1))
+        
+        for node in reversed(touched):
+            size = node.end_of_word
+            for child in (node._ls, node._eq, node._gt):
+                if child is not None:
+                    size += child.size
+            node.size = size
+        
+        depth = self.prefix_index
+        if depth:
+            for prefix in {word[:depth] for word in batch if len(word) >= depth} - self._index.keys():
+                self._index_prefix(prefix)
+        if self._cache is not None:
+            for word in batch:
+                self._invalidate(word)
+        return self.word_count - before
 
     #Helper function for tree visualization
     def _str_helper(self, node, prefix="    ", child=""):
-        child = f"{child}:" if child else "" #add the ":" for the childs
-        lines = [f"{child} {prefix} char: {node.char}, terminates: {node.end_of_word}"] #structure of each line of the tree
+        lines = []
+        stack = [(node, prefix, child)] #explicit stack instead of recursion
 
-        if node._ls:
-            lines.append(self._str_helper(node._ls, prefix + "  ", "_ls")) #looping for left nodes
-        if node._eq:
-            lines.append(self._str_helper(node._eq, prefix + "  ", "_eq")) #looping for middle nodes
-        if node._gt:
-            lines.append(self._str_helper(node._gt, prefix + "  ", "_gt")) #looping for right nodes
+        while stack:
+            node, prefix, child = stack.pop()
+            child = f"{child}:" if child else "" #add the ":" for the childs
+            lines.append(f"{child} {prefix} char: {node.char}, terminates: {node.end_of_word}") #structure of each line of the tree
+
+            prefix += "  "
+            if node._gt:
+                stack.append((node._gt, prefix, "_gt")) #pushed first so right nodes come last
+            if node._eq:
+                stack.append((node._eq, prefix, "_eq")) #middle nodes
+            if node._ls:
+                stack.append((node._ls, prefix, "_ls")) #popped first so left nodes come first
 
         return "\n".join(lines) #combines all lines into one string
 
@@ -76,133 +1023,3416 @@ class TernarySearchTree:
 
     #Helper function for search tool
     def search_helper(self, node, word, index):
-        if node is None:
-            return None #if the node doesn't exist, then the word doesn't either
+        last = len(word) - 1
 
-        char = word[index] #current letter to compare
-        
-        if char < node.char:
-            return self.search_helper(node._ls, word, index) #going to left node
-        
-        elif char > node.char:
-            return self.search_helper(node._gt, word, index) #going to right node
-        
-        else:
-            if index + 1 == len(word):
+        while node is not None: #if the node doesn't exist, then the word doesn't either
+            char = word[index] #current letter to compare
+
+            if char < node.char:
+                node = node._ls #going to left node
+            elif char > node.char:
+                node = node._gt #going to right node
+            elif index == last:
                 return node #return node if last character
-            return self.search_helper(node._eq, word, index + 1) #going to middle node
+            else:
+                index += 1
+                node = node._eq #going to middle node
+
+        return None
 
     #Search tool
     def search(self, word, exact=False):
+        if not isinstance(word, str):
+            return False #only strings can be stored
+
+        word = word.lower().strip() #same normalization as insert
         if word == '':
             return False #empty string are not stored in the tree
 
-        node = self.search_helper(self.root, word, 0) #search for the node matching the last character
-        
-        if not node:
-            return False #if the node doesn't exist, then the word doesn't either
+        if self._cache is None:
+            return self._contains(word)
 
-        return True #word found
+        found = self._cache.get(('search', word))
+        if found is None:
+            found = self._contains(word)
+            self._cache.put(('search', word), found)
+        return found
 
-    def delete(self, word):
+    def _contains(self, word):
         """
-        Delete a word from the ternary search tree.
-        
+        Check membership of an already normalized word.
+
         Args:
-            word (str): The word to delete
-            
+            word (str): Normalized, non-empty word
+
         Returns:
-            bool: True if word was deleted, False if word didn't exist
+            bool: True if the word is stored in the tree
         """
-        if not isinstance(word, str) or not word:
-            return False
-        
-        word = word.lower().strip()
-        if not word or not self._contains(word):
-            return False
-        
-        self.root = self._delete_recursive(self.root, word, 0)
-        self.word_count -= 1
-        return True
+        node = self._locate(word) #search for the node matching the last character
+        return node is not None and node.end_of_word #a prefix of a stored word is not a word
 
-    def _delete_recursive(self, node, word, index):
+    def search_many(self, words):
         """
-        Recursively delete a word from the tree.
+        Look up a batch of words, descending each shared two-character prefix once.
+        
+        Batches of at least GROUPED_BATCH_SIZE words are grouped by their
+        first two characters: the node of each prefix is found once and
+        every distinct word of the group continues below it, so the
+        sibling steps near the root, where the sibling trees are widest,
+        are paid once per group instead of once per word. Smaller batches
+        don't repay the grouping and are searched word by word, without
+        the normalization and cache lookup of each search call.
         
         Args:
-            node: Current node
-            word: Word being deleted
-            index: Current character index
+            words (list): Words to look up
             
         Returns:
-            Node: The root of the subtree after deletion
+            list: One bool per word, in the caller's order
         """
-        if node is None:
-            return None
+        normalized = [word.lower().strip() if isinstance(word, str) else '' for word in words]
+        if len(normalized) < GROUPED_BATCH_SIZE:
+            return [word != '' and self._contains(word) for word in normalized]
         
-        char = word[index]
+        groups = {} #first two characters -> distinct words starting with them
+        for word in normalized:
+            groups.setdefault(word[:2], set()).add(word)
         
-        if char < node.char:
-            node._ls = self._delete_recursive(node._ls, word, index)
-        elif char > node.char:
-            node._gt = self._delete_recursive(node._gt, word, index)
-        else:  # char == node.char
-            if index == len(word) - 1:
-                node.end_of_word = False
-            else:
-                node._eq = self._delete_recursive(node._eq, word, index + 1)
-        
-        # Remove node if it's not useful anymore
-        if (not node.end_of_word and 
-            node._ls is None and 
-            node._eq is None and 
-            node._gt is None):
-            return None
+        found = {}
+        for prefix, group in groups.items():
+            node = self._locate(prefix) if prefix else None #node of the last prefix character
+            below = node._eq if node is not None else None
+            
+            for word in group:
+                index = len(prefix)
+                if len(word) == index: #the prefix itself, or an empty or invalid word
+                    found[word] = node is not None and node.end_of_word
+                    continue
+                
+                current = below
+                last = len(word) - 1
+                hit = False
+                while current is not None:
+                    char = word[index]
+                    if char < current.char:
+                        current = current._ls
+                    elif char > current.char:
+                        current = current._gt
+                    elif index == last:
+                        hit = current.end_of_word
+                        break
+                    else:
+                        index += 1
+                        current = current._eq
+                found[word] = hit
         
-        return node
+        return list(map(found.__getitem__, normalized))
 
-    def is_empty(self):
+    def _iter_words(self, node, prefix):
         """
-        Check if the tree is empty.
+        Lazily yield the words of a subtree in lexicographic order.
         
-        Returns:
-            bool: True if tree is empty, False otherwise
+        Args:
+            node: Root of the subtree
+            prefix (str): Characters on the path above the subtree
         """
-        return self.root is None
-
-    def clear(self):
-        """Clear all words from the tree."""
-        self.root = None
-        self.word_count = 0
+        return self._walk([(node, prefix)])
 
-    def height(self):
+    @staticmethod
+    def _walk(stack):
         """
-        Calculate the height of the tree.
+        Continue an in-order walk from a stack of pending entries.
         
-        Returns:
-            int: Height of the tree (0 for empty tree)
+        Args:
+            stack (list): (node, prefix) subtrees and (None, word) words, the next one last
         """
-        return self._height_recursive(self.root)
+        while stack:
+            node, prefix = stack.pop()
+            if node is None:
+                yield prefix # a finished word, emitted between _ls and _eq
+                continue
+            word = prefix + node.char
+            if node._gt is not None:
+                stack.append((node._gt, prefix))
+            if node._eq is not None:
+                stack.append((node._eq, word))
+            if node.end_of_word:
+                stack.append((None, word))
+            if node._ls is not None:
+                stack.append((node._ls, prefix))
 
-    def _height_recursive(self, node):
+    def _prefix_words(self, prefix):
         """
-        Recursively calculate height of subtree.
+        Iterator over the stored words starting with a normalized prefix.
         
         Args:
-            node: Root of subtree
-            
-        Returns:
-            int: Height of subtree
+            prefix (str): Normalized prefix, '' matches every word
         """
+        if self.root is None:
+            return iter(())
+        if prefix == '':
+            return self._iter_words(self.root, '')
+        
+        node = self._locate(prefix)
         if node is None:
-            return 0
+            return iter(())
+        words = self._iter_words(node._eq, prefix) if node._eq is not None else iter(())
+        if node.end_of_word:
+            words = chain((prefix,), words)
+        return words
+
+    def keys_with_prefix(self, prefix, limit=None):
+        """
+        Lazily yield the stored words starting with a prefix, in sorted order.
+        
+        The tree is descended to the prefix node once; matches are then
+        produced one at a time, so stopping early only touches the nodes
+        needed for the words already yielded. With a cache, bounded
+        queries (limit given) are cached as lists.
+        
+        Args:
+            prefix (str): Prefix to complete, '' matches every word
+            limit (int): Maximum number of words to yield, None for all
+        """
+        if not isinstance(prefix, str):
+            return
+        
+        prefix = prefix.lower()
+        if self._cache is None or limit is None:
+            yield from islice(self._prefix_words(prefix), limit)
+            return
+        
+        key = ('prefix', prefix, limit)
+        words = self._cache.get(key)
+        if words is None:
+            words = list(islice(self._prefix_words(prefix), limit))
+            self._cache_query(key, words)
+        yield from words
+
+    def autocomplete(self, prefix, k=10):
+        """
+        Complete a prefix with its k highest-scoring words.
+        
+        Completions are ordered by descending weight, ties alphabetically.
+        The search is best-first on the cached max_weight of each subtree,
+        so subtrees that can't beat the k-th result are never expanded.
+        
+        Args:
+            prefix (str): Prefix to complete
+            k (int): Maximum number of completions
+            
+        Returns:
+            list: Up to k completions
+        """
+        if not isinstance(prefix, str) or k <= 0:
+            return []
+        
+        prefix = prefix.lower()
+        if self._cache is None:
+            return self._top_k(prefix, k)
+        
+        key = ('autocomplete', prefix, k)
+        words = self._cache.get(key)
+        if words is None:
+            words = self._top_k(prefix, k)
+            self._cache_query(key, words)
+        return list(words) #a copy, callers may modify the result
+
+    def _top_k(self, prefix, k):
+        """
+        Best-first search for the k highest-scoring completions.
+        
+        Args:
+            prefix (str): Normalized prefix
+            k (int): Maximum number of completions, positive
+            
+        Returns:
+            list: Up to k completions
+        """
+        if self.root is None:
+            return []
+        
+        if prefix == '':
+            start, bound = self.root, self.root.max_weight
+        else:
+            node = self._locate(prefix)
+            if node is None:
+                return []
+            start = node._eq
+            bound = node.weight if node.end_of_word else 0
+            if start is not None and start.max_weight > bound:
+                bound = start.max_weight
+        
+        if bound == 0:
+            return list(islice(self._prefix_words(prefix), k)) #unweighted: sorted order is the ranking
+        
+        # Heap entries: (-score bound, smallest possible word, tiebreak, node or None for a word)
+        tiebreak = count()
+        heap = []
+        if prefix and node.end_of_word:
+            heap.append((-node.weight, prefix, next(tiebreak), None))
+        if start is not None:
+            heap.append((-start.max_weight, prefix, next(tiebreak), start))
+        heapq.heapify(heap)
+        
+        results = []
+        while heap and len(results) < k:
+            neg_bound, key, _, node = heapq.heappop(heap)
+            if node is None:
+                results.append(key) #a word, nothing left in the heap can beat it
+                continue
+            word = key + node.char
+            if node._ls is not None:
+                heapq.heappush(heap, (-node._ls.max_weight, key, next(tiebreak), node._ls))
+            if node.end_of_word:
+                heapq.heappush(heap, (-node.weight, word, next(tiebreak), None))
+            if node._eq is not None:
+                heapq.heappush(heap, (-node._eq.max_weight, word, next(tiebreak), node._eq))
+            if node._gt is not None:
+                heapq.heappush(heap, (-node._gt.max_weight, key, next(tiebreak), node._gt))
+        
+        return results
+
+    def near_matches(self, word, max_distance=1):
+        """
+        Find the stored words within a Levenshtein distance of a word.
+        
+        The tree is walked with one DP row per _eq step; a branch is
+        abandoned as soon as the smallest value in its row exceeds
+        max_distance, since no longer candidate can get closer. The cost
+        therefore follows the size of the neighborhood, not the dictionary.
+        
+        Args:
+            word (str): Query word
+            max_distance (int): Largest edit distance to report
+            
+        Returns:
+            list: (word, distance) pairs sorted by distance, then word
+        """
+        if max_distance < 0:
+            raise ValueError(f"max_distance must be non-negative, got {max_distance!r}")
+        if not isinstance(word, str) or self.root is None:
+            return []
+        
+        word = word.lower().strip()
+        matches = []
+        stack = [(self.root, '', list(range(len(word) + 1)))] # (node, prefix above node, row for prefix)
+        
+        while stack:
+            node, prefix, row = stack.pop()
+            if node._ls is not None:
+                stack.append((node._ls, prefix, row))
+            if node._gt is not None:
+                stack.append((node._gt, prefix, row))
+            
+            new_row = _next_edit_row(row, word, node.char)
+            if node.end_of_word and new_row[-1] <= max_distance:
+                matches.append((prefix + node.char, new_row[-1]))
+            if node._eq is not None and min(new_row) <= max_distance:
+                stack.append((node._eq, prefix + node.char, new_row))
+        
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def match(self, pattern, limit=None):
+        """
+        Lazily yield the stored words matching a wildcard pattern, in sorted order.
+        
+        '?' matches one character and '*' any run of characters, e.g.
+        'c?t' or 'ap*' or 'a*le'. Sibling trees are only searched on the
+        sides that can hold a character the pattern accepts, so literal
+        characters are found by ordinary _ls/_gt descent.
+        
+        Args:
+            pattern (str): Pattern to match
+            limit (int): Maximum number of words to yield, None for all
+        """
+        if not isinstance(pattern, str) or self.root is None:
+            return
+        
+        yield from islice(self._iter_matches(_PatternMatcher(pattern.lower().strip())), limit)
+
+    def _iter_matches(self, matcher):
+        """In-order walk of the branches that can still match the pattern."""
+        stack = [(self.root, '', matcher.start)] # (node, prefix above node, state for prefix)
+        
+        while stack:
+            node, prefix, state = stack.pop()
+            if node is None:
+                yield prefix # a finished word, emitted between _ls and _eq
+                continue
+            
+            wild, literals = matcher.choices(state)
+            char = node.char
+            if node._gt is not None and (wild or any(c > char for c in literals)):
+                stack.append((node._gt, prefix, state))
+            if wild or char in literals:
+                next_state = matcher.step(state, char)
+                if next_state:
+                    if node._eq is not None:
+                        stack.append((node._eq, prefix + char, next_state))
+                    if node.end_of_word and matcher.accepts(next_state):
+                        stack.append((None, prefix + char, None))
+            if node._ls is not None and (wild or any(c < char for c in literals)):
+                stack.append((node._ls, prefix, state))
+
+    def range(self, lo=None, hi=None):
+        """
+        Lazily yield the stored words w with lo <= w < hi, in sorted order.
+        
+        The tree is descended once along lo to set up the walk, which
+        then stops at the first word that isn't below hi, so a page of
+        a large dictionary costs its depth plus its length.
+        
+        Args:
+            lo (str): Smallest word to yield, None for no lower bound
+            hi (str): Bound above the last word to yield, None for no upper bound
+        """
+        lo = '' if lo is None else _ordered_key(lo)
+        hi = None if hi is None else _ordered_key(hi)
+        stack = []
+        node = self.root
+        prefix = ''
+        index = 0
+        
+        if lo == '':
+            if node is not None:
+                stack.append((node, ''))
+            node = None
+        
+        while node is not None: # collect everything after lo on the way down
+            char = lo[index]
+            if char < node.char:
+                word = prefix + node.char
+                if node._gt is not None:
+                    stack.append((node._gt, prefix))
+                if node._eq is not None:
+                    stack.append((node._eq, word))
+                if node.end_of_word:
+                    stack.append((None, word))
+                node = node._ls
+            elif char > node.char:
+                node = node._gt
+            else:
+                if node._gt is not None:
+                    stack.append((node._gt, prefix))
+                prefix += char
+                if index == len(lo) - 1:
+                    if node._eq is not None:
+                        stack.append((node._eq, prefix))
+                    if node.end_of_word:
+                        stack.append((None, prefix))
+                    break
+                index += 1
+                node = node._eq
+        
+        for word in self._walk(stack):
+            if hi is not None and word >= hi:
+                return
+            yield word
+
+    def rank(self, key):
+        """
+        Count the stored words that sort before a key.
+        
+        Uses the subtree word counts, so it costs one descent.
+        
+        Args:
+            key (str): Any word, stored or not
+            
+        Returns:
+            int: Number of stored words smaller than key
+        """
+        key = _ordered_key(key)
+        rank = 0
+        node = self.root if key else None
+        index = 0
+        last = len(key) - 1
+        
+        while node is not None:
+            char = key[index]
+            if char < node.char:
+                node = node._ls
+            elif char > node.char:
+                rank += node.size - (node._gt.size if node._gt is not None else 0) # _ls, the word and _eq
+                node = node._gt
+            else:
+                if node._ls is not None:
+                    rank += node._ls.size
+                if index == last:
+                    break
+                rank += node.end_of_word # a proper prefix of key
+                index += 1
+                node = node._eq
+        
+        return rank
+
+    def select(self, i):
+        """
+        Get the stored word at a position in sorted order.
+        
+        Uses the subtree word counts, so it costs one descent.
+        
+        Args:
+            i (int): Position, negative values count from the end
+            
+        Returns:
+            str: The word with rank i
+        """
+        if i < 0:
+            i += self.word_count
+        if not 0 <= i < self.word_count:
+            raise IndexError("select index out of range")
+        
+        node = self.root
+        prefix = ''
+        while True:
+            if node._ls is not None:
+                if i < node._ls.size:
+                    node = node._ls
+                    continue
+                i -= node._ls.size
+            if node.end_of_word:
+                if i == 0:
+                    return prefix + node.char
+                i -= 1
+            if node._eq is not None:
+                if i < node._eq.size:
+                    prefix += node.char
+                    node = node._eq
+                    continue
+                i -= node._eq.size
+            node = node._gt
+
+    def floor(self, key):
+        """
+        Get the largest stored word that is not greater than a key.
+        
+        Args:
+            key (str): Any word, stored or not
+            
+        Returns:
+            str: The word, None if every stored word is greater
+        """
+        key = _ordered_key(key)
+        if key and self._contains(key):
+            return key
+        rank = self.rank(key)
+        return self.select(rank - 1) if rank else None
+
+    def ceiling(self, key):
+        """
+        Get the smallest stored word that is not smaller than a key.
+        
+        Args:
+            key (str): Any word, stored or not
+            
+        Returns:
+            str: The word, None if every stored word is smaller
+        """
+        return next(self.range(key), None)
+
+    def delete(self, word):
+        """
+        Delete a word from the ternary search tree.
+        
+        Args:
+            word (str): The word to delete
+            
+        Returns:
+            bool: True if word was deleted, False if word didn't exist
+        """
+        if not isinstance(word, str) or not word:
+            return False
+        
+        word = word.lower().strip()
+        if not word or not self._contains(word):
+            return False
+        
+        self._delete_iterative(word)
+        self.word_count -= 1
+        if self._cache is not None:
+            self._invalidate(word)
+        return True
+
+    def _delete_iterative(self, word):
+        """
+        Unmark a stored word and prune the nodes that are no longer useful.
+        
+        Args:
+            word: Normalized word that is known to be in the tree
+            
+        Returns:
+            int: Number of pruned nodes
+        """
+        path = [] # (parent, link, node) triples leading to the word
+        indexes = [] # character index compared at each path node
+        parent, link = None, None
+        node = self.root
+        index = 0
+        last = len(word) - 1
         
-        left_height = self._height_recursive(node._ls)
-        equal_height = self._height_recursive(node._eq) 
-        right_height = self._height_recursive(node._gt)
+        while True:
+            path.append((parent, link, node))
+            indexes.append(index)
+            char = word[index]
+            if char < node.char:
+                parent, link, node = node, '_ls', node._ls
+            elif char > node.char:
+                parent, link, node = node, '_gt', node._gt
+            elif index == last:
+                node.end_of_word = False
+                node.weight = 0
+                break
+            else:
+                parent, link, node = node, '_eq', node._eq
+                index += 1
+        
+        # Remove nodes bottom-up while they are not useful anymore
+        visited = len(path)
+        while path:
+            parent, link, node = path[-1]
+            if (node.end_of_word or
+                node._ls is not None or
+                node._eq is not None or
+                node._gt is not None):
+                break
+            if parent is None:
+                self.root = None
+            else:
+                setattr(parent, link, None)
+            path.pop()
+            if indexes.pop() == self.prefix_index - 1: # a pruned node of the prefix index
+                self._index.pop(word[:self.prefix_index - 1] + node.char, None)
+        
+        depth = self.prefix_index
+        if depth and len(word) >= depth: # the indexed node can survive as a sibling holding no word
+            for (_, _, node), index in zip(reversed(path), reversed(indexes)):
+                if index < depth - 1:
+                    break
+                if index == depth - 1 and node.char == word[depth - 1]:
+                    if node._eq is None and not node.end_of_word:
+                        self._index.pop(word[:depth], None)
+                    break
+        
+        for _, _, node in path:
+            node.size -= 1
+        self._refresh_max_weights([node for _, _, node in path])
+        return visited - len(path)
+
+    def is_empty(self):
+        """
+        Check if the tree is empty.
+        
+        Returns:
+            bool: True if tree is empty, False otherwise
+        """
+        return self.root is None
+
+    def clear(self):
+        """Clear all words from the tree."""
+        self.root = None
+        self.word_count = 0
+        self._index.clear()
+        if self._cache is not None:
+            self._cache.clear()
+            self._cached_queries.clear()
+
+    def height(self):
+        """
+        Calculate the height of the tree.
+        
+        Returns:
+            int: Height of the tree (0 for empty tree)
+        """
+        height = 0
+        stack = [(self.root, 1)] if self.root is not None else []
+        
+        while stack:
+            node, depth = stack.pop()
+            if depth > height:
+                height = depth
+            depth += 1
+            if node._ls is not None:
+                stack.append((node._ls, depth))
+            if node._eq is not None:
+                stack.append((node._eq, depth))
+            if node._gt is not None:
+                stack.append((node._gt, depth))
+        
+        return height
+
+    def average_depth(self):
+        """
+        Average number of nodes visited by a successful search.
+        
+        With a prefix index, words at least prefix_index long are counted
+        from the node the index jumps to.
+        
+        Returns:
+            float: Mean depth of the word-terminating nodes (0.0 for empty tree)
+        """
+        if self.root is None:
+            return 0.0
+        
+        total = 0
+        last_indexed = self.prefix_index - 1
+        stack = [(self.root, 1, 0, 0)] # (node, depth, character index, nodes skipped by the prefix index)
+        
+        while stack:
+            node, depth, index, skipped = stack.pop()
+            if index == last_indexed:
+                skipped = depth - 1 # searches through this node start here
+            if node.end_of_word:
+                total += depth - skipped
+            if node._ls is not None:
+                stack.append((node._ls, depth + 1, index, 0 if index <= last_indexed else skipped))
+            if node._eq is not None:
+                stack.append((node._eq, depth + 1, index + 1, skipped))
+            if node._gt is not None:
+                stack.append((node._gt, depth + 1, index, 0 if index <= last_indexed else skipped))
+        
+        return total / self.word_count
+
+    def node_count(self):
+        """
+        Count the nodes of the tree.
+        
+        Returns:
+            int: Number of nodes (0 for empty tree)
+        """
+        count = 0
+        stack = [self.root] if self.root is not None else []
+        
+        while stack:
+            node = stack.pop()
+            count += 1
+            if node._ls is not None:
+                stack.append(node._ls)
+            if node._eq is not None:
+                stack.append(node._eq)
+            if node._gt is not None:
+                stack.append(node._gt)
+        
+        return count
+
+    def _snapshot_arrays(self):
+        """
+        Flatten the nodes into parallel arrays, numbered in preorder.
+        
+        Returns:
+            tuple: (chars, flags, ls, eq, gt, root, word_count, weights, max_weights) in the
+                CompactTernarySearchTree layout, the weights None when no word has one
+        """
+        chars, flags = array('I', [0]), array('B', [0])
+        ls, eq, gt = array('i', [0]), array('i', [0]), array('i', [0])
+        stack = [(self.root, 0, None)] if self.root is not None else [] # (node, parent index, parent link array)
+        # the root's max_weight is the largest weight of the tree
+        weights = [0] if self.root is not None and self.root.max_weight else None
+        max_weights = [0]
+        
+        while stack:
+            node, parent, links = stack.pop()
+            index = len(chars)
+            chars.append(ord(node.char))
+            flags.append(node.end_of_word)
+            ls.append(0)
+            eq.append(0)
+            gt.append(0)
+            if weights is not None:
+                weights.append(node.weight)
+                max_weights.append(node.max_weight)
+            if links is not None:
+                links[parent] = index
+            if node._gt is not None:
+                stack.append((node._gt, index, gt))
+            if node._eq is not None:
+                stack.append((node._eq, index, eq))
+            if node._ls is not None:
+                stack.append((node._ls, index, ls))
+        
+        if weights is not None:
+            weights, max_weights = _weight_arrays(weights, max_weights)
+        else:
+            max_weights = None
+        return chars, flags, ls, eq, gt, (1 if self.root is not None else 0), self.word_count, weights, max_weights
+
+    def save(self, path):
+        """
+        Save the tree to a flat binary snapshot.
+        
+        When any word has a weight the weights are saved too, so trees
+        loaded from the snapshot rank autocomplete like this one.
+        
+        Args:
+            path: Destination file
+        """
+        with open(path, 'wb') as f:
+            _write_snapshot(f, *self._snapshot_arrays())
+
+    @staticmethod
+    def load(path, mmap=True):
+        """
+        Load a snapshot written by save.
+        
+        With mmap=True the file is memory-mapped and searched in place: no
+        per-node objects are created and processes loading the same file
+        share its pages. Otherwise the arrays are read into a mutable
+        CompactTernarySearchTree.
         
-        return 1 + max(left_height, equal_height, right_height)
+        Args:
+            path: Snapshot file
+            mmap (bool): Memory-map the file instead of reading it
+            
+        Returns:
+            FrozenTernarySearchTree or CompactTernarySearchTree: The loaded tree
+        """
+        if not mmap:
+            with open(path, 'rb') as f:
+                return CompactTernarySearchTree._from_snapshot(f.read())
+        
+        if sys.byteorder != 'little':
+            raise ValueError("memory-mapped snapshots need a little-endian host, use mmap=False")
+        with open(path, 'rb') as f:
+            mapped = mmap_module.mmap(f.fileno(), 0, access=mmap_module.ACCESS_READ)
+        try:
+            return FrozenTernarySearchTree(mapped, owner=mapped)
+        except ValueError:
+            mapped.close()
+            raise
 
     def __repr__(self):
         """Detailed string representation."""
         return f"TernarySearchTree(words={len(self)}, height={self.height()})"
+
+
+class InstrumentedTernarySearchTree(TernarySearchTree):
+    """
+    TernarySearchTree that counts the nodes visited by each operation.
+    
+    Returned by TernarySearchTree(stats=True), so the plain class pays
+    nothing for the counters. Insert, search and delete run counting
+    copies of their descent loops, so a call is traced exactly once and
+    only the nodes it really reads are counted: a query answered by the
+    cache visits nothing and the prefix index starts at the indexed node.
+    insert_many shares its descent between the words of a batch, so it
+    isn't part of the per-operation counters. The node count and the
+    maximum depth are kept up to date as nodes are created and removed,
+    and recounted after bulk builds; the maximum depth is a high-water
+    mark that only goes down on rebalance() and clear().
+    """
+
+    OPERATIONS = ("insert", "search", "delete")
+
+    def __init__(self, storage="node", cache_size=0, prefix_index=0, rebalance_factor=None, stats=True):
+        super().__init__(storage, cache_size, prefix_index, rebalance_factor)
+        self._nodes = 0
+        self._max_depth = 0
+        # operation -> visit count and histograms of visits, _ls/_gt steps and _eq steps per call
+        self._ops = {name: {'count': 0, 'visits': 0, 'depth': Counter(), 'sibling_steps': Counter(),
+                            'eq_steps': Counter()}
+                     for name in self.OPERATIONS}
+
+    @classmethod
+    def from_iterable_parallel(cls, words, workers=None, presorted=False, prefix_index=0):
+        tree = super().from_iterable_parallel(words, workers, presorted, prefix_index)
+        tree._recount() # the shards are built without counters
+        return tree
+
+    def _recount(self):
+        """Count the nodes and the depth again after nodes were added without the counters."""
+        self._nodes = self.node_count()
+        self._max_depth = self.height()
+
+    def _record(self, operation, siblings, matched):
+        """Count the descent of a word for an operation, returns the number of visited nodes."""
+        visits = siblings + matched
+        counters = self._ops[operation]
+        counters['count'] += 1
+        counters['visits'] += visits
+        counters['depth'][visits] += 1
+        counters['sibling_steps'][siblings] += 1
+        counters['eq_steps'][matched] += 1
+        return visits
+
+    def insert_character(self, node, word, index):
+        resumed = node is not None and node is not self.root # insert continues below an indexed prefix
+        if node is None:
+            node = self.Node(word[index])
+            self._nodes += 1
+        root = node
+        start = index
+        last = len(word) - 1
+        siblings = 0
+
+        while True:
+            node.size += 1
+            char = word[index]
+
+            if char < node.char:
+                siblings += 1
+                if node._ls is None:
+                    node._ls = self.Node(char)
+                    self._nodes += 1
+                node = node._ls
+            elif char > node.char:
+                siblings += 1
+                if node._gt is None:
+                    node._gt = self.Node(char)
+                    self._nodes += 1
+                node = node._gt
+            elif index == last:
+                if not node.end_of_word:
+                    node.end_of_word = True
+                    self.word_count += 1
+                else:
+                    self._add_to_sizes(word, -1)
+                break
+            else:
+                index += 1
+                if node._eq is None:
+                    node._eq = self.Node(word[index])
+                    self._nodes += 1
+                node = node._eq
+
+        depth = self._record("insert", siblings, index - start + 1)
+        if resumed: # add the nodes above the indexed one
+            depth += len(self._index[word[:self.prefix_index]][1])
+        if depth > self._max_depth:
+            self._max_depth = depth
+        return root
+
+    def insert_many(self, words):
+        added = super().insert_many(words)
+        self._recount()
+        return added
+
+    def _descend(self, operation, word):
+        """
+        Find the node of the last character of a normalized word, counting the visited nodes.
+        
+        Returns:
+            Node or None: The node, None if the path doesn't exist
+        """
+        node = self.root
+        index = 0
+        depth = self.prefix_index
+        if depth and len(word) >= depth:
+            entry = self._index.get(word[:depth])
+            node = entry[0] if entry is not None else None
+            index = depth - 1
+        start = index
+        last = len(word) - 1
+        siblings = 0
+
+        while node is not None:
+            char = word[index]
+            if char < node.char:
+                siblings += 1
+                node = node._ls
+            elif char > node.char:
+                siblings += 1
+                node = node._gt
+            elif index == last:
+                self._record(operation, siblings, index - start + 1)
+                return node
+            else:
+                index += 1
+                node = node._eq
+
+        self._record(operation, siblings, index - start)
+        return None
+
+    def search(self, word, exact=False):
+        if not isinstance(word, str):
+            return False
+        word = word.lower().strip()
+        if word == '':
+            return False
+
+        if self._cache is not None:
+            found = self._cache.get(('search', word))
+            if found is not None:
+                return found # answered without visiting a node
+        node = self._descend("search", word)
+        found = node is not None and node.end_of_word
+        if self._cache is not None:
+            self._cache.put(('search', word), found)
+        return found
+
+    def delete(self, word):
+        if not isinstance(word, str):
+            return False
+        word = word.lower().strip()
+        if word == '':
+            return False
+
+        node = self._descend("delete", word)
+        if node is None or not node.end_of_word:
+            return False
+        self._nodes -= self._delete_iterative(word)
+        self.word_count -= 1
+        if self._cache is not None:
+            self._invalidate(word)
+        return True
+
+    def rebalance(self):
+        super().rebalance()
+        self._max_depth = self.height()
+
+    def clear(self):
+        super().clear()
+        self._nodes = 0
+        self._max_depth = 0
+
+    def stats(self):
+        """
+        Snapshot of the counters, cheap enough to export on every scrape.
+        
+        Returns:
+            dict: nodes, max_depth and words, plus per operation (insert,
+            search, delete) the call count, total visited nodes and
+            histograms {value: calls} of visited nodes ('depth'), _ls/_gt
+            steps and _eq steps per call
+        """
+        snapshot = {'nodes': self._nodes, 'max_depth': self._max_depth, 'words': self.word_count}
+        for name, counters in self._ops.items():
+            snapshot[name] = {
+                'count': counters['count'],
+                'visits': counters['visits'],
+                'depth': dict(sorted(counters['depth'].items())),
+                'sibling_steps': dict(sorted(counters['sibling_steps'].items())),
+                'eq_steps': dict(sorted(counters['eq_steps'].items()))
+            }
+        return snapshot
+
+    def __repr__(self):
+        """Detailed string representation."""
+        return f"InstrumentedTernarySearchTree(words={self.word_count}, max_depth={self._max_depth})"
+
+
+class RadixTernarySearchTree:
+    """
+    Ternary search tree whose _eq chains are collapsed into string segments.
+    
+    A node holds a segment of one or more characters. Its first character
+    is compared like the character of an ordinary node to choose between
+    _ls, the node itself and _gt; the remaining characters stand for a run
+    of nodes that would each have had a single _eq child and no word
+    ending. A word ends after the whole segment of its last node. Long
+    shared prefixes and unique suffixes therefore cost one node and one
+    C-level string comparison instead of one node per character. Nodes
+    are split when an insert diverges inside a segment and merged again
+    when a delete leaves a single _eq child. Selected with
+    ``TernarySearchTree(storage="radix")``.
+    """
+
+    class Node:
+        __slots__ = ("chars", "end_of_word", "_ls", "_eq", "_gt")
+
+        def __init__(self, chars, end_of_word=False):
+            self.chars = chars # segment, chars[0] is the branching character
+            self.end_of_word = end_of_word # a word ends after the last character of the segment
+            self._ls = None
+            self._eq = None
+            self._gt = None
+
+    def __init__(self):
+        self.root = None
+        self.word_count = 0
+
+    @classmethod
+    def from_iterable(cls, words, presorted=False):
+        """
+        Build a height-balanced tree from an iterable of words.
+        
+        Args:
+            words: Iterable of words, duplicates are allowed
+            presorted (bool): Words are already sorted, skips the sort
+            
+        Returns:
+            RadixTernarySearchTree: The new tree
+        """
+        tree = cls()
+        for word in _median_order(_unique_sorted(words, presorted)):
+            tree.insert(word)
+        return tree
+
+    def __len__(self):
+        return self.word_count
+
+    def __iter__(self):
+        return self._iter_words(self.root, '') if self.root is not None else iter(())
+
+    def __contains__(self, word):
+        return self.search(word)
+
+    def is_empty(self):
+        """
+        Check if the tree is empty.
+        
+        Returns:
+            bool: True if tree is empty, False otherwise
+        """
+        return self.root is None
+
+    def clear(self):
+        """Clear all words from the tree."""
+        self.root = None
+        self.word_count = 0
+
+    def all_strings(self):
+        """
+        Collect all words of the tree in lexicographic order.
+        
+        Returns:
+            list: All stored words
+        """
+        return list(self)
+
+    def insert(self, word):
+        """
+        Insert a word, splitting the segment where it diverges.
+        
+        Args:
+            word (str): The word to insert
+        """
+        if not isinstance(word, str):
+            return
+        
+        word = word.lower().strip()
+        if word == '':
+            return
+        
+        if self.root is None:
+            self.root = self.Node(word, True)
+            self.word_count += 1
+            return
+        
+        node = self.root
+        index = 0
+        while True:
+            char = word[index]
+            chars = node.chars
+            if char < chars[0]:
+                if node._ls is None:
+                    node._ls = self.Node(word[index:], True)
+                    break
+                node = node._ls
+            elif char > chars[0]:
+                if node._gt is None:
+                    node._gt = self.Node(word[index:], True)
+                    break
+                node = node._gt
+            else:
+                shared = 1
+                limit = min(len(chars), len(word) - index)
+                while shared < limit and chars[shared] == word[index + shared]:
+                    shared += 1
+                if shared < len(chars): # the word leaves or ends inside the segment
+                    tail = self.Node(chars[shared:], node.end_of_word)
+                    tail._eq = node._eq
+                    node.chars = chars[:shared]
+                    node.end_of_word = False
+                    node._eq = tail
+                index += shared
+                if index == len(word):
+                    if node.end_of_word:
+                        return
+                    node.end_of_word = True
+                    break
+                if node._eq is None:
+                    if node.end_of_word:
+                        node._eq = self.Node(word[index:], True)
+                    else: # a node kept for its siblings takes the rest of the word itself
+                        node.chars += word[index:]
+                        node.end_of_word = True
+                    break
+                node = node._eq
+        
+        self.word_count += 1
+
+    def insert_many(self, words):
+        """
+        Insert a batch of words.
+        
+        Args:
+            words: Iterable of words
+            
+        Returns:
+            int: Number of words that were not in the tree yet
+        """
+        before = self.word_count
+        for word in _unique_sorted(words):
+            self.insert(word)
+        return self.word_count - before
+
+    def rebalance(self):
+        """Rebuild every _ls/_gt sibling tree into a balanced BST in linear time."""
+        if self.root is not None:
+            self.root, _ = _balance_siblings(self.root)
+
+    def _find(self, word):
+        """
+        Find the node whose segment ends exactly at the end of a normalized word.
+        
+        Args:
+            word (str): Normalized, non-empty word
+            
+        Returns:
+            Node or None: The node, None if no segment ends there
+        """
+        node = self.root
+        index = 0
+        
+        while node is not None:
+            char = word[index]
+            chars = node.chars
+            if char < chars[0]:
+                node = node._ls
+            elif char > chars[0]:
+                node = node._gt
+            elif not word.startswith(chars, index):
+                return None
+            else:
+                index += len(chars)
+                if index == len(word):
+                    return node
+                node = node._eq
+        
+        return None
+
+    def search(self, word, exact=False):
+        """
+        Check whether a word is stored in the tree.
+        
+        Args:
+            word (str): The word to look up
+            
+        Returns:
+            bool: True if the word is stored in the tree
+        """
+        if not isinstance(word, str):
+            return False
+        
+        word = word.lower().strip()
+        if word == '':
+            return False
+        
+        node = self._find(word)
+        return node is not None and node.end_of_word
+
+    def search_many(self, words):
+        """
+        Look up a batch of words.
+        
+        Args:
+            words (list): Words to look up
+            
+        Returns:
+            list: One bool per word, in the caller's order
+        """
+        return [self.search(word) for word in words]
+
+    def delete(self, word):
+        """
+        Delete a word, pruning emptied nodes and merging single _eq children back.
+        
+        Args:
+            word (str): The word to delete
+            
+        Returns:
+            bool: True if word was deleted, False if word didn't exist
+        """
+        if not isinstance(word, str) or not word:
+            return False
+        
+        word = word.lower().strip()
+        if not word:
+            return False
+        
+        path = [] # (parent, link, node) triples leading to the word
+        parent, link = None, None
+        node = self.root
+        index = 0
+        
+        while node is not None:
+            path.append((parent, link, node))
+            char = word[index]
+            chars = node.chars
+            if char < chars[0]:
+                parent, link, node = node, '_ls', node._ls
+            elif char > chars[0]:
+                parent, link, node = node, '_gt', node._gt
+            elif not word.startswith(chars, index):
+                return False
+            else:
+                index += len(chars)
+                if index == len(word):
+                    break
+                parent, link, node = node, '_eq', node._eq
+        
+        if node is None or not node.end_of_word:
+            return False
+        node.end_of_word = False
+        self.word_count -= 1
+        
+        # Bottom-up: unlink nodes without a word or _eq child, merge nodes left with a lone _eq child
+        for parent, link, node in reversed(path):
+            if node.end_of_word:
+                continue
+            child = node._eq
+            if child is None:
+                if node._ls is not None and node._gt is not None:
+                    node.chars = node.chars[0] # kept to join its siblings, the rest of the segment leads nowhere
+                    continue
+                replacement = node._ls if node._ls is not None else node._gt
+                if parent is None:
+                    self.root = replacement
+                else:
+                    setattr(parent, link, replacement)
+            elif child._ls is None and child._gt is None:
+                node.chars += child.chars
+                node.end_of_word = child.end_of_word
+                node._eq = child._eq
+        
+        return True
+
+    def _iter_words(self, node, prefix):
+        """
+        Lazily yield the words of a subtree in lexicographic order.
+        
+        Args:
+            node: Root of the subtree
+            prefix (str): Characters on the path above the subtree
+        """
+        return self._walk([(node, prefix)])
+
+    @staticmethod
+    def _walk(stack):
+        """
+        Continue an in-order walk from a stack of pending entries.
+        
+        Args:
+            stack (list): (node, prefix) subtrees and (None, word) words, the next one last
+        """
+        while stack:
+            node, prefix = stack.pop()
+            if node is None:
+                yield prefix # a finished word, emitted between _ls and _eq
+                continue
+            word = prefix + node.chars
+            if node._gt is not None:
+                stack.append((node._gt, prefix))
+            if node._eq is not None:
+                stack.append((node._eq, word))
+            if node.end_of_word:
+                stack.append((None, word))
+            if node._ls is not None:
+                stack.append((node._ls, prefix))
+
+    def keys_with_prefix(self, prefix, limit=None):
+        """
+        Lazily yield the stored words starting with a prefix, in sorted order.
+        
+        Args:
+            prefix (str): Prefix to complete, '' matches every word
+            limit (int): Maximum number of words to yield, None for all
+        """
+        if not isinstance(prefix, str) or self.root is None:
+            return
+        
+        prefix = prefix.lower()
+        if prefix == '':
+            yield from islice(self._iter_words(self.root, ''), limit)
+            return
+        
+        node = self.root
+        index = 0
+        while node is not None:
+            char = prefix[index]
+            chars = node.chars
+            if char < chars[0]:
+                node = node._ls
+            elif char > chars[0]:
+                node = node._gt
+            elif len(prefix) - index <= len(chars): # the prefix ends inside this segment
+                if not chars.startswith(prefix[index:]):
+                    return
+                word = prefix[:index] + chars
+                words = self._iter_words(node._eq, word) if node._eq is not None else iter(())
+                if node.end_of_word:
+                    words = chain((word,), words)
+                yield from islice(words, limit)
+                return
+            elif not prefix.startswith(chars, index):
+                return
+            else:
+                index += len(chars)
+                node = node._eq
+
+    def autocomplete(self, prefix, k=10):
+        """
+        Complete a prefix with the first k matching words in sorted order.
+        
+        Args:
+            prefix (str): Prefix to complete
+            k (int): Maximum number of completions
+            
+        Returns:
+            list: Up to k completions
+        """
+        if k <= 0:
+            return []
+        return list(self.keys_with_prefix(prefix, k))
+
+    def near_matches(self, word, max_distance=1):
+        """
+        Find the stored words within a Levenshtein distance of a word.
+        
+        Same pruned DP walk as TernarySearchTree.near_matches, with one
+        row per character of each segment.
+        
+        Args:
+            word (str): Query word
+            max_distance (int): Largest edit distance to report
+            
+        Returns:
+            list: (word, distance) pairs sorted by distance, then word
+        """
+        if max_distance < 0:
+            raise ValueError(f"max_distance must be non-negative, got {max_distance!r}")
+        if not isinstance(word, str) or self.root is None:
+            return []
+        
+        word = word.lower().strip()
+        matches = []
+        stack = [(self.root, '', list(range(len(word) + 1)))] # (node, prefix above node, row for prefix)
+        
+        while stack:
+            node, prefix, row = stack.pop()
+            if node._ls is not None:
+                stack.append((node._ls, prefix, row))
+            if node._gt is not None:
+                stack.append((node._gt, prefix, row))
+            
+            for char in node.chars:
+                row = _next_edit_row(row, word, char)
+                if min(row) > max_distance:
+                    break
+            else:
+                prefix += node.chars
+                if node.end_of_word and row[-1] <= max_distance:
+                    matches.append((prefix, row[-1]))
+                if node._eq is not None:
+                    stack.append((node._eq, prefix, row))
+        
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def match(self, pattern, limit=None):
+        """
+        Lazily yield the stored words matching a wildcard pattern, in sorted order.
+        
+        Args:
+            pattern (str): Pattern with '?' for one character and '*' for any run
+            limit (int): Maximum number of words to yield, None for all
+        """
+        if not isinstance(pattern, str) or self.root is None:
+            return
+        
+        yield from islice(self._iter_matches(_PatternMatcher(pattern.lower().strip())), limit)
+
+    def _iter_matches(self, matcher):
+        """In-order walk of the branches that can still match the pattern."""
+        stack = [(self.root, '', matcher.start)] # (node, prefix above node, state for prefix)
+        
+        while stack:
+            node, prefix, state = stack.pop()
+            if node is None:
+                yield prefix
+                continue
+            
+            wild, literals = matcher.choices(state)
+            first = node.chars[0]
+            if node._gt is not None and (wild or any(c > first for c in literals)):
+                stack.append((node._gt, prefix, state))
+            next_state = state
+            for char in node.chars:
+                next_state = matcher.step(next_state, char)
+                if not next_state:
+                    break
+            else:
+                word = prefix + node.chars
+                if node._eq is not None:
+                    stack.append((node._eq, word, next_state))
+                if node.end_of_word and matcher.accepts(next_state):
+                    stack.append((None, word, None))
+            if node._ls is not None and (wild or any(c < first for c in literals)):
+                stack.append((node._ls, prefix, state))
+
+    def range(self, lo=None, hi=None):
+        """
+        Lazily yield the stored words w with lo <= w < hi, in sorted order.
+        
+        Args:
+            lo (str): Smallest word to yield, None for no lower bound
+            hi (str): Bound above the last word to yield, None for no upper bound
+        """
+        lo = '' if lo is None else _ordered_key(lo)
+        hi = None if hi is None else _ordered_key(hi)
+        stack = []
+        node = self.root
+        prefix = ''
+        index = 0
+        
+        if lo == '':
+            if node is not None:
+                stack.append((node, ''))
+            node = None
+        
+        while node is not None: # collect everything after lo on the way down
+            char = lo[index]
+            chars = node.chars
+            if char > chars[0]:
+                node = node._gt
+                continue
+            if node._gt is not None:
+                stack.append((node._gt, prefix))
+            word = prefix + chars
+            if char == chars[0] and lo.startswith(chars, index):
+                index += len(chars)
+                if index < len(lo):
+                    prefix = word
+                    node = node._eq
+                    continue
+            elif char == chars[0] and chars < lo[index:]: # the segment sorts before lo
+                break
+            if node._eq is not None:
+                stack.append((node._eq, word))
+            if node.end_of_word:
+                stack.append((None, word))
+            if char == chars[0]:
+                break
+            node = node._ls
+        
+        for word in self._walk(stack):
+            if hi is not None and word >= hi:
+                return
+            yield word
+
+    def rank(self, key):
+        """
+        Count the stored words that sort before a key.
+        
+        Radix nodes keep no subtree word counts, so this walks the smaller words.
+        
+        Args:
+            key (str): Any word, stored or not
+            
+        Returns:
+            int: Number of stored words smaller than key
+        """
+        return sum(1 for _ in self.range(None, key))
+
+    def select(self, i):
+        """
+        Get the stored word at a position in sorted order.
+        
+        Radix nodes keep no subtree word counts, so this walks the smaller words.
+        
+        Args:
+            i (int): Position, negative values count from the end
+            
+        Returns:
+            str: The word with rank i
+        """
+        if i < 0:
+            i += self.word_count
+        if not 0 <= i < self.word_count:
+            raise IndexError("select index out of range")
+        return next(islice(self.range(), i, None))
+
+    def floor(self, key):
+        """
+        Get the largest stored word that is not greater than a key.
+        
+        Args:
+            key (str): Any word, stored or not
+            
+        Returns:
+            str: The word, None if every stored word is greater
+        """
+        key = _ordered_key(key)
+        if self.search(key):
+            return key
+        rank = self.rank(key)
+        return self.select(rank - 1) if rank else None
+
+    def ceiling(self, key):
+        """
+        Get the smallest stored word that is not smaller than a key.
+        
+        Args:
+            key (str): Any word, stored or not
+            
+        Returns:
+            str: The word, None if every stored word is smaller
+        """
+        return next(self.range(key), None)
+
+    def _depths(self):
+        """Yield (node, depth) for every node, the root having depth 1."""
+        stack = [(self.root, 1)] if self.root is not None else []
+        
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            depth += 1
+            if node._ls is not None:
+                stack.append((node._ls, depth))
+            if node._eq is not None:
+                stack.append((node._eq, depth))
+            if node._gt is not None:
+                stack.append((node._gt, depth))
+
+    def height(self):
+        """
+        Calculate the height of the tree.
+        
+        Returns:
+            int: Height of the tree in nodes (0 for empty tree)
+        """
+        return max((depth for _, depth in self._depths()), default=0)
+
+    def average_depth(self):
+        """
+        Average number of nodes visited by a successful search.
+        
+        Returns:
+            float: Mean depth of the word-terminating nodes (0.0 for empty tree)
+        """
+        if self.word_count == 0:
+            return 0.0
+        return sum(depth for node, depth in self._depths() if node.end_of_word) / self.word_count
+
+    def node_count(self):
+        """
+        Count the nodes of the tree.
+        
+        Returns:
+            int: Number of nodes (0 for empty tree)
+        """
+        return sum(1 for _ in self._depths())
+
+    def _snapshot_arrays(self):
+        """
+        Expand the segments into one array node per character, numbered in preorder.
+        
+        Returns:
+            tuple: (chars, flags, ls, eq, gt, root, word_count, None, None) in the
+                CompactTernarySearchTree layout, the radix storage has no weights
+        """
+        chars, flags = array('I', [0]), array('B', [0])
+        ls, eq, gt = array('i', [0]), array('i', [0]), array('i', [0])
+        stack = [(self.root, 0, None)] if self.root is not None else [] # (node, parent index, parent link array)
+        
+        while stack:
+            node, parent, links = stack.pop()
+            first = len(chars)
+            for offset, char in enumerate(node.chars):
+                chars.append(ord(char))
+                flags.append(0)
+                ls.append(0)
+                eq.append(first + offset + 1) # the next character of the segment
+                gt.append(0)
+            last = len(chars) - 1
+            eq[last] = 0
+            flags[last] = node.end_of_word
+            if links is not None:
+                links[parent] = first
+            if node._gt is not None:
+                stack.append((node._gt, first, gt))
+            if node._eq is not None:
+                stack.append((node._eq, last, eq))
+            if node._ls is not None:
+                stack.append((node._ls, first, ls))
+        
+        return chars, flags, ls, eq, gt, (1 if self.root is not None else 0), self.word_count, None, None
+
+    def save(self, path):
+        """
+        Save the tree to a flat binary snapshot, one node per character.
+        
+        The snapshot is the same as for the other storages, so it loads
+        with TernarySearchTree.load.
+        
+        Args:
+            path: Destination file
+        """
+        with open(path, 'wb') as f:
+            _write_snapshot(f, *self._snapshot_arrays())
+
+    def __str__(self):
+        if self.root is None:
+            return ""
+        lines = []
+        stack = [(self.root, "    ", "")]
+        
+        while stack:
+            node, prefix, child = stack.pop()
+            child = f"{child}:" if child else ""
+            lines.append(f"{child} {prefix} chars: {node.chars}, terminates: {node.end_of_word}")
+            prefix += "  "
+            if node._gt:
+                stack.append((node._gt, prefix, "_gt"))
+            if node._eq:
+                stack.append((node._eq, prefix, "_eq"))
+            if node._ls:
+                stack.append((node._ls, prefix, "_ls"))
+        
+        return "terminates: False\n" + "\n".join(lines)
+
+    def __repr__(self):
+        """Detailed string representation."""
+        return f"RadixTernarySearchTree(words={len(self)}, height={self.height()})"
+
+
+class ConcurrentTernarySearchTree:
+    """
+    Thread-safe ternary search tree whose readers never block.
+    
+    The words live in an immutable TernarySearchTree snapshot. A write
+    copies the nodes on the path of its word, applies the ordinary
+    insert or delete to the copies and publishes the new snapshot by
+    swapping a single reference, so readers holding the previous
+    snapshot keep a consistent view and nothing they can reach is ever
+    modified. Writers are serialized by a lock; reads take no lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock() # serializes writers
+        self._snapshot = TernarySearchTree()
+
+    @classmethod
+    def from_iterable(cls, words, presorted=False):
+        """
+        Build a height-balanced tree from an iterable of words.
+        
+        Args:
+            words: Iterable of words, duplicates are allowed
+            presorted (bool): Words are already sorted, skips the sort
+            
+        Returns:
+            ConcurrentTernarySearchTree: The new tree
+        """
+        tree = cls()
+        tree._snapshot = TernarySearchTree.from_iterable(words, presorted)
+        return tree
+
+    def snapshot(self):
+        """
+        Current version of the tree, for consistent reads across several queries.
+        
+        The returned TernarySearchTree must be treated as read-only;
+        later writes never change it.
+        
+        Returns:
+            TernarySearchTree: The published snapshot
+        """
+        return self._snapshot
+
+    @staticmethod
+    def _copy_node(node):
+        """Shallow copy of a node, sharing its children."""
+        copy = TernarySearchTree.Node(node.char)
+        copy.end_of_word = node.end_of_word
+        copy.weight = node.weight
+        copy.max_weight = node.max_weight
+        copy.size = node.size
+        copy._ls, copy._eq, copy._gt = node._ls, node._eq, node._gt
+        return copy
+
+    def _writable(self, current, words):
+        """
+        New unpublished tree whose nodes on the paths of some words are private copies.
+        
+        Each node is copied once, however many of the words go through it.
+        
+        Args:
+            current (TernarySearchTree): Version to start from
+            words: Normalized, non-empty words
+            
+        Returns:
+            TernarySearchTree: Tree sharing every other node with current
+        """
+        tree = TernarySearchTree()
+        tree.word_count = current.word_count
+        if current.root is None:
+            return tree
+        
+        tree.root = self._copy_node(current.root)
+        copied = {tree.root} # private to the pending version, changed in place
+        for word in words:
+            node = tree.root
+            index = 0
+            last = len(word) - 1
+            while True:
+                char = word[index]
+                if char < node.char:
+                    link = '_ls'
+                elif char > node.char:
+                    link = '_gt'
+                elif index == last:
+                    break
+                else:
+                    link = '_eq'
+                    index += 1
+                child = getattr(node, link)
+                if child is None:
+                    break
+                if child not in copied:
+                    child = self._copy_node(child)
+                    setattr(node, link, child)
+                    copied.add(child)
+                node = child
+        return tree
+
+    def insert(self, word, weight=None):
+        """
+        Insert a word and publish the new version.
+        
+        Args:
+            word (str): The word to insert
+            weight: Optional non-negative score, see TernarySearchTree.insert
+        """
+        if not isinstance(word, str) or not word.strip():
+            return
+        if weight is not None and weight < 0:
+            raise ValueError(f"weight must be non-negative, got {weight!r}")
+        
+        word = word.lower().strip()
+        with self._lock:
+            if weight is None and self._snapshot._contains(word):
+                return # nothing changes, keep the current version
+            tree = self._writable(self._snapshot, (word,))
+            tree.insert(word, weight)
+            self._snapshot = tree
+
+    def insert_many(self, words):
+        """
+        Insert a batch of words and publish them as one new version.
+        
+        Args:
+            words: Iterable of words
+            
+        Returns:
+            int: Number of words that were not in the tree yet
+        """
+        with self._lock:
+            current = self._snapshot
+            batch = [word for word in _unique_sorted(words) if not current._contains(word)]
+            if not batch:
+                return 0 # nothing changes, keep the current version
+            tree = self._writable(current, batch)
+            added = tree.insert_many(batch) # every node it changes was copied above
+            self._snapshot = tree
+            return added
+
+    def delete(self, word):
+        """
+        Delete a word and publish the new version.
+        
+        Args:
+            word (str): The word to delete
+            
+        Returns:
+            bool: True if word was deleted, False if word didn't exist
+        """
+        if not isinstance(word, str) or not word.strip():
+            return False
+        
+        word = word.lower().strip()
+        with self._lock:
+            if not self._snapshot._contains(word):
+                return False
+            tree = self._writable(self._snapshot, (word,))
+            tree.delete(word)
+            self._snapshot = tree
+            return True
+
+    def clear(self):
+        """Clear all words from the tree."""
+        with self._lock:
+            self._snapshot = TernarySearchTree()
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def __iter__(self):
+        return iter(self._snapshot) # keeps walking the version it started on
+
+    def __contains__(self, word):
+        return self._snapshot.search(word)
+
+    def search(self, word, exact=False):
+        """
+        Check whether a word is stored in the tree.
+        
+        Args:
+            word (str): The word to look up
+            
+        Returns:
+            bool: True if the word is stored in the tree
+        """
+        return self._snapshot.search(word)
+
+    def search_many(self, words):
+        """
+        Look up a batch of words in one version of the tree.
+        
+        Args:
+            words (list): Words to look up
+            
+        Returns:
+            list: One bool per word, in the caller's order
+        """
+        return self._snapshot.search_many(words)
+
+    def get_weight(self, word):
+        """
+        Get the score of a stored word.
+        
+        Returns:
+            The score of the word, None if absent
+        """
+        return self._snapshot.get_weight(word)
+
+    def all_strings(self):
+        """
+        Collect all words of one version of the tree in lexicographic order.
+        
+        Returns:
+            list: All stored words
+        """
+        return self._snapshot.all_strings()
+
+    def keys_with_prefix(self, prefix, limit=None):
+        """
+        Lazily yield the words starting with a prefix, from the version current at the call.
+        
+        Args:
+            prefix (str): Prefix to complete, '' matches every word
+            limit (int): Maximum number of words to yield, None for all
+        """
+        return self._snapshot.keys_with_prefix(prefix, limit)
+
+    def autocomplete(self, prefix, k=10):
+        """
+        Complete a prefix with its k highest-scoring words.
+        
+        Args:
+            prefix (str): Prefix to complete
+            k (int): Maximum number of completions
+            
+        Returns:
+            list: Up to k completions
+        """
+        return self._snapshot.autocomplete(prefix, k)
+
+    def __repr__(self):
+        """Detailed string representation."""
+        return f"ConcurrentTernarySearchTree(words={len(self)})"
+
+
+class _ArrayTreeReader:
+    """
+    Read-only queries over a tree stored as parallel node arrays.
+    
+    Subclasses provide ``_chars``, ``_flags``, ``_ls``, ``_eq``, ``_gt``
+    (anything indexable by node number: ``array`` objects or memoryviews
+    over a snapshot), the root index ``_root``, the list of unused slots
+    ``_free`` and ``word_count``. Index 0 is the "no node" sentinel.
+    Trees loaded from a weighted snapshot also have ``_weights`` and
+    ``_max_weights`` (word weight and subtree maximum per node), which
+    are None otherwise.
+    """
+
+    def __len__(self):
+        return self.word_count
+
+    def __iter__(self):
+        return self._iter_words(self._root, '') if self._root else iter(())
+
+    def __contains__(self, word):
+        return self.search(word)
+
+    def is_empty(self):
+        """
+        Check if the tree is empty.
+        
+        Returns:
+            bool: True if tree is empty, False otherwise
+        """
+        return not self._root
+
+    def _find(self, word):
+        """
+        Find the node holding the last character of a normalized word.
+        
+        Args:
+            word (str): Normalized, non-empty word
+            
+        Returns:
+            int: Node index, or 0 if the path doesn't exist
+        """
+        chars, ls, eq, gt = self._chars, self._ls, self._eq, self._gt
+        node = self._root
+        index = 0
+        last = len(word) - 1
+        code = ord(word[0])
+        
+        while node:
+            if code < chars[node]:
+                node = ls[node]
+            elif code > chars[node]:
+                node = gt[node]
+            elif index == last:
+                return node
+            else:
+                index += 1
+                code = ord(word[index])
+                node = eq[node]
+        
+        return 0
+
+    def search(self, word, exact=False):
+        """
+        Check whether a word is stored in the tree.
+        
+        Args:
+            word (str): The word to look up
+            
+        Returns:
+            bool: True if the word is stored in the tree
+        """
+        if not isinstance(word, str):
+            return False
+        
+        word = word.lower().strip()
+        if word == '':
+            return False
+        
+        return self._flags[self._find(word)] == 1
+
+    def search_many(self, words):
+        """
+        Look up a batch of words, reusing the descent shared by consecutive keys.
+        
+        Args:
+            words (list): Words to look up
+            
+        Returns:
+            list: One bool per word, in the caller's order
+        """
+        chars, flags, ls, eq, gt = self._chars, self._flags, self._ls, self._eq, self._gt
+        normalized = [word.lower().strip() if isinstance(word, str) else '' for word in words]
+        order = sorted(range(len(normalized)), key=normalized.__getitem__)
+        results = [False] * len(normalized)
+        
+        path = [] # path[i] is the node matching character i of the previous word
+        previous = '' # empty and invalid words sort first and stay False
+        found = False
+        
+        for position in order:
+            word = normalized[position]
+            if word != previous:
+                shared = 0
+                limit = min(len(word), len(path))
+                while shared < limit and word[shared] == previous[shared]:
+                    shared += 1
+                del path[shared:]
+                
+                node = eq[path[-1]] if path else self._root
+                index = shared
+                last = len(word) - 1
+                code = ord(word[index])
+                found = False
+                
+                while node:
+                    if code < chars[node]:
+                        node = ls[node]
+                    elif code > chars[node]:
+                        node = gt[node]
+                    else:
+                        path.append(node)
+                        if index == last:
+                            found = flags[node] == 1
+                            break
+                        index += 1
+                        code = ord(word[index])
+                        node = eq[node]
+                
+                previous = word
+            results[position] = found
+        
+        return results
+
+    def _iter_words(self, node, prefix):
+        """
+        Lazily yield the words of a subtree in lexicographic order.
+        
+        Args:
+            node (int): Root of the subtree
+            prefix (str): Characters on the path above the subtree
+        """
+        return self._walk([(node, prefix)])
+
+    def _walk(self, stack):
+        """
+        Continue an in-order walk from a stack of pending entries.
+        
+        Args:
+            stack (list): (node, prefix) subtrees and (0, word) words, the next one last
+        """
+        chars, flags, ls, eq, gt = self._chars, self._flags, self._ls, self._eq, self._gt
+        
+        while stack:
+            node, prefix = stack.pop()
+            if not node:
+                yield prefix # a finished word, emitted between _ls and _eq
+                continue
+            word = prefix + chr(chars[node])
+            if gt[node]:
+                stack.append((gt[node], prefix))
+            if eq[node]:
+                stack.append((eq[node], word))
+            if flags[node]:
+                stack.append((0, word))
+            if ls[node]:
+                stack.append((ls[node], prefix))
+
+    def all_strings(self):
+        """
+        Collect all words of the tree in lexicographic order.
+        
+        Returns:
+            list: All stored words
+        """
+        return list(self)
+
+    def keys_with_prefix(self, prefix, limit=None):
+        """
+        Lazily yield the stored words starting with a prefix, in sorted order.
+        
+        Args:
+            prefix (str): Prefix to complete, '' matches every word
+            limit (int): Maximum number of words to yield, None for all
+        """
+        if not isinstance(prefix, str) or not self._root:
+            return
+        
+        prefix = prefix.lower()
+        if prefix == '':
+            words = self._iter_words(self._root, '')
+        else:
+            node = self._find(prefix)
+            if not node:
+                return
+            words = self._iter_words(self._eq[node], prefix) if self._eq[node] else iter(())
+            if self._flags[node]:
+                words = chain((prefix,), words)
+        
+        yield from islice(words, limit)
+
+    def autocomplete(self, prefix, k=10):
+        """
+        Complete a prefix with its k highest-scoring words.
+        
+        Completions are ordered by descending weight, ties alphabetically,
+        like TernarySearchTree.autocomplete. Without weights that is the
+        first k matching words in sorted order.
+        
+        Args:
+            prefix (str): Prefix to complete
+            k (int): Maximum number of completions
+            
+        Returns:
+            list: Up to k completions
+        """
+        if not isinstance(prefix, str) or k <= 0:
+            return []
+        if self._weights is None:
+            return list(self.keys_with_prefix(prefix, limit=k))
+        return self._top_k(prefix.lower(), k)
+
+    def _top_k(self, prefix, k):
+        """
+        Best-first search for the k highest-scoring completions, see TernarySearchTree._top_k.
+        
+        Args:
+            prefix (str): Normalized prefix
+            k (int): Maximum number of completions, positive
+            
+        Returns:
+            list: Up to k completions
+        """
+        if not self._root:
+            return []
+        
+        chars, flags, ls, eq, gt = self._chars, self._flags, self._ls, self._eq, self._gt
+        weights, best = self._weights, self._max_weights
+        if prefix == '':
+            start = self._root
+            bound = best[start]
+        else:
+            node = self._find(prefix)
+            if not node:
+                return []
+            start = eq[node]
+            bound = weights[node] if flags[node] else 0
+            if start and best[start] > bound:
+                bound = best[start]
+        
+        if bound == 0:
+            return list(self.keys_with_prefix(prefix, limit=k)) # unweighted: sorted order is the ranking
+        
+        # Heap entries: (-score bound, smallest possible word, node or 0 for a word); a word sorts
+        # before a subtree with the same bound and key, whose words all extend the key
+        heap = []
+        if prefix and flags[node]:
+            heap.append((-weights[node], prefix, 0))
+        if start:
+            heap.append((-best[start], prefix, start))
+        heapq.heapify(heap)
+        
+        results = []
+        while heap and len(results) < k:
+            _, key, node = heapq.heappop(heap)
+            if not node:
+                results.append(key) # a word, nothing left in the heap can beat it
+                continue
+            word = key + chr(chars[node])
+            if ls[node]:
+                heapq.heappush(heap, (-best[ls[node]], key, ls[node]))
+            if flags[node]:
+                heapq.heappush(heap, (-weights[node], word, 0))
+            if eq[node]:
+                heapq.heappush(heap, (-best[eq[node]], word, eq[node]))
+            if gt[node]:
+                heapq.heappush(heap, (-best[gt[node]], key, gt[node]))
+        
+        return results
+
+    def near_matches(self, word, max_distance=1):
+        """
+        Find the stored words within a Levenshtein distance of a word.
+        
+        Args:
+            word (str): Query word
+            max_distance (int): Largest edit distance to report
+            
+        Returns:
+            list: (word, distance) pairs sorted by distance, then word
+        """
+        if max_distance < 0:
+            raise ValueError(f"max_distance must be non-negative, got {max_distance!r}")
+        if not isinstance(word, str) or not self._root:
+            return []
+        
+        chars, flags, ls, eq, gt = self._chars, self._flags, self._ls, self._eq, self._gt
+        word = word.lower().strip()
+        matches = []
+        stack = [(self._root, '', list(range(len(word) + 1)))]
+        
+        while stack:
+            node, prefix, row = stack.pop()
+            if ls[node]:
+                stack.append((ls[node], prefix, row))
+            if gt[node]:
+                stack.append((gt[node], prefix, row))
+            
+            char = chr(chars[node])
+            new_row = _next_edit_row(row, word, char)
+            if flags[node] and new_row[-1] <= max_distance:
+                matches.append((prefix + char, new_row[-1]))
+            if eq[node] and min(new_row) <= max_distance:
+                stack.append((eq[node], prefix + char, new_row))
+        
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def match(self, pattern, limit=None):
+        """
+        Lazily yield the stored words matching a wildcard pattern, in sorted order.
+        
+        Args:
+            pattern (str): Pattern with '?' (one character) and '*' (any run)
+            limit (int): Maximum number of words to yield, None for all
+        """
+        if not isinstance(pattern, str) or not self._root:
+            return
+        
+        yield from islice(self._iter_matches(_PatternMatcher(pattern.lower().strip())), limit)
+
+    def _iter_matches(self, matcher):
+        """In-order walk of the branches that can still match the pattern."""
+        chars, flags, ls, eq, gt = self._chars, self._flags, self._ls, self._eq, self._gt
+        stack = [(self._root, '', matcher.start)]
+        
+        while stack:
+            node, prefix, state = stack.pop()
+            if not node:
+                yield prefix
+                continue
+            
+            wild, literals = matcher.choices(state)
+            char = chr(chars[node])
+            if gt[node] and (wild or any(c > char for c in literals)):
+                stack.append((gt[node], prefix, state))
+            if wild or char in literals:
+                next_state = matcher.step(state, char)
+                if next_state:
+                    if eq[node]:
+                        stack.append((eq[node], prefix + char, next_state))
+                    if flags[node] and matcher.accepts(next_state):
+                        stack.append((0, prefix + char, None))
+            if ls[node] and (wild or any(c < char for c in literals)):
+                stack.append((ls[node], prefix, state))
+
+    def range(self, lo=None, hi=None):
+        """
+        Lazily yield the stored words w with lo <= w < hi, in sorted order.
+        
+        Args:
+            lo (str): Smallest word to yield, None for no lower bound
+            hi (str): Bound above the last word to yield, None for no upper bound
+        """
+        chars, flags, ls, eq, gt = self._chars, self._flags, self._ls, self._eq, self._gt
+        lo = '' if lo is None else _ordered_key(lo)
+        hi = None if hi is None else _ordered_key(hi)
+        stack = []
+        node = self._root
+        prefix = ''
+        index = 0
+        
+        if lo == '':
+            if node:
+                stack.append((node, ''))
+            node = 0
+        
+        while node: # collect everything after lo on the way down
+            code = ord(lo[index])
+            if code < chars[node]:
+                word = prefix + chr(chars[node])
+                if gt[node]:
+                    stack.append((gt[node], prefix))
+                if eq[node]:
+                    stack.append((eq[node], word))
+                if flags[node]:
+                    stack.append((0, word))
+                node = ls[node]
+            elif code > chars[node]:
+                node = gt[node]
+            else:
+                if gt[node]:
+                    stack.append((gt[node], prefix))
+                prefix += lo[index]
+                if index == len(lo) - 1:
+                    if eq[node]:
+                        stack.append((eq[node], prefix))
+                    if flags[node]:
+                        stack.append((0, prefix))
+                    break
+                index += 1
+                node = eq[node]
+        
+        for word in self._walk(stack):
+            if hi is not None and word >= hi:
+                return
+            yield word
+
+    def rank(self, key):
+        """
+        Count the stored words that sort before a key.
+        
+        The arrays keep no subtree word counts, so this walks the smaller words.
+        
+        Args:
+            key (str): Any word, stored or not
+            
+        Returns:
+            int: Number of stored words smaller than key
+        """
+        return sum(1 for _ in self.range(None, key))
+
+    def select(self, i):
+        """
+        Get the stored word at a position in sorted order.
+        
+        The arrays keep no subtree word counts, so this walks the smaller words.
+        
+        Args:
+            i (int): Position, negative values count from the end
+            
+        Returns:
+            str: The word with rank i
+        """
+        if i < 0:
+            i += self.word_count
+        if not 0 <= i < self.word_count:
+            raise IndexError("select index out of range")
+        return next(islice(self.range(), i, None))
+
+    def floor(self, key):
+        """
+        Get the largest stored word that is not greater than a key.
+        
+        Args:
+            key (str): Any word, stored or not
+            
+        Returns:
+            str: The word, None if every stored word is greater
+        """
+        key = _ordered_key(key)
+        if key and self._flags[self._find(key)]:
+            return key
+        rank = self.rank(key)
+        return self.select(rank - 1) if rank else None
+
+    def ceiling(self, key):
+        """
+        Get the smallest stored word that is not smaller than a key.
+        
+        Args:
+            key (str): Any word, stored or not
+            
+        Returns:
+            str: The word, None if every stored word is smaller
+        """
+        return next(self.range(key), None)
+
+    def height(self):
+        """
+        Calculate the height of the tree.
+        
+        Returns:
+            int: Height of the tree (0 for empty tree)
+        """
+        ls, eq, gt = self._ls, self._eq, self._gt
+        height = 0
+        stack = [(self._root, 1)] if self._root else []
+        
+        while stack:
+            node, depth = stack.pop()
+            if depth > height:
+                height = depth
+            depth += 1
+            for child in (ls[node], eq[node], gt[node]):
+                if child:
+                    stack.append((child, depth))
+        
+        return height
+
+    def average_depth(self):
+        """
+        Average number of nodes visited by a successful search.
+        
+        Returns:
+            float: Mean depth of the word-terminating nodes (0.0 for empty tree)
+        """
+        if not self._root:
+            return 0.0
+        
+        flags, ls, eq, gt = self._flags, self._ls, self._eq, self._gt
+        total = 0
+        stack = [(self._root, 1)]
+        
+        while stack:
+            node, depth = stack.pop()
+            if flags[node]:
+                total += depth
+            depth += 1
+            for child in (ls[node], eq[node], gt[node]):
+                if child:
+                    stack.append((child, depth))
+        
+        return total / self.word_count
+
+    def node_count(self):
+        """
+        Count the nodes of the tree.
+        
+        Returns:
+            int: Number of nodes (0 for empty tree)
+        """
+        return len(self._chars) - 1 - len(self._free)
+
+    def nbytes(self):
+        """
+        Size of the node arrays, including deleted slots awaiting reuse.
+        
+        Returns:
+            int: Number of bytes used by the node arrays
+        """
+        return sum(a.itemsize * len(a) for a in (self._chars, self._flags, self._ls, self._eq, self._gt))
+
+    def __str__(self):
+        if not self._root:
+            return ""
+        
+        chars, flags, ls, eq, gt = self._chars, self._flags, self._ls, self._eq, self._gt
+        lines = []
+        stack = [(self._root, "    ", "")]
+        
+        while stack:
+            node, prefix, child = stack.pop()
+            child = f"{child}:" if child else ""
+            lines.append(f"{child} {prefix} char: {chr(chars[node])}, terminates: {bool(flags[node])}")
+            
+            prefix += "  "
+            if gt[node]:
+                stack.append((gt[node], prefix, "_gt"))
+            if eq[node]:
+                stack.append((eq[node], prefix, "_eq"))
+            if ls[node]:
+                stack.append((ls[node], prefix, "_ls"))
+        
+        return "terminates: False\n" + "\n".join(lines)
+
+    def save(self, path):
+        """
+        Save the tree to a flat binary snapshot, see TernarySearchTree.load.
+        
+        Args:
+            path: Destination file
+        """
+        with open(path, 'wb') as f:
+            _write_snapshot(f, *self._snapshot_arrays())
+
+    def _snapshot_arrays(self):
+        """
+        The node arrays in snapshot order.
+        
+        Returns:
+            tuple: (chars, flags, ls, eq, gt, root, word_count, weights, max_weights)
+        """
+        return (self._chars, self._flags, self._ls, self._eq, self._gt, self._root, self.word_count,
+                self._weights, self._max_weights)
+
+    def __repr__(self):
+        """Detailed string representation."""
+        return f"{type(self).__name__}(words={len(self)}, height={self.height()})"
+
+
+class CompactTernarySearchTree(_ArrayTreeReader):
+    """
+    Ternary search tree whose nodes are indices into parallel typed arrays.
+    
+    Node ``i`` is described by ``_chars[i]`` (code point), ``_flags[i]``
+    (end of word) and ``_ls[i]``/``_eq[i]``/``_gt[i]`` (child indices).
+    Index 0 is a sentinel meaning "no node", so a node costs 17 bytes
+    instead of a Python object. Selected with
+    ``TernarySearchTree(storage="array")``; the public API is the same.
+    A tree loaded from a weighted snapshot keeps ranking autocomplete by
+    weight; words inserted afterwards score 0.
+    """
+
+    def __init__(self):
+        self.word_count = 0
+        self.clear()
+
+    def clear(self):
+        """Clear all words from the tree."""
+        self._chars = array('I', [0]) # code points, slot 0 is the sentinel
+        self._flags = array('B', [0])
+        self._ls = array('i', [0])
+        self._eq = array('i', [0])
+        self._gt = array('i', [0])
+        self._weights = self._max_weights = None # only set by a weighted snapshot
+        self._free = [] # indices of deleted nodes, reused by insert
+        self._root = 0
+        self.word_count = 0
+
+    @classmethod
+    def from_iterable(cls, words, presorted=False):
+        """
+        Build a height-balanced tree from an iterable of words.
+        
+        Args:
+            words: Iterable of words, duplicates are allowed
+            presorted (bool): Words are already sorted, skips the sort
+            
+        Returns:
+            CompactTernarySearchTree: The new tree
+        """
+        tree = cls()
+        for word in _median_order(_unique_sorted(words, presorted)):
+            tree.insert(word)
+        return tree
+
+    @classmethod
+    def _from_snapshot(cls, buffer):
+        """
+        Copy the arrays of a snapshot into a new mutable tree.
+        
+        Args:
+            buffer: Bytes-like snapshot contents
+            
+        Returns:
+            CompactTernarySearchTree: The loaded tree
+        """
+        chars, flags, ls, eq, gt, root, word_count, weights, max_weights = _read_snapshot(buffer)
+        tree = cls()
+        sections = [('_chars', 'I', chars), ('_flags', 'B', flags),
+                    ('_ls', 'i', ls), ('_eq', 'i', eq), ('_gt', 'i', gt)]
+        if weights is not None:
+            sections += [('_weights', weights.format, weights), ('_max_weights', max_weights.format, max_weights)]
+        for name, typecode, section in sections:
+            copy = array(typecode)
+            copy.frombytes(section.cast('B'))
+            if sys.byteorder != 'little':
+                copy.byteswap()
+            setattr(tree, name, copy)
+        tree._root = root
+        tree.word_count = word_count
+        return tree
+
+    def _new_node(self, code):
+        """
+        Allocate a node, reusing a deleted slot when possible.
+        
+        Args:
+            code (int): Code point stored in the node
+            
+        Returns:
+            int: Index of the new node
+        """
+        if self._free:
+            node = self._free.pop()
+            self._chars[node] = code
+            if self._weights is not None:
+                self._weights[node] = self._max_weights[node] = 0
+            return node
+        self._chars.append(code)
+        self._flags.append(0)
+        self._ls.append(0)
+        self._eq.append(0)
+        self._gt.append(0)
+        if self._weights is not None:
+            self._weights.append(0)
+            self._max_weights.append(0)
+        return len(self._chars) - 1
+
+    def _update_max_weights(self, nodes):
+        """
+        Recompute the cached subtree maximum of weighted nodes.
+        
+        Args:
+            nodes: Node indices, every node after its children
+        """
+        weights, best, ls, eq, gt = self._weights, self._max_weights, self._ls, self._eq, self._gt
+        for node in nodes:
+            best[node] = max(weights[node], best[ls[node]], best[eq[node]], best[gt[node]])
+
+    def insert(self, word):
+        """
+        Insert a word into the tree.
+        
+        Args:
+            word (str): The word to insert
+        """
+        if not isinstance(word, str):
+            return
+        
+        word = word.lower().strip()
+        if word == '':
+            return
+        
+        self._insert(word)
+
+    def _insert(self, word):
+        """
+        Insert a normalized, non-empty word.
+        
+        Returns:
+            int: Index of the node ending the word
+        """
+        chars, ls, eq, gt = self._chars, self._ls, self._eq, self._gt
+        index = 0
+        last = len(word) - 1
+        code = ord(word[0])
+        
+        node = self._root
+        if not node:
+            node = self._root = self._new_node(code)
+        
+        while True:
+            if code < chars[node]:
+                child = ls[node]
+                if not child:
+                    child = ls[node] = self._new_node(code)
+            elif code > chars[node]:
+                child = gt[node]
+                if not child:
+                    child = gt[node] = self._new_node(code)
+            elif index == last:
+                if not self._flags[node]:
+                    self._flags[node] = 1
+                    self.word_count += 1
+                return node
+            else:
+                index += 1
+                code = ord(word[index])
+                child = eq[node]
+                if not child:
+                    child = eq[node] = self._new_node(code)
+            node = child
+
+    def insert_many(self, words):
+        """
+        Insert a batch of words, descending each shared prefix only once.
+        
+        Args:
+            words: Iterable of words
+            
+        Returns:
+            int: Number of words that were not in the tree yet
+        """
+        chars, flags, ls, eq, gt = self._chars, self._flags, self._ls, self._eq, self._gt
+        batch = _unique_sorted(words)
+        before = self.word_count
+        # (parent node or 0 for the root, lo, hi, depth): batch[lo:hi] share their first depth characters
+        stack = [(0, 0, len(batch), 0)] if batch else []
+        
+        while stack:
+            parent, lo, hi, depth = stack.pop()
+            
+            runs = []
+            start = lo
+            for i in range(lo + 1, hi + 1):
+                if i == hi or batch[i][depth] != batch[start][depth]:
+                    runs.append((start, i))
+                    start = i
+            
+            for run_lo, run_hi in _median_order(runs):
+                code = ord(batch[run_lo][depth])
+                node = eq[parent] if parent else self._root
+                if not node:
+                    node = self._new_node(code)
+                    if parent:
+                        eq[parent] = node
+                    else:
+                        self._root = node
+                
+                while code != chars[node]:
+                    if code < chars[node]:
+                        child = ls[node]
+                        if not child:
+                            child = ls[node] = self._new_node(code)
+                    else:
+                        child = gt[node]
+                        if not child:
+                            child = gt[node] = self._new_node(code)
+                    node = child
+                
+                if len(batch[run_lo]) == depth + 1:
+                    if not flags[node]:
+                        flags[node] = 1
+                        self.word_count += 1
+                    run_lo += 1
+                if run_lo < run_hi:
+                    stack.append((node, run_lo, run_hi, depth + 1))
+        
+        return self.word_count - before
+
+    def rebalance(self):
+        """
+        Rebuild every _ls/_gt sibling tree into a balanced BST in linear time.
+        
+        Nodes keep their slots and _eq links, only _ls/_gt are rewritten.
+        """
+        ls, eq, gt = self._ls, self._eq, self._gt
+        tops = [(0, None, self._root)] if self._root else [] # (parent, link array, top of a sibling tree)
+        
+        while tops:
+            parent, links, top = tops.pop()
+            siblings = []
+            stack = []
+            node = top
+            while stack or node: # in-order walk over _ls/_gt only
+                while node:
+                    stack.append(node)
+                    node = ls[node]
+                node = stack.pop()
+                siblings.append(node)
+                node = gt[node]
+            
+            ranges = [(0, len(siblings), parent, links)]
+            while ranges:
+                lo, hi, up, side = ranges.pop()
+                node = siblings[(lo + hi) // 2] if lo < hi else 0
+                if side is None:
+                    self._root = node
+                else:
+                    side[up] = node
+                if node:
+                    mid = (lo + hi) // 2
+                    ranges.append((mid + 1, hi, node, gt))
+                    ranges.append((lo, mid, node, ls))
+            
+            for node in siblings:
+                if eq[node]:
+                    tops.append((node, eq, eq[node]))
+        
+        if self._weights is not None: # the sibling trees changed shape, so did their maxima
+            order = []
+            stack = [self._root] if self._root else []
+            while stack:
+                node = stack.pop()
+                order.append(node)
+                stack.extend(child for child in (ls[node], eq[node], gt[node]) if child)
+            self._update_max_weights(reversed(order)) # reversed preorder puts children first
+
+    def delete(self, word):
+        """
+        Delete a word from the tree.
+        
+        Args:
+            word (str): The word to delete
+            
+        Returns:
+            bool: True if word was deleted, False if word didn't exist
+        """
+        if not isinstance(word, str) or not word:
+            return False
+        
+        word = word.lower().strip()
+        if not word or not self._flags[self._find(word)]:
+            return False
+        
+        chars, flags, ls, eq, gt = self._chars, self._flags, self._ls, self._eq, self._gt
+        path = [] # (parent, link array, node) triples leading to the word
+        parent, links = 0, None
+        node = self._root
+        index = 0
+        last = len(word) - 1
+        
+        while True:
+            path.append((parent, links, node))
+            code = ord(word[index])
+            if code < chars[node]:
+                parent, links = node, ls
+            elif code > chars[node]:
+                parent, links = node, gt
+            elif index == last:
+                flags[node] = 0
+                break
+            else:
+                parent, links = node, eq
+                index += 1
+            node = links[parent]
+        if self._weights is not None:
+            self._weights[node] = 0
+        
+        # Remove nodes bottom-up while they are not useful anymore
+        for parent, links, node in reversed(path):
+            if flags[node] or ls[node] or eq[node] or gt[node]:
+                break
+            if links is None:
+                self._root = 0
+            else:
+                links[parent] = 0
+            self._free.append(node)
+        
+        if self._weights is not None:
+            self._update_max_weights(node for _, _, node in reversed(path))
+        
+        self.word_count -= 1
+        return True
+
+
+class TernarySearchMap(CompactTernarySearchTree):
+    """
+    Mapping from words to values on top of the array node storage.
+    
+    Values live in one side array indexed by node number, so the value
+    of a word is found at the index of the node ending it and no per-word
+    objects are allocated. With a typecode (e.g. 'q' for term IDs or
+    offsets) the side array is a typed ``array`` and stores plain
+    numbers; without one it is a list and takes any Python object.
+    Keys are normalized like the words of a tree. Snapshots written by
+    save hold the keys only.
+    """
+
+    def __init__(self, typecode=None):
+        """
+        Args:
+            typecode (str): array typecode of the values, None for arbitrary objects
+        """
+        self._typecode = typecode
+        super().__init__()
+
+    def clear(self):
+        """Clear all words and values from the map."""
+        super().clear()
+        self._default = 0 if self._typecode else None # value of slots without a word
+        self._values = array(self._typecode, [0]) if self._typecode else [None]
+
+    def _new_node(self, code):
+        node = super()._new_node(code)
+        if node == len(self._values):
+            self._values.append(self._default)
+        return node
+
+    @staticmethod
+    def _key(key):
+        """Normalize a key, raising KeyError for keys that can't be stored."""
+        if not isinstance(key, str) or not key.strip():
+            raise KeyError(key)
+        return key.lower().strip()
+
+    def __getitem__(self, key):
+        node = self._find(self._key(key))
+        if not self._flags[node]:
+            raise KeyError(key)
+        return self._values[node]
+
+    def __setitem__(self, key, value):
+        self._values[self._insert(self._key(key))] = value
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        """
+        Get the value of a word.
+        
+        Args:
+            key (str): The word to look up
+            default: Returned when the word is not stored
+            
+        Returns:
+            The stored value, or default
+        """
+        if not isinstance(key, str) or not key.strip():
+            return default
+        node = self._find(key.lower().strip())
+        return self._values[node] if self._flags[node] else default
+
+    def delete(self, word):
+        """
+        Delete a word and its value from the map.
+        
+        Args:
+            word (str): The word to delete
+            
+        Returns:
+            bool: True if word was deleted, False if word didn't exist
+        """
+        if isinstance(word, str) and word.strip():
+            node = self._find(word.lower().strip())
+            if self._flags[node]:
+                self._values[node] = self._default # the slot may be reused by another word
+        return super().delete(word)
+
+    def items_with_prefix(self, prefix, limit=None):
+        """
+        Lazily yield the (word, value) pairs of the words starting with a prefix, in sorted order.
+        
+        Args:
+            prefix (str): Prefix to complete, '' matches every word
+            limit (int): Maximum number of pairs to yield, None for all
+        """
+        if not isinstance(prefix, str) or not self._root:
+            return
+        
+        prefix = prefix.lower()
+        if prefix == '':
+            stack = [(self._root, '')]
+        else:
+            node = self._find(prefix)
+            if not node:
+                return
+            stack = [(self._eq[node], prefix)] if self._eq[node] else []
+            if self._flags[node]:
+                stack.append((-node, prefix))
+        
+        yield from islice(self._walk_items(stack), limit)
+
+    def items(self):
+        """Lazily yield all (word, value) pairs in sorted order."""
+        return self.items_with_prefix('')
+
+    def values(self):
+        """Lazily yield all values in the sorted order of their words."""
+        return (value for _, value in self.items())
+
+    def keys(self):
+        """Lazily yield all words in sorted order."""
+        return iter(self)
+
+    def _walk_items(self, stack):
+        """
+        In-order walk yielding (word, value) pairs.
+        
+        Args:
+            stack (list): (node, prefix) subtrees and (-node, word) words, the next one last
+        """
+        chars, flags, ls, eq, gt, values = self._chars, self._flags, self._ls, self._eq, self._gt, self._values
+        
+        while stack:
+            node, prefix = stack.pop()
+            if node < 0:
+                yield prefix, values[-node]
+                continue
+            word = prefix + chr(chars[node])
+            if gt[node]:
+                stack.append((gt[node], prefix))
+            if eq[node]:
+                stack.append((eq[node], word))
+            if flags[node]:
+                stack.append((-node, word))
+            if ls[node]:
+                stack.append((ls[node], prefix))
+
+
+class FrozenTernarySearchTree(_ArrayTreeReader):
+    """
+    Read-only ternary search tree served straight from a snapshot buffer.
+    
+    The node arrays are memoryviews into the buffer, so opening a tree
+    costs nothing per node. Returned by ``TernarySearchTree.load``; close
+    it (or use it as a context manager) to release a memory-mapped file.
+    Snapshots of weighted trees carry the weights, so autocomplete ranks
+    completions like the source tree.
+    """
+
+    def __init__(self, buffer, owner=None):
+        """
+        Args:
+            buffer: Bytes-like snapshot contents, see TernarySearchTree.save
+            owner: Object holding the buffer, closed by close() (e.g. an mmap)
+        """
+        (self._chars, self._flags, self._ls, self._eq, self._gt,
+         self._root, self.word_count, self._weights, self._max_weights) = _read_snapshot(buffer)
+        self._free = ()
+        self._owner = owner
+
+    @classmethod
+    def from_shared_memory(cls, name):
+        """
+        Attach to a tree published with share_tree, without copying it.
+        
+        Args:
+            name (str): Name of the shared memory block
+            
+        Returns:
+            FrozenTernarySearchTree: Tree reading the shared block, close() detaches
+        """
+        try:
+            block = shared_memory.SharedMemory(name=name, track=False) # the publisher owns the block
+        except TypeError: # Python < 3.13 has no track argument
+            block = shared_memory.SharedMemory(name=name)
+        try:
+            return cls(block.buf, owner=block)
+        except ValueError:
+            block.close()
+            raise
+
+    def close(self):
+        """Release the views on the buffer and close its owner."""
+        for view in (self._chars, self._flags, self._ls, self._eq, self._gt, self._weights, self._max_weights):
+            if view is not None:
+                view.release()
+        if self._owner is not None:
+            self._owner.close()
+            self._owner = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def share_tree(tree, name=None):
+    """
+    Publish a snapshot of a tree in a new shared memory block.
+    
+    Any process can then serve queries from the block with
+    FrozenTernarySearchTree.from_shared_memory. The caller owns the block
+    and must close() and unlink() it when done.
+    
+    Args:
+        tree: TernarySearchTree, CompactTernarySearchTree or FrozenTernarySearchTree
+        name (str): Block name, None for a random one
+        
+    Returns:
+        SharedMemory: The block holding the snapshot
+    """
+    snapshot = io.BytesIO()
+    _write_snapshot(snapshot, *tree._snapshot_arrays())
+    data = snapshot.getbuffer()
+    block = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+    block.buf[:len(data)] = data
+    return block
+
+
+def _build_shard(words):
+    """Pool task: build a balanced tree from sorted words, returned as a snapshot."""
+    snapshot = io.BytesIO()
+    _write_snapshot(snapshot, *TernarySearchTree.from_iterable(words, presorted=True)._snapshot_arrays())
+    return snapshot.getvalue()
+
+
+_worker_tree = None #FrozenTernarySearchTree of a QueryPool worker process
+
+
+def _attach_worker(name):
+    """Pool initializer: attach the worker process to the shared tree."""
+    global _worker_tree
+    _worker_tree = FrozenTernarySearchTree.from_shared_memory(name)
+    # release the views before exit, else the block's __del__ raises BufferError
+    util.Finalize(None, _worker_tree.close, exitpriority=10)
+
+
+def _worker_search_many(words):
+    return _worker_tree.search_many(words)
+
+
+def _worker_keys_with_prefix(args):
+    prefix, limit = args
+    return list(_worker_tree.keys_with_prefix(prefix, limit))
+
+
+def _worker_autocomplete(args):
+    prefix, k = args
+    return _worker_tree.autocomplete(prefix, k)
+
+
+class QueryPool:
+    """
+    Process pool answering read-only queries from one shared tree.
+    
+    The tree is published once in shared memory and every worker attaches
+    to the same block, so there is no per-worker copy and queries run in
+    parallel without the GIL. The block holds the word weights, so
+    autocomplete_many ranks like the tree's own autocomplete. Use as a
+    context manager or call close().
+    """
+
+    def __init__(self, tree, workers=None):
+        """
+        Args:
+            tree: Tree to serve, it is snapshotted so later changes aren't seen
+            workers (int): Number of worker processes, None for os.cpu_count()
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self._block = share_tree(tree)
+        try:
+            self._pool = Pool(self.workers, initializer=_attach_worker, initargs=(self._block.name,))
+        except Exception:
+            self._block.close()
+            self._block.unlink()
+            raise
+
+    def _chunksize(self, count):
+        return max(1, count // (self.workers * 4))
+
+    def search_many(self, words, chunksize=None):
+        """
+        Look up a batch of words across the workers.
+        
+        Args:
+            words (list): Words to look up
+            chunksize (int): Words per task, None to split evenly over the workers
+            
+        Returns:
+            list: One bool per word, in the caller's order
+        """
+        chunksize = chunksize or self._chunksize(len(words))
+        chunks = [words[i:i + chunksize] for i in range(0, len(words), chunksize)]
+        return [found for chunk in self._pool.map(_worker_search_many, chunks) for found in chunk]
+
+    def keys_with_prefix_many(self, prefixes, limit=None):
+        """
+        Run a prefix query for each prefix across the workers.
+        
+        Returns:
+            list: One list of sorted matches per prefix
+        """
+        return self._pool.map(_worker_keys_with_prefix, [(prefix, limit) for prefix in prefixes],
+                              chunksize=self._chunksize(len(prefixes)))
+
+    def autocomplete_many(self, prefixes, k=10):
+        """
+        Autocomplete each prefix across the workers.
+        
+        Returns:
+            list: One list of up to k completions per prefix
+        """
+        return self._pool.map(_worker_autocomplete, [(prefix, k) for prefix in prefixes],
+                              chunksize=self._chunksize(len(prefixes)))
+
+    def close(self):
+        """Stop the workers and free the shared memory block."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            self._block.close()
+            self._block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncTernarySearchTree:
+    """
+    asyncio front-end answering queries without stalling the event loop.
+    
+    Lookups arriving within a short window are answered together by one
+    search_many call on the wrapped tree, identical queries in flight
+    share one result, and prefix enumerations give control back to the
+    loop every chunk words. Wrap a ConcurrentTernarySearchTree if other
+    code writes to the tree while an enumeration is suspended; it then
+    reads one snapshot throughout.
+    """
+
+    def __init__(self, tree, window=0.001, chunk=256):
+        """
+        Args:
+            tree: Tree to query, any storage or a ConcurrentTernarySearchTree
+            window (float): Seconds a lookup waits for others to batch with, 0 for the current loop iteration
+            chunk (int): Words enumerated between two yields to the loop
+        """
+        self.tree = tree
+        self.window = window
+        self.chunk = chunk
+        self._batch = {} # word -> future of the pending search_many call
+        self._inflight = {} # query key -> task computing it
+
+    async def search(self, word):
+        """
+        Check whether a word is stored, batched with concurrent lookups.
+        
+        Args:
+            word (str): The word to look up
+            
+        Returns:
+            bool: True if the word is stored in the tree
+        """
+        future = self._batch.get(word)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._batch:
+                if self.window > 0:
+                    loop.call_later(self.window, self._flush)
+                else:
+                    loop.call_soon(self._flush)
+            future = self._batch[word] = loop.create_future()
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        """Answer every pending lookup with one batched traversal."""
+        batch, self._batch = self._batch, {}
+        words = list(batch)
+        try:
+            found = self.tree.search_many(words)
+        except Exception as error:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for word, result in zip(words, found):
+            future = batch[word]
+            if not future.done():
+                future.set_result(result)
+
+    async def _shared(self, key, compute):
+        """
+        Await a query, joining the identical one already in flight if any.
+        
+        Args:
+            key: Hashable description of the query
+            compute: Coroutine function producing the result
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return list(await asyncio.shield(task)) #a copy, callers may modify the result
+
+    async def keys_with_prefix(self, prefix, limit=None):
+        """
+        Collect the stored words starting with a prefix, in sorted order.
+        
+        Args:
+            prefix (str): Prefix to complete, '' matches every word
+            limit (int): Maximum number of words, None for all
+            
+        Returns:
+            list: The matching words
+        """
+        async def collect():
+            words = []
+            matches = self.tree.keys_with_prefix(prefix, limit)
+            while True:
+                part = list(islice(matches, self.chunk))
+                words.extend(part)
+                if len(part) < self.chunk:
+                    return words
+                await asyncio.sleep(0)
+        
+        return await self._shared(('prefix', prefix, limit), collect)
+
+    async def autocomplete(self, prefix, k=10):
+        """
+        Complete a prefix with its k highest-scoring words.
+        
+        Args:
+            prefix (str): Prefix to complete
+            k (int): Maximum number of completions
+            
+        Returns:
+            list: Up to k completions
+        """
+        async def complete():
+            return self.tree.autocomplete(prefix, k)
+        
+        return await self._shared(('autocomplete', prefix, k), complete)
+
+    def __repr__(self):
+        """Detailed string representation."""
+        return f"AsyncTernarySearchTree({self.tree!r}, window={self.window})"
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes, None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 #kilobytes everywhere but macOS
+
+
+def _parse_weight(field, term):
+    """Parse the weight column of a TSV line, as an int when possible."""
+    try:
+        return int(field)
+    except ValueError:
+        try:
+            return float(field)
+        except ValueError:
+            raise ValueError(f"invalid weight {field!r} for {term!r}") from None
+
+
+def load_file(tree, path, batch_size=100000, order="shuffled", chunk_size=1 << 20,
+              progress=None, progress_interval=1.0):
+    """
+    Stream a word file into a tree with bounded memory.
+    
+    The file is read in chunks of chunk_size bytes, gzip files (.gz) are
+    decompressed on the fly. Each line holds one term, or a term and a
+    weight separated by a tab; terms are normalized like insert and
+    deduplicated per batch, the last weight winning. Batches are fed to
+    the tree once they reach batch_size terms and then dropped, so
+    memory stays in proportion to batch_size plus one chunk whatever
+    the size of the file.
+    
+    Args:
+        tree: Tree to fill; weighted lines need a tree whose insert takes a weight
+        path (str or os.PathLike): Path of the word file
+        batch_size (int): Distinct terms buffered before they are inserted
+        order (str): "shuffled" inserts each batch one word at a time in random
+            order, which keeps sorted files from degenerating the tree; "sorted"
+            uses insert_many, slower but with median-balanced sibling trees
+        chunk_size (int): Bytes read from the file at a time
+        progress: Callable receiving the statistics dict every progress_interval seconds
+        progress_interval (float): Seconds between two progress reports
+        
+    Returns:
+        dict: words (terms read), new_words (terms added to the tree), bytes
+        (read from the file), seconds, words_per_sec, bytes_per_sec and
+        peak_rss (bytes, None if unknown)
+    """
+    if order not in ("sorted", "shuffled"):
+        raise ValueError(f"order must be 'sorted' or 'shuffled', got {order!r}")
+    
+    path = os.fspath(path) # pathlib.Path has no endswith
+    stats = {'words': 0, 'new_words': 0, 'bytes': 0}
+    start_time = time.perf_counter()
+    next_report = start_time + progress_interval
+    
+    def report(raw):
+        elapsed = time.perf_counter() - start_time
+        stats['bytes'] = raw.tell()
+        stats['seconds'] = elapsed
+        stats['words_per_sec'] = stats['words'] / elapsed if elapsed else 0.0
+        stats['bytes_per_sec'] = stats['bytes'] / elapsed if elapsed else 0.0
+        stats['peak_rss'] = _peak_rss()
+        return stats
+    
+    def flush(batch):
+        before = len(tree)
+        if order == "sorted":
+            tree.insert_many(batch)
+            for word, weight in batch.items():
+                if weight is not None:
+                    tree.insert(word, weight) #the word is stored, this only sets its score
+        else:
+            words = list(batch)
+            random.shuffle(words)
+            for word in words:
+                weight = batch[word]
+                if weight is None:
+                    tree.insert(word)
+                else:
+                    tree.insert(word, weight)
+        stats['new_words'] += len(tree) - before
+        batch.clear()
+    
+    batch = {} #normalized term -> weight or None
+    with open(path, "rb") as raw:
+        stream = gzip.GzipFile(fileobj=raw) if path.endswith(".gz") else raw
+        pending = b''
+        while True:
+            data = stream.read(chunk_size)
+            if data:
+                block, _, pending = (pending + data).rpartition(b'\n')
+            else:
+                block, pending = pending, b'' #the last line may lack its newline
+            
+            text = block.decode("utf-8", errors="replace").lower()
+            if '\t' not in text: #one term per line, the whole chunk is normalized at once
+                words = list(filter(None, map(str.strip, text.split('\n'))))
+                stats['words'] += len(words)
+                batch.update(dict.fromkeys(words))
+            else:
+                for line in text.split('\n'):
+                    line, _, field = line.partition('\t')
+                    word = line.strip()
+                    if word == '':
+                        continue
+                    stats['words'] += 1
+                    batch[word] = _parse_weight(field.split('\t', 1)[0].strip(), word) if field else None
+            if len(batch) >= batch_size:
+                flush(batch)
+            
+            if progress is not None:
+                time_now = time.perf_counter()
+                if time_now >= next_report:
+                    progress(dict(report(raw))) #a copy, the final report is the returned dict
+                    next_report = time_now + progress_interval
+            if not data:
+                break
+        
+        flush(batch)
+        report(raw)
+    
+    if progress is not None:
+        progress(stats)
+    return stats
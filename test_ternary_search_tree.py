@@ -1,11 +1,21 @@
 import unittest
+import asyncio
+import gzip
 import sys
 import os
+import pathlib
+import random
+import subprocess
+import tempfile
+import threading
 
 # Add the parent directory to the path to import our module
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from ternary_search_tree import TernarySearchTree
+from ternary_search_tree import (TernarySearchTree, CompactTernarySearchTree, FrozenTernarySearchTree,
+                                 InstrumentedTernarySearchTree,
+                                 RadixTernarySearchTree, ConcurrentTernarySearchTree, TernarySearchMap,
+                                 AsyncTernarySearchTree, QueryPool, share_tree, load_file)
 
 
 class TestTernarySearchTree(unittest.TestCase):
@@ -69,8 +79,29 @@ class TestTernarySearchTree(unittest.TestCase):
             self.tst.insert(word)
         
         all_words = self.tst.all_strings()
-        self.assertEqual(set(all_words), set(self.sample_words))
-        # Sorting is not guaranteed, so removed this test
+        self.assertEqual(all_words, sorted(self.sample_words))
+    
+    def test_iteration_and_membership(self):
+        """Test that iteration, membership and length follow delete and clear."""
+        for word in self.sample_words:
+            self.tst.insert(word)
+        
+        self.assertEqual(list(self.tst), sorted(self.sample_words))
+        self.assertIn("Cat", self.tst)
+        self.assertNotIn("ca", self.tst)
+        self.assertNotIn(None, self.tst)
+        
+        self.tst.delete("cat")
+        self.tst.delete("up")
+        self.assertNotIn("cat", self.tst)
+        self.assertEqual(len(self.tst), len(self.sample_words) - 2)
+        self.assertEqual(list(self.tst), sorted(set(self.sample_words) - {"cat", "up"}))
+        self.assertEqual(len(self.tst.all_strings()), len(self.tst))
+        
+        self.tst.clear()
+        self.assertEqual(len(self.tst), 0)
+        self.assertEqual(list(self.tst), [])
+        self.assertEqual(self.tst.all_strings(), [])
     
     def test_case_insensitivity(self):
         """Test that the tree handles case insensitivity correctly."""
@@ -111,3 +142,1069 @@ class TestTernarySearchTree(unittest.TestCase):
         
         for word in prefixed_words:
             self.assertTrue(self.tst.search(word))
+    
+    def test_duplicate_count_with_prefixes(self):
+        """Test that word count stays exact for duplicates and shared prefixes."""
+        for word in ["cats", "cat", "ca", "cat", "CATS", " ca "]:
+            self.tst.insert(word)
+        
+        self.assertEqual(len(self.tst), 3)
+        self.assertEqual(sorted(self.tst.all_strings()), ["ca", "cat", "cats"])
+    
+    def test_delete_word(self):
+        """Test deleting words keeps the count exact."""
+        for word in self.sample_words:
+            self.tst.insert(word)
+        
+        self.assertTrue(self.tst.delete("cat"))
+        self.assertFalse(self.tst.delete("cat"))
+        self.assertFalse(self.tst.search("cat"))
+        self.assertTrue(self.tst.search("cats"))
+        self.assertEqual(len(self.tst), len(self.sample_words) - 1)
+        
+        self.tst.insert("cat")
+        self.assertEqual(len(self.tst), len(self.sample_words))
+    
+    def test_long_keys_without_recursion(self):
+        """Test that very long keys work without hitting the recursion limit."""
+        long_word = "ab" * 5000
+        self.tst.insert(long_word)
+        self.tst.insert(long_word[:-1])
+        
+        self.assertTrue(self.tst.search(long_word))
+        self.assertEqual(self.tst.height(), len(long_word))
+        self.assertEqual(len(str(self.tst).splitlines()), len(long_word) + 1)
+        self.assertTrue(self.tst.delete(long_word))
+        self.assertFalse(self.tst.search(long_word))
+        self.assertTrue(self.tst.search(long_word[:-1]))
+        self.assertEqual(self.tst.height(), len(long_word) - 1)
+    
+    def test_str_visualization(self):
+        """Test the layout of the tree visualization."""
+        for word in ["b", "a", "bc"]:
+            self.tst.insert(word)
+        
+        expected = "\n".join([
+            "terminates: False",
+            "      char: b, terminates: True",
+            "_ls:        char: a, terminates: True",
+            "_eq:        char: c, terminates: True",
+        ])
+        self.assertEqual(str(self.tst), expected)
+
+    
+    def test_from_iterable(self):
+        """Test bulk loading deduplicates and normalizes the words."""
+        tst = self.tst.from_iterable(self.sample_words + ["CAT", " up", ""])
+        
+        self.assertIsInstance(tst, type(self.tst))
+        self.assertEqual(len(tst), len(self.sample_words))
+        self.assertEqual(sorted(tst.all_strings()), sorted(self.sample_words))
+        for word in self.sample_words:
+            self.assertTrue(tst.search(word))
+    
+    def test_from_iterable_balances_sorted_input(self):
+        """Test that sorted input gives a shallower tree than a plain insert loop."""
+        words = [f"word{i:04d}" for i in range(1000)]
+        for word in words:
+            self.tst.insert(word)
+        balanced = self.tst.from_iterable(words, presorted=True)
+        
+        self.assertEqual(len(balanced), len(words))
+        self.assertLess(balanced.height(), self.tst.height())
+        self.assertLess(balanced.average_depth(), self.tst.average_depth())
+    
+    def test_average_depth(self):
+        """Test the average search depth on a small tree."""
+        self.assertEqual(self.tst.average_depth(), 0.0)
+        for word in ["b", "a", "bc"]:
+            self.tst.insert(word)
+        
+        self.assertAlmostEqual(self.tst.average_depth(), (1 + 2 + 2) / 3)
+
+    
+    def test_keys_with_prefix(self):
+        """Test prefix enumeration in sorted order."""
+        for word in self.sample_words:
+            self.tst.insert(word)
+        
+        self.assertEqual(list(self.tst.keys_with_prefix("ap")), ["apple", "application"])
+        self.assertEqual(list(self.tst.keys_with_prefix("cat")), ["cat", "cats"])
+        self.assertEqual(list(self.tst.keys_with_prefix("CA")), ["cat", "cats"])
+        self.assertEqual(list(self.tst.keys_with_prefix("")), sorted(self.sample_words))
+        self.assertEqual(list(self.tst.keys_with_prefix("x")), [])
+        self.assertEqual(list(self.tst.keys_with_prefix(None)), [])
+    
+    def test_keys_with_prefix_is_lazy(self):
+        """Test that prefix enumeration stops at the limit."""
+        for word in self.sample_words:
+            self.tst.insert(word)
+        
+        matches = self.tst.keys_with_prefix("a")
+        self.assertEqual(next(matches), "add")
+        self.assertEqual(list(self.tst.keys_with_prefix("a", limit=2)), ["add", "apple"])
+        self.assertEqual(list(self.tst.keys_with_prefix("a", limit=0)), [])
+    
+    def test_autocomplete(self):
+        """Test autocomplete returns at most k completions."""
+        for word in self.sample_words:
+            self.tst.insert(word)
+        
+        self.assertEqual(self.tst.autocomplete("a", 3), ["add", "apple", "application"])
+        self.assertEqual(self.tst.autocomplete("bu", 3), ["bug"])
+        self.assertEqual(self.tst.autocomplete("q", 3), [])
+
+    
+    def test_search_many(self):
+        """Test batched search keeps the caller's order."""
+        for word in self.sample_words:
+            self.tst.insert(word)
+        
+        queries = ["cats", "ca", "apple", "zebra", "CAT", "apple", None, "", "applications"]
+        self.assertEqual(self.tst.search_many(queries),
+                         [True, False, True, False, True, True, False, False, False])
+        self.assertEqual(self.tst.search_many(queries), [self.tst.search(q) for q in queries])
+        
+        large = [word + suffix for word in queries if word for suffix in ("", "s", "a", " ")] * 200
+        mismatches = [q for q, found in zip(large, self.tst.search_many(large)) if found != self.tst.search(q)]
+        self.assertEqual(mismatches, [])
+    
+    def test_insert_many(self):
+        """Test batched insert counts only new words."""
+        self.tst.insert("cat")
+        added = self.tst.insert_many(self.sample_words + ["Cat", "", "apple"])
+        
+        self.assertEqual(added, len(self.sample_words) - 1)
+        self.assertEqual(len(self.tst), len(self.sample_words))
+        self.assertTrue(all(self.tst.search_many(self.sample_words)))
+    
+    def test_insert_many_balances_sorted_batch(self):
+        """Test that a sorted batch doesn't build degenerate sibling chains."""
+        words = [f"word{i:04d}" for i in range(1000)]
+        self.tst.insert_many(words)
+        looped = TernarySearchTree()
+        for word in words:
+            looped.insert(word)
+        
+        self.assertLess(self.tst.height(), looped.height())
+
+    
+    def test_save_and_load(self):
+        """Test snapshot round trips, memory-mapped and copied."""
+        for word in self.sample_words:
+            self.tst.insert(word)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "words.tst")
+            self.tst.save(path)
+            
+            with TernarySearchTree.load(path) as frozen:
+                self.assertIsInstance(frozen, FrozenTernarySearchTree)
+                self.assertEqual(len(frozen), len(self.sample_words))
+                self.assertEqual(str(frozen), str(self.tst))
+                self.assertTrue(frozen.search("apple"))
+                self.assertFalse(frozen.search("ca"))
+                self.assertEqual(list(frozen.keys_with_prefix("ca")), ["cat", "cats"])
+            
+            loaded = TernarySearchTree.load(path, mmap=False)
+            self.assertIsInstance(loaded, CompactTernarySearchTree)
+            loaded.insert("dog")
+            self.assertEqual(sorted(loaded.all_strings()), sorted(self.sample_words + ["dog"]))
+
+    
+    def test_near_matches(self):
+        """Test spelling-tolerant lookups."""
+        for word in self.sample_words:
+            self.tst.insert(word)
+        
+        self.assertEqual(self.tst.near_matches("aplpe", 2), [("apple", 2)])
+        self.assertEqual(self.tst.near_matches("cat", 0), [("cat", 0)])
+        self.assertEqual(self.tst.near_matches("CAT", 1), [("cat", 0), ("at", 1), ("cats", 1)])
+        self.assertEqual(self.tst.near_matches("zzzzz", 1), [])
+        self.assertEqual(self.tst.near_matches(None, 1), [])
+        with self.assertRaises(ValueError):
+            self.tst.near_matches("cat", -1)
+
+    
+    def test_match(self):
+        """Test wildcard pattern queries."""
+        for word in self.sample_words + ["cut", "cot"]:
+            self.tst.insert(word)
+        
+        self.assertEqual(list(self.tst.match("c?t")), ["cat", "cot", "cut"])
+        self.assertEqual(list(self.tst.match("ap*")), ["apple", "application"])
+        self.assertEqual(list(self.tst.match("*t")), ["at", "cat", "cot", "cut"])
+        self.assertEqual(list(self.tst.match("a*l*")), ["apple", "application"])
+        self.assertEqual(list(self.tst.match("C?T*", limit=2)), ["cat", "cats"])
+        self.assertEqual(list(self.tst.match("cat")), ["cat"])
+        self.assertEqual(list(self.tst.match("x*")), [])
+        self.assertEqual(len(list(self.tst.match("*"))), len(self.tst))
+
+    
+    def test_ordered_queries(self):
+        """Test range, rank, select, floor and ceiling."""
+        for word in self.sample_words:
+            self.tst.insert(word)
+        ordered = sorted(self.sample_words)
+        
+        self.assertEqual(list(self.tst.range()), ordered)
+        self.assertEqual(list(self.tst.range("apple", "bug")), ["apple", "application", "at"])
+        self.assertEqual(list(self.tst.range("b")), ["bug", "cat", "cats", "up"])
+        self.assertEqual(list(self.tst.range(hi="at")), ["add", "apple", "application"])
+        
+        for i, word in enumerate(ordered):
+            self.assertEqual(self.tst.rank(word), i)
+            self.assertEqual(self.tst.select(i), word)
+        self.assertEqual(self.tst.rank("b"), 4)
+        self.assertEqual(self.tst.rank("zzz"), len(ordered))
+        self.assertEqual(self.tst.select(-1), "up")
+        with self.assertRaises(IndexError):
+            self.tst.select(len(ordered))
+        
+        self.assertEqual(self.tst.floor("cat"), "cat")
+        self.assertEqual(self.tst.floor("car"), "bug")
+        self.assertIsNone(self.tst.floor("aa"))
+        self.assertEqual(self.tst.ceiling("car"), "cat")
+        self.assertEqual(self.tst.ceiling("catz"), "up")
+        self.assertIsNone(self.tst.ceiling("v"))
+        
+        self.tst.delete("bug")
+        self.assertEqual(self.tst.rank("cat"), 4)
+        self.assertEqual(self.tst.select(4), "cat")
+        self.assertEqual(self.tst.floor("car"), "at")
+
+    
+    def test_rebalance(self):
+        """Test that rebalancing a tree grown from sorted input keeps its words."""
+        words = [f"w{i:03d}" for i in range(200)]
+        for word in words:
+            self.tst.insert(word)
+        depth = self.tst.average_depth()
+        
+        self.tst.rebalance()
+        self.assertLess(self.tst.average_depth(), depth)
+        self.assertEqual(list(self.tst), words)
+        self.assertTrue(self.tst.search("w150"))
+        self.assertTrue(self.tst.delete("w150"))
+        self.tst.insert("w999")
+        self.assertEqual(len(self.tst), len(words))
+        self.assertEqual(list(self.tst.keys_with_prefix("w19")), [f"w19{i}" for i in range(10)])
+    
+    def test_auto_rebalance(self):
+        """Test that the auto-rebalance policy repairs a sorted feed as it grows."""
+        words = [f"w{i:04d}" for i in range(2000)]
+        plain = TernarySearchTree()
+        balanced = TernarySearchTree(rebalance_factor=2)
+        for word in words:
+            plain.insert(word, len(word))
+            balanced.insert(word, len(word))
+        
+        self.assertLess(balanced.average_depth(), plain.average_depth())
+        self.assertEqual(list(balanced), words)
+        self.assertEqual(balanced.select(1234), "w1234")
+        self.assertEqual(balanced.autocomplete("w0", 2), ["w0000", "w0001"])
+        with self.assertRaises(ValueError):
+            TernarySearchTree(storage="radix", rebalance_factor=2)
+
+
+class TestCompactTernarySearchTree(TestTernarySearchTree):
+    """Run the same test cases against the array-backed node storage."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        super().setUp()
+        self.tst = TernarySearchTree(storage="array")
+    
+    def test_storage_selection(self):
+        """Test that the storage is selected at construction time."""
+        self.assertIsInstance(self.tst, CompactTernarySearchTree)
+        self.assertIsInstance(TernarySearchTree(), TernarySearchTree)
+        with self.assertRaises(ValueError):
+            TernarySearchTree(storage="disk")
+    
+    def test_deleted_nodes_are_reused(self):
+        """Test that deleted node slots are reused by later inserts."""
+        self.tst.insert("abc")
+        size = self.tst.nbytes()
+        self.tst.delete("abc")
+        self.assertEqual(self.tst.node_count(), 0)
+        self.assertTrue(self.tst.is_empty())
+        
+        self.tst.insert("xyz")
+        self.assertEqual(self.tst.nbytes(), size)
+        self.assertEqual(self.tst.all_strings(), ["xyz"])
+
+
+
+class TestPrefixIndexedTernarySearchTree(TestTernarySearchTree):
+    """Run the same test cases against a tree with a two-character prefix index."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        super().setUp()
+        self.tst = TernarySearchTree(prefix_index=2)
+    
+    def test_average_depth(self):
+        """Test that words reached through the index count from the indexed node."""
+        for word in ["b", "a", "bc"]:
+            self.tst.insert(word)
+        
+        self.assertAlmostEqual(self.tst.average_depth(), (1 + 2 + 1) / 3)
+    
+    def test_delete_drops_empty_prefixes(self):
+        """Test that the index doesn't keep prefixes whose words were all deleted."""
+        for word in ["bm", "bc", "ba"]:
+            self.tst.insert(word)
+        for _ in range(3):
+            self.tst.insert("bcx")
+            self.tst.delete("bcx")
+            self.tst.delete("bc") # the "c" node stays as the parent of "a"
+        
+        self.assertEqual(sorted(self.tst._index), ["ba", "bm"])
+        self.tst.insert("bcd")
+        self.assertEqual(self.tst.all_strings(), ["ba", "bcd", "bm"])
+        self.assertTrue(self.tst.search("bcd"))
+    
+    def test_prefix_index_shortens_searches(self):
+        """Test that indexed searches skip the nodes of the leading characters."""
+        words = ["apple", "apply", "banana", "band", "cat", "a"]
+        plain = TernarySearchTree.from_iterable(words)
+        indexed = TernarySearchTree.from_iterable(words, prefix_index=2)
+        
+        self.assertEqual(list(indexed), list(plain))
+        self.assertLess(indexed.average_depth(), plain.average_depth())
+        self.assertEqual(indexed.rank("band"), plain.rank("band"))
+        
+        with self.assertRaises(ValueError):
+            TernarySearchTree(prefix_index=3)
+        with self.assertRaises(ValueError):
+            TernarySearchTree(storage="array", prefix_index=1)
+
+
+class TestInstrumentedTernarySearchTree(TestTernarySearchTree):
+    """Run the same test cases against a tree with operation counters."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        super().setUp()
+        self.tst = TernarySearchTree(stats=True)
+    
+    def test_stats_counters(self):
+        """Test the visit counters and histograms of each operation."""
+        self.assertIsInstance(self.tst, InstrumentedTernarySearchTree)
+        self.assertIsNone(TernarySearchTree().stats())
+        
+        for word in ["b", "a", "c", "ab"]:
+            self.tst.insert(word)
+        self.assertTrue(self.tst.search("AB"))
+        self.assertFalse(self.tst.search("d"))
+        self.assertFalse(self.tst.search(""))
+        self.assertTrue(self.tst.delete("c"))
+        
+        stats = self.tst.stats()
+        self.assertEqual((stats['words'], stats['nodes'], stats['max_depth']), (3, 3, 3))
+        self.assertEqual(stats['insert']['count'], 4)
+        self.assertEqual(stats['insert']['depth'], {1: 1, 2: 2, 3: 1})
+        # "ab": one _ls step to "a", then "a" and "b" matched
+        self.assertEqual(stats['search'], {'count': 2, 'visits': 5, 'depth': {2: 1, 3: 1},
+                                           'sibling_steps': {1: 1, 2: 1}, 'eq_steps': {0: 1, 2: 1}})
+        self.assertEqual(stats['delete']['visits'], 2)
+        
+        stats['search']['depth'][9] = 1 # a snapshot, not the live counters
+        self.assertNotIn(9, self.tst.stats()['search']['depth'])
+        with self.assertRaises(ValueError):
+            TernarySearchTree(storage="radix", stats=True)
+    
+    def test_stats_skip_cache_and_index(self):
+        """Test that only the nodes a query really reads are counted."""
+        cached = TernarySearchTree(cache_size=10, stats=True)
+        cached.insert_many(["b", "a", "ab"])
+        self.assertEqual(cached.stats()['insert']['count'], 0) # shared descent, recounted only
+        self.assertEqual(cached.stats()['nodes'], 3)
+        self.assertTrue(cached.search("ab"))
+        self.assertTrue(cached.search("ab")) # cache hit
+        self.assertEqual(cached.stats()['search']['count'], 1)
+        
+        indexed = TernarySearchTree(prefix_index=2, stats=True)
+        for word in ["b", "a", "ab", "abc"]:
+            indexed.insert(word)
+        # "abc" continues below the indexed "ab" node: "a" is not visited again
+        self.assertEqual(indexed.stats()['insert']['depth'], {1: 1, 2: 2, 3: 1})
+        self.assertEqual(indexed.stats()['max_depth'], indexed.height())
+        self.assertTrue(indexed.search("abc"))
+        self.assertFalse(indexed.search("zz"))
+        self.assertEqual(indexed.stats()['search']['depth'], {0: 1, 2: 1})
+        
+        rng = random.Random(7)
+        words = ["".join(rng.choices("abcdefghij", k=rng.randint(1, 8))) for _ in range(2000)]
+        for prefix_index in (0, 1, 2):
+            indexed = TernarySearchTree(prefix_index=prefix_index, stats=True)
+            for word in words:
+                indexed.insert(word)
+            self.assertEqual(indexed.stats()['max_depth'], indexed.height(), prefix_index)
+    
+    def test_stats_track_nodes_and_depth(self):
+        """Test that node count and maximum depth follow every kind of update."""
+        words = sorted(f"key{i}" for i in range(200))
+        for word in words:
+            self.tst.insert(word)
+        self.tst.insert_many(["alpha", "beta", "key1x"])
+        for word in words[::3]:
+            self.tst.delete(word)
+        
+        stats = self.tst.stats()
+        self.assertEqual(stats['nodes'], self.tst.node_count())
+        self.assertGreaterEqual(stats['max_depth'], self.tst.height())
+        
+        self.tst.rebalance()
+        self.assertEqual(self.tst.stats()['max_depth'], self.tst.height())
+        self.assertEqual(InstrumentedTernarySearchTree.from_iterable(words).stats()['nodes'],
+                         TernarySearchTree.from_iterable(words).node_count())
+        parallel = InstrumentedTernarySearchTree.from_iterable_parallel(words + ["alpha"], workers=1)
+        self.assertEqual((parallel.stats()['nodes'], parallel.stats()['max_depth']),
+                         (parallel.node_count(), parallel.height()))
+        self.assertIs(self.tst.Node, TernarySearchTree.Node)
+        
+        self.tst.clear()
+        self.assertEqual((self.tst.stats()['nodes'], self.tst.stats()['max_depth']), (0, 0))
+
+
+class TestRadixTernarySearchTree(TestTernarySearchTree):
+    """Run the same test cases against the path-compressed node storage."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        super().setUp()
+        self.tst = TernarySearchTree(storage="radix")
+    
+    def test_storage_selection(self):
+        """Test that the storage is selected at construction time."""
+        self.assertIsInstance(self.tst, RadixTernarySearchTree)
+        with self.assertRaises(ValueError):
+            TernarySearchTree(storage="radix", cache_size=10)
+    
+    def test_long_keys_without_recursion(self):
+        """Test that a long key is stored as a single segment."""
+        long_word = "ab" * 5000
+        self.tst.insert(long_word)
+        self.tst.insert(long_word[:-1])
+        
+        self.assertTrue(self.tst.search(long_word))
+        self.assertFalse(self.tst.search(long_word[:-2]))
+        self.assertEqual(self.tst.node_count(), 2)
+        self.assertTrue(self.tst.delete(long_word))
+        self.assertTrue(self.tst.search(long_word[:-1]))
+        self.assertEqual(self.tst.node_count(), 1)
+    
+    def test_str_visualization(self):
+        """Test the layout of the tree visualization."""
+        for word in ["b", "a", "bcd"]:
+            self.tst.insert(word)
+        
+        expected = "\n".join([
+            "terminates: False",
+            "      chars: b, terminates: True",
+            "_ls:        chars: a, terminates: True",
+            "_eq:        chars: cd, terminates: True",
+        ])
+        self.assertEqual(str(self.tst), expected)
+    
+    def test_save_and_load(self):
+        """Test that snapshots expand segments to one node per character."""
+        node_tree = TernarySearchTree()
+        for word in self.sample_words:
+            self.tst.insert(word)
+            node_tree.insert(word)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "words.tst")
+            self.tst.save(path)
+            
+            with TernarySearchTree.load(path) as frozen:
+                self.assertEqual(frozen.node_count(), node_tree.node_count())
+                self.assertEqual(frozen.all_strings(), sorted(self.sample_words))
+                self.assertEqual(list(frozen.keys_with_prefix("ca")), ["cat", "cats"])
+    
+    def test_split_and_merge(self):
+        """Test that segments split on insert and merge back on delete."""
+        self.tst.insert("commonprefixa")
+        self.assertEqual(self.tst.node_count(), 1)
+        
+        self.tst.insert("commonprefixb")
+        self.tst.insert("commonprefix")
+        self.assertEqual(self.tst.node_count(), 3) # "commonprefix", "a" and its sibling "b"
+        self.assertEqual(self.tst.all_strings(), ["commonprefix", "commonprefixa", "commonprefixb"])
+        
+        self.tst.delete("commonprefix")
+        self.tst.delete("commonprefixa")
+        self.assertEqual(self.tst.node_count(), 1)
+        self.assertEqual(str(self.tst), "terminates: False\n      chars: commonprefixb, terminates: True")
+
+
+class TestConcurrentTernarySearchTree(unittest.TestCase):
+    """Test cases for the copy-on-write tree with lock-free reads."""
+    
+    def setUp(self):
+        """Set up a tree with a few stable words."""
+        self.stable = ["apple", "banana", "cherry", "date"]
+        self.tst = ConcurrentTernarySearchTree.from_iterable(self.stable)
+    
+    def test_snapshot_isolation(self):
+        """Test that writes never change a snapshot taken before them."""
+        before = self.tst.snapshot()
+        words = iter(self.tst)
+        self.tst.insert("avocado", 5)
+        self.tst.delete("banana")
+        
+        self.assertEqual(list(before), self.stable)
+        self.assertEqual(list(words), self.stable)
+        self.assertEqual(list(self.tst), ["apple", "avocado", "cherry", "date"])
+        self.assertEqual(self.tst.autocomplete("a", 1), ["avocado"])
+        self.assertEqual(self.tst.insert_many(["fig", "apple", "grape"]), 2)
+        self.assertEqual(len(self.tst), 6)
+    
+    def test_insert_many_copies_each_node_once(self):
+        """Test that a batch copies the shared nodes once and leaves the others shared."""
+        before = self.tst.snapshot()
+        copies = []
+        copy_node = self.tst._copy_node
+        self.tst._copy_node = lambda node: copies.append(node) or copy_node(node)
+        
+        self.assertEqual(self.tst.insert_many(["apricot", "apex", "apple", "applet"]), 3)
+        shared = []
+        stack = [before.root]
+        while stack:
+            node = stack.pop()
+            shared.append(node)
+            stack.extend(child for child in (node._ls, node._eq, node._gt) if child is not None)
+        self.assertTrue(all(any(node is old for old in shared) for node in copies))
+        self.assertEqual(len(copies), len(set(map(id, copies))))
+        self.assertEqual(list(before), self.stable)
+        self.assertEqual(self.tst.all_strings(), ["apex", "apple", "applet", "apricot", "banana", "cherry", "date"])
+        self.assertEqual(self.tst.snapshot().rank("b"), 4)
+        self.assertEqual(self.tst.insert_many(["apple", "date"]), 0)
+    
+    def test_readers_during_writes(self):
+        """Stress test: readers see consistent versions while a writer churns."""
+        errors = []
+        done = threading.Event()
+        
+        def reader():
+            while not done.is_set():
+                snapshot = self.tst.snapshot()
+                if not all(snapshot.search(word) for word in self.stable):
+                    errors.append("stable word missing")
+                if len(list(snapshot)) != len(snapshot):
+                    errors.append("length and iteration disagree")
+        
+        def writer():
+            for i in range(2000):
+                self.tst.insert(f"temp{i % 50}")
+                self.tst.delete(f"temp{(i + 25) % 50}")
+            done.set()
+        
+        threads = [threading.Thread(target=reader) for _ in range(3)] + [threading.Thread(target=writer)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertTrue(all(word in self.tst for word in self.stable))
+
+
+class TestAsyncTernarySearchTree(unittest.TestCase):
+    """Test cases for the asyncio front-end."""
+    
+    def setUp(self):
+        """Set up a tree that counts the traversals it is asked for."""
+        self.tst = TernarySearchTree()
+        for word in ["cat", "cats", "car", "dog", "door"]:
+            self.tst.insert(word)
+        self.calls = []
+        for name in ("search_many", "keys_with_prefix", "autocomplete"):
+            method = getattr(self.tst, name)
+            setattr(self.tst, name, self._counted(name, method))
+    
+    def _counted(self, name, method):
+        def wrapper(*args):
+            self.calls.append(name)
+            return method(*args)
+        return wrapper
+    
+    def test_lookups_are_batched(self):
+        """Test that concurrent lookups share one traversal."""
+        front = AsyncTernarySearchTree(self.tst)
+        words = ["cat", "ca", "dog", "DOOR", "cat", "cow"]
+        
+        async def run():
+            return await asyncio.gather(*(front.search(word) for word in words))
+        
+        self.assertEqual(asyncio.run(run()), [True, False, True, True, True, False])
+        self.assertEqual(self.calls, ["search_many"])
+        
+        front.window = 0
+        self.assertTrue(asyncio.run(front.search("car")))
+        self.assertEqual(self.calls, ["search_many", "search_many"])
+    
+    def test_identical_queries_coalesce(self):
+        """Test that identical in-flight queries are computed once."""
+        front = AsyncTernarySearchTree(self.tst)
+        
+        async def run():
+            return await asyncio.gather(front.keys_with_prefix("ca"), front.keys_with_prefix("ca"),
+                                        front.autocomplete("d", 1), front.autocomplete("d", 1),
+                                        front.keys_with_prefix("do", 1))
+        
+        results = asyncio.run(run())
+        self.assertEqual(results, [["car", "cat", "cats"], ["car", "cat", "cats"], ["dog"], ["dog"], ["dog"]])
+        self.assertIsNot(results[0], results[1])
+        self.assertEqual(sorted(self.calls), ["autocomplete", "keys_with_prefix", "keys_with_prefix"])
+        
+        asyncio.run(front.keys_with_prefix("ca"))
+        self.assertEqual(self.calls.count("keys_with_prefix"), 3)
+    
+    def test_enumeration_yields(self):
+        """Test that a long enumeration lets other tasks run."""
+        tree = TernarySearchTree.from_iterable(f"word{i}" for i in range(1000))
+        front = AsyncTernarySearchTree(tree, chunk=100)
+        ticks = []
+        
+        async def ticker():
+            for i in range(5):
+                ticks.append(i)
+                await asyncio.sleep(0)
+        
+        async def enumerate_words():
+            words = await front.keys_with_prefix("word")
+            return words, len(ticks)
+        
+        async def run():
+            (words, ticked), _ = await asyncio.gather(enumerate_words(), ticker())
+            return words, ticked
+        
+        words, ticked = asyncio.run(run())
+        self.assertEqual(words, tree.all_strings())
+        self.assertEqual(ticked, 5) #the ticker finished while the words were enumerated
+        
+        async def cancelled():
+            waiting = asyncio.ensure_future(front.keys_with_prefix("word1"))
+            shared = asyncio.ensure_future(front.keys_with_prefix("word1"))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            return await shared
+        
+        self.assertEqual(len(asyncio.run(cancelled())), 111)
+
+
+class TestWeightedAutocomplete(unittest.TestCase):
+    """Test cases for frequency-weighted autocomplete."""
+    
+    def setUp(self):
+        """Set up a tree with search-box popularity scores."""
+        self.tst = TernarySearchTree()
+        self.weights = {"apple": 50, "application": 80, "apply": 10, "ape": 80, "banana": 99, "app": 5}
+        for word, weight in self.weights.items():
+            self.tst.insert(word, weight)
+    
+    def test_top_k_by_weight(self):
+        """Test completions are ranked by weight, ties alphabetically."""
+        self.assertEqual(self.tst.autocomplete("ap", 3), ["ape", "application", "apple"])
+        self.assertEqual(self.tst.autocomplete("app", 10), ["application", "apple", "apply", "app"])
+        self.assertEqual(self.tst.autocomplete("", 1), ["banana"])
+        self.assertEqual(self.tst.autocomplete("x", 3), [])
+    
+    def test_non_positive_k(self):
+        """Test that k <= 0 returns no completions on every storage."""
+        words = list(self.weights)
+        term_map = TernarySearchMap()
+        for word in words:
+            term_map[word] = len(word)
+        trees = [self.tst, term_map, ConcurrentTernarySearchTree()]
+        for storage in ("array", "radix"):
+            trees.append(TernarySearchTree(storage=storage))
+        for tree in trees[2:]:
+            tree.insert_many(words)
+        
+        block = share_tree(self.tst)
+        try:
+            with FrozenTernarySearchTree.from_shared_memory(block.name) as frozen:
+                for tree in trees + [frozen]:
+                    for k in (0, -1):
+                        self.assertEqual(tree.autocomplete("ap", k), [], type(tree).__name__)
+        finally:
+            block.close()
+            block.unlink()
+    
+    def test_weight_updates(self):
+        """Test that increasing and decreasing a weight re-ranks completions."""
+        self.tst.insert("apply", 100)
+        self.assertEqual(self.tst.autocomplete("ap", 2), ["apply", "ape"])
+        
+        self.tst.insert("apply", 1)
+        self.tst.insert("application")  # No weight keeps the current one
+        self.assertEqual(self.tst.get_weight("application"), 80)
+        self.assertEqual(self.tst.autocomplete("ap", 2), ["ape", "application"])
+        self.assertEqual(self.tst.root.max_weight, 99)
+    
+    def test_delete_updates_weights(self):
+        """Test that deleted words no longer contribute to the cached maxima."""
+        self.tst.delete("banana")
+        self.tst.delete("ape")
+        
+        self.assertEqual(self.tst.root.max_weight, 80)
+        self.assertEqual(self.tst.autocomplete("", 2), ["application", "apple"])
+        self.assertIsNone(self.tst.get_weight("ape"))
+    
+    def test_negative_weight(self):
+        """Test that negative weights are rejected."""
+        with self.assertRaises(ValueError):
+            self.tst.insert("pear", -1)
+
+
+class TestQueryCache(unittest.TestCase):
+    """Test cases for the optional LRU query cache."""
+    
+    def setUp(self):
+        """Set up a tree with a small cache."""
+        self.tst = TernarySearchTree(cache_size=4)
+        for word in ["cat", "cats", "car", "dog"]:
+            self.tst.insert(word)
+    
+    def test_counters(self):
+        """Test hit, miss and eviction counters."""
+        self.assertIsNone(TernarySearchTree().cache_info())
+        
+        self.tst.search("cat")
+        self.tst.search("cat")
+        self.tst.autocomplete("ca", 2)
+        self.tst.autocomplete("ca", 2)
+        info = self.tst.cache_info()
+        self.assertEqual((info['hits'], info['misses'], info['evictions']), (2, 2, 0))
+        
+        for word in ["a", "b", "c", "d"]:
+            self.tst.search(word)
+        info = self.tst.cache_info()
+        self.assertEqual(info['evictions'], 2)
+        self.assertEqual(info['size'], 4)
+    
+    def test_insert_and_delete_invalidate(self):
+        """Test that mutations are visible through the cache."""
+        self.assertFalse(self.tst.search("cow"))
+        self.assertEqual(list(self.tst.keys_with_prefix("c", limit=5)), ["car", "cat", "cats"])
+        self.assertEqual(self.tst.autocomplete("c", 2), ["car", "cat"])
+        
+        self.tst.insert("cow")
+        self.tst.insert("cats", 10)
+        self.assertTrue(self.tst.search("cow"))
+        self.assertEqual(list(self.tst.keys_with_prefix("c", limit=5)), ["car", "cat", "cats", "cow"])
+        self.assertEqual(self.tst.autocomplete("c", 2), ["cats", "car"])
+        
+        self.tst.delete("cats")
+        self.assertFalse(self.tst.search("cats"))
+        self.assertEqual(self.tst.autocomplete("c", 2), ["car", "cat"])
+    
+    def test_clear_invalidates(self):
+        """Test that clear empties the cache."""
+        self.assertTrue(self.tst.search("dog"))
+        self.tst.clear()
+        
+        self.assertFalse(self.tst.search("dog"))
+        self.assertEqual(self.tst.autocomplete("d", 3), [])
+    
+    def test_cache_requires_node_storage(self):
+        """Test that the cache can't be combined with the array storage."""
+        with self.assertRaises(ValueError):
+            TernarySearchTree(storage="array", cache_size=10)
+
+
+
+class TestSnapshot(unittest.TestCase):
+    """Test cases for the binary snapshot format."""
+    
+    def test_empty_tree(self):
+        """Test that an empty tree round trips."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "empty.tst")
+            TernarySearchTree().save(path)
+            
+            with TernarySearchTree.load(path) as frozen:
+                self.assertTrue(frozen.is_empty())
+                self.assertFalse(frozen.search("a"))
+                self.assertEqual(frozen.all_strings(), [])
+    
+    def test_invalid_file(self):
+        """Test that files that are not snapshots are rejected."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bogus.tst")
+            with open(path, "wb") as f:
+                f.write(b"not a tree at all, definitely not")
+            
+            with self.assertRaises(ValueError):
+                TernarySearchTree.load(path)
+            with self.assertRaises(ValueError):
+                TernarySearchTree.load(path, mmap=False)
+    
+    def test_frozen_from_bytes(self):
+        """Test that a frozen tree can be served from an in-memory buffer."""
+        tst = TernarySearchTree.from_iterable(["alpha", "beta", "gamma"])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "words.tst")
+            tst.save(path)
+            with open(path, "rb") as f:
+                frozen = FrozenTernarySearchTree(f.read())
+        
+        self.assertEqual(frozen.search_many(["beta", "delta"]), [True, False])
+        self.assertEqual(frozen.autocomplete("", 2), ["alpha", "beta"])
+    
+    def test_weights_round_trip(self):
+        """Test that loaded trees rank autocomplete by the saved weights."""
+        tst = TernarySearchTree()
+        for word, weight in (("apple", 1), ("apply", 50), ("apt", 10), ("ape", 2.5)):
+            tst.insert(word, weight)
+        tst.insert("apex")
+        self.assertEqual(tst.autocomplete("ap", 2), ["apply", "apt"])
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "weighted.tst")
+            tst.save(path)
+            with TernarySearchTree.load(path) as frozen:
+                for prefix in ("", "ap", "apt", "app", "b"):
+                    self.assertEqual(frozen.autocomplete(prefix, 3), tst.autocomplete(prefix, 3), prefix)
+            
+            compact = TernarySearchTree.load(path, mmap=False)
+        for prefix in ("", "ap", "app"):
+            self.assertEqual(compact.autocomplete(prefix, 5), tst.autocomplete(prefix, 5), prefix)
+        
+        # Mutations keep the cached maxima right: new words score 0, deleted ones stop counting
+        compact.delete("apply")
+        compact.insert("apz")
+        compact.rebalance()
+        self.assertEqual(compact.autocomplete("ap", 3), ["apt", "ape", "apple"])
+        self.assertEqual(compact.autocomplete("ap", 6), ["apt", "ape", "apple", "apex", "apz"])
+        self.assertEqual(compact.all_strings(), ["ape", "apex", "apple", "apt", "apz"])
+    
+    def test_unweighted_snapshot_has_no_weights(self):
+        """Test that trees without weights keep the plain layout and sorted completions."""
+        tst = TernarySearchTree.from_iterable(["alpha", "beta", "gamma"])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "words.tst")
+            tst.save(path)
+            with open(path, "rb") as f:
+                data = f.read()
+        
+        self.assertEqual(len(data), 20 + 17 * (tst.node_count() + 1))
+        frozen = FrozenTernarySearchTree(data)
+        self.assertIsNone(frozen._weights)
+        self.assertEqual(frozen.autocomplete("", 2), ["alpha", "beta"])
+
+
+
+class TestSharedMemory(unittest.TestCase):
+    """Test cases for serving a tree from shared memory."""
+    
+    def setUp(self):
+        """Set up a small dictionary."""
+        self.words = ["cat", "cats", "car", "dog", "door", "apple"]
+        self.tst = TernarySearchTree.from_iterable(self.words)
+    
+    def test_attach_shared_block(self):
+        """Test that an attached tree reads the published snapshot."""
+        block = share_tree(self.tst)
+        try:
+            frozen = FrozenTernarySearchTree.from_shared_memory(block.name)
+            self.assertEqual(frozen.all_strings(), sorted(self.words))
+            self.assertTrue(frozen.search("door"))
+            frozen.close()
+        finally:
+            block.close()
+            block.unlink()
+    
+    def test_query_pool(self):
+        """Test that pooled queries match the local tree, in order."""
+        queries = self.words + ["cow", "", "ca"]
+        with QueryPool(self.tst, workers=2) as pool:
+            self.assertEqual(pool.search_many(queries), [self.tst.search(q) for q in queries])
+            self.assertEqual(pool.autocomplete_many(["c", "do", "x"], 2),
+                             [["car", "cat"], ["dog", "door"], []])
+            self.assertEqual(pool.keys_with_prefix_many(["ca"]), [["car", "cat", "cats"]])
+    
+    def test_query_pool_weighted_autocomplete(self):
+        """Test that pooled autocomplete ranks by the weights of the shared tree."""
+        self.tst.insert("cats", 7)
+        self.tst.insert("door", 3)
+        with QueryPool(self.tst, workers=2) as pool:
+            self.assertEqual(pool.autocomplete_many(["c", "do", ""], 2),
+                             [["cats", "car"], ["door", "dog"], ["cats", "door"]])
+    
+    def test_query_pool_spawn_exits_cleanly(self):
+        """Test that spawned workers detach from the block without errors on exit."""
+        script = (
+            "import multiprocessing\n"
+            "from ternary_search_tree import TernarySearchTree, QueryPool\n"
+            "if __name__ == '__main__':\n"
+            "    multiprocessing.set_start_method('spawn')\n"
+            "    tree = TernarySearchTree()\n"
+            "    tree.insert_many(['cat', 'car', 'dog'])\n"
+            "    with QueryPool(tree, workers=2) as pool:\n"
+            "        print(pool.search_many(['cat', 'cow']))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "[True, False]")
+        self.assertNotIn("Traceback", result.stderr)
+
+
+class TestLoadFile(unittest.TestCase):
+    """Test cases for the streaming file loader."""
+    
+    def setUp(self):
+        """Set up a scratch directory for the word files."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+    
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "wb") as f:
+            f.write(text.encode("utf-8"))
+        return path
+    
+    def test_plain_and_gzip(self):
+        """Test that both encodings load the same normalized, deduplicated words."""
+        text = "Cat\ncar\n\n  dog \ncat\nCAR\ncats"
+        for name in ("words.txt", "words.txt.gz"):
+            for order in ("sorted", "shuffled"):
+                tst = TernarySearchTree()
+                stats = load_file(tst, self.write(name, text), batch_size=2, order=order, chunk_size=3)
+                self.assertEqual(tst.all_strings(), ["car", "cat", "cats", "dog"])
+                self.assertEqual((stats['words'], stats['new_words']), (6, 4))
+                self.assertEqual(stats['bytes'], os.path.getsize(os.path.join(self.directory.name, name)))
+        
+        compact = CompactTernarySearchTree()
+        load_file(compact, self.write("words.txt", text))
+        self.assertEqual(compact.all_strings(), ["car", "cat", "cats", "dog"])
+        
+        tst = TernarySearchTree()
+        load_file(tst, pathlib.Path(self.write("words.txt.gz", text)))
+        self.assertEqual(tst.all_strings(), ["car", "cat", "cats", "dog"])
+    
+    def test_weighted_tsv(self):
+        """Test weights from a TSV file, the last weight of a term winning."""
+        path = self.write("terms.tsv", "apple\t3\napricot\t7.5\textra\navocado\napple\t9\n")
+        tst = TernarySearchTree()
+        stats = load_file(tst, path)
+        self.assertEqual(stats['new_words'], 3)
+        self.assertEqual(tst.get_weight("apple"), 9)
+        self.assertEqual(tst.get_weight("apricot"), 7.5)
+        self.assertEqual(tst.autocomplete("a", 2), ["apple", "apricot"])
+        
+        with self.assertRaises(ValueError):
+            load_file(tst, self.write("bad.tsv", "apple\tmany\n"))
+        with self.assertRaises(ValueError):
+            load_file(tst, path, order="reversed")
+    
+    def test_progress(self):
+        """Test that progress reports carry throughput and memory figures."""
+        reports = []
+        path = self.write("words.txt", "\n".join(f"word{i}" for i in range(1000)))
+        stats = load_file(TernarySearchTree(), path, chunk_size=100, progress=reports.append,
+                          progress_interval=0)
+        self.assertGreater(len(reports), 1)
+        self.assertIs(reports[-1], stats)
+        self.assertEqual(stats['new_words'], 1000)
+        self.assertGreater(stats['words_per_sec'], 0)
+        self.assertGreater(stats['bytes_per_sec'], 0)
+        if sys.platform != "win32":
+            self.assertGreater(stats['peak_rss'], 0)
+
+
+class TestParallelBuild(unittest.TestCase):
+    """Test cases for the sharded multi-process build."""
+    
+    def test_matches_serial_build(self):
+        """Test that both builds answer every query the same way."""
+        words = ["Apple", "apply", "banana", "band", "b", "cat", "cats", "dog", "émile", "zebra", "apple", "  "]
+        serial = TernarySearchTree.from_iterable(words)
+        
+        for workers in (1, 2):
+            tst = TernarySearchTree.from_iterable_parallel(words, workers=workers)
+            self.assertEqual(list(tst), list(serial))
+            self.assertEqual(len(tst), len(serial))
+            self.assertEqual(tst.node_count(), serial.node_count())
+            self.assertEqual([tst.rank(word) for word in serial], list(range(len(serial))))
+            self.assertEqual(tst.select(3), serial.select(3))
+            self.assertEqual(list(tst.keys_with_prefix("ban")), ["banana", "band"])
+            self.assertEqual(tst.near_matches("cot"), serial.near_matches("cot"))
+            self.assertLessEqual(tst.height(), serial.height() + 1)
+            
+            tst.insert("bandana")
+            self.assertTrue(tst.delete("b"))
+            self.assertEqual(tst.rank("cat"), 5)
+    
+    def test_edge_cases(self):
+        """Test empty input, a single shard and the prefix index."""
+        self.assertTrue(TernarySearchTree.from_iterable_parallel([], workers=2).is_empty())
+        
+        single = TernarySearchTree.from_iterable_parallel(["car", "cat", "cart"], workers=2)
+        self.assertEqual(list(single), ["car", "cart", "cat"])
+        
+        indexed = TernarySearchTree.from_iterable_parallel(["apple", "apply", "banana"], workers=2, prefix_index=2)
+        self.assertTrue(indexed.search("apply"))
+        self.assertEqual(indexed.average_depth(), TernarySearchTree.from_iterable(
+            ["apple", "apply", "banana"], prefix_index=2).average_depth())
+
+
+class TestTernarySearchMap(unittest.TestCase):
+    """Test cases for the word to value mapping."""
+    
+    def setUp(self):
+        """Set up a map from terms to IDs."""
+        self.map = TernarySearchMap(typecode='q')
+        self.terms = {"cat": 3, "cats": 7, "car": 1, "dog": 4}
+        for term, term_id in self.terms.items():
+            self.map[term] = term_id
+    
+    def test_get_and_set(self):
+        """Test item access, overwriting and missing keys."""
+        self.assertEqual(self.map["cat"], 3)
+        self.assertEqual(self.map["Cats "], 7)
+        self.assertEqual(len(self.map), 4)
+        
+        self.map["cat"] = 30
+        self.assertEqual(self.map["cat"], 30)
+        self.assertEqual(len(self.map), 4)
+        
+        with self.assertRaises(KeyError):
+            self.map["ca"]
+        with self.assertRaises(KeyError):
+            self.map[""]
+        self.assertIsNone(self.map.get("ca"))
+        self.assertEqual(self.map.get(None, -1), -1)
+    
+    def test_delete_clears_value(self):
+        """Test that a deleted key loses its value, also when its slot is reused."""
+        del self.map["dog"]
+        self.assertNotIn("dog", self.map)
+        with self.assertRaises(KeyError):
+            del self.map["dog"]
+        
+        self.map.insert("dot")
+        self.assertEqual(self.map["dot"], 0)
+    
+    def test_items_with_prefix(self):
+        """Test lazy sorted (word, value) enumeration."""
+        self.assertEqual(list(self.map.items_with_prefix("ca")), [("car", 1), ("cat", 3), ("cats", 7)])
+        self.assertEqual(list(self.map.items_with_prefix("cat", limit=1)), [("cat", 3)])
+        self.assertEqual(list(self.map.items_with_prefix("x")), [])
+        self.assertEqual(dict(self.map.items()), self.terms)
+        self.assertEqual(list(self.map.values()), [1, 3, 7, 4])
+    
+    def test_object_values(self):
+        """Test that a map without typecode stores any object."""
+        postings = TernarySearchMap()
+        postings["cat"] = [1, 5, 9]
+        postings.insert("car")
+        self.assertEqual(postings["cat"], [1, 5, 9])
+        self.assertIsNone(postings["car"])